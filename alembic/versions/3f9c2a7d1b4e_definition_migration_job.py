@@ -0,0 +1,71 @@
+"""Definition migration jobs
+
+Revision ID: 3f9c2a7d1b4e
+Revises: e5be9c052fa1
+Create Date: 2026-10-19 09:12:31.402117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9c2a7d1b4e"
+down_revision: Union[str, None] = "e5be9c052fa1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "definition_migration_job",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("entity_definition_id", sa.UUID(), nullable=False),
+        sa.Column("entity_type", sa.String(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Enum("BACKFILL", "VALIDATE", "PURGE", name="definition_migration_kind"),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "PENDING",
+                "RUNNING",
+                "COMPLETED",
+                "FAILED",
+                name="definition_migration_status",
+            ),
+            nullable=False,
+        ),
+        sa.Column("attribute_name", sa.String(), nullable=False),
+        sa.Column("attribute_type", sa.String(), nullable=False),
+        sa.Column(
+            "default_value", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+        sa.Column("cursor", sa.UUID(), nullable=True),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("affected", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["entity_definition_id"],
+            ["entity_definition.id"],
+            name=op.f(
+                "fk_definition_migration_job_entity_definition_id_entity_definition"
+            ),
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_definition_migration_job")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("definition_migration_job")
+    sa.Enum(name="definition_migration_status").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="definition_migration_kind").drop(op.get_bind(), checkfirst=True)
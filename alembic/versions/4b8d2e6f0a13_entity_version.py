@@ -0,0 +1,29 @@
+"""Entity versions
+
+Revision ID: 4b8d2e6f0a13
+Revises: 7c2e4a9d1f35
+Create Date: 2026-10-19 20:26:51.730144
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "4b8d2e6f0a13"
+down_revision: Union[str, None] = "7c2e4a9d1f35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "entity",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("entity", "version")
@@ -0,0 +1,117 @@
+"""Content addressed asset blobs
+
+Revision ID: 5d7e2b9f4a16
+Revises: c41b7e93d2a5
+Create Date: 2026-10-19 15:41:08.270316
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5d7e2b9f4a16"
+down_revision: Union[str, None] = "c41b7e93d2a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "asset_blob",
+        sa.Column("checksum", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("mimetype", sa.String(), nullable=False),
+        sa.Column("storage_backend", sa.String(), nullable=False),
+        sa.Column("storage_key", sa.String(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("orphaned_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("checksum", name=op.f("pk_asset_blob")),
+    )
+
+    # Content in asset_content becomes a blob of the database backend, and
+    # outlives the asset it was uploaded with.
+    op.drop_constraint(
+        "fk_asset_content_asset_id_asset", "asset_content", type_="foreignkey"
+    )
+    op.execute(
+        """
+        UPDATE asset SET checksum = encode(sha256(c.content), 'hex')
+        FROM asset_content c
+        WHERE c.asset_id = asset.id AND asset.checksum IS NULL
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO asset_blob (checksum, size, mimetype, storage_backend,
+                                storage_key, ref_count, created_at)
+        SELECT checksum,
+               max(file_size),
+               (array_agg(mimetype ORDER BY created_at))[1],
+               (array_agg(storage_backend ORDER BY created_at))[1],
+               (array_agg(storage_key ORDER BY created_at))[1],
+               count(*),
+               min(created_at)
+        FROM asset
+        WHERE checksum IS NOT NULL
+        GROUP BY checksum
+        """
+    )
+    # Copies of content in the database are removed right away. Duplicate
+    # copies in other backends are left in place, as they can not be reached
+    # from here.
+    op.execute(
+        """
+        DELETE FROM asset_content c
+        USING asset a, asset_blob b
+        WHERE c.asset_id = a.id
+          AND b.checksum = a.checksum
+          AND b.storage_key <> c.asset_id::text
+        """
+    )
+    op.execute("DELETE FROM asset WHERE checksum IS NULL")
+
+    op.alter_column("asset", "checksum", nullable=False)
+    op.create_foreign_key(
+        op.f("fk_asset_checksum_asset_blob"),
+        "asset",
+        "asset_blob",
+        ["checksum"],
+        ["checksum"],
+    )
+    op.create_index(op.f("ix_asset_checksum"), "asset", ["checksum"])
+    op.drop_column("asset", "storage_key")
+    op.drop_column("asset", "storage_backend")
+
+
+def downgrade() -> None:
+    op.add_column("asset", sa.Column("storage_backend", sa.String(), nullable=True))
+    op.add_column("asset", sa.Column("storage_key", sa.String(), nullable=True))
+    op.execute(
+        """
+        UPDATE asset SET storage_backend = b.storage_backend,
+                         storage_key = b.storage_key
+        FROM asset_blob b
+        WHERE b.checksum = asset.checksum
+        """
+    )
+    op.alter_column("asset", "storage_backend", nullable=False)
+    op.alter_column("asset", "storage_key", nullable=False)
+    op.drop_index(op.f("ix_asset_checksum"), table_name="asset")
+    op.drop_constraint(
+        op.f("fk_asset_checksum_asset_blob"), "asset", type_="foreignkey"
+    )
+    op.alter_column("asset", "checksum", nullable=True)
+    op.drop_table("asset_blob")
+    op.execute("DELETE FROM asset_content WHERE asset_id NOT IN (SELECT id FROM asset)")
+    op.create_foreign_key(
+        "fk_asset_content_asset_id_asset",
+        "asset_content",
+        "asset",
+        ["asset_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
@@ -0,0 +1,80 @@
+"""Retention and compaction of deleted entities
+
+Revision ID: 7c2e4a9d1f35
+Revises: e2a8c5f7b934
+Create Date: 2026-10-19 19:41:08.215530
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "7c2e4a9d1f35"
+down_revision: Union[str, None] = "e2a8c5f7b934"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "entity_definition", sa.Column("retention_days", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "entity",
+        sa.Column("deleted_at", postgresql.TIMESTAMP(timezone=True), nullable=True),
+    )
+    # The retention of entities that were deleted before starts now.
+    op.execute("UPDATE entity SET deleted_at = now() WHERE is_deleted")
+
+    op.create_index(
+        "ix_entity_live_entity_type",
+        "entity",
+        ["entity_type", "id"],
+        postgresql_where=sa.text("NOT is_deleted"),
+    )
+    op.create_index(
+        "ix_entity_deleted_entity_type",
+        "entity",
+        ["entity_type", "deleted_at"],
+        postgresql_where=sa.text("is_deleted"),
+    )
+    op.create_index(
+        "ix_entity_relation_live_target_entity_id",
+        "entity_relation",
+        ["target_entity_id"],
+        postgresql_where=sa.text("NOT is_deleted"),
+    )
+    op.create_index(op.f("ix_attribute_entity_id"), "attribute", ["entity_id"])
+    op.create_index(op.f("ix_asset_entity_id"), "asset", ["entity_id"])
+
+    op.create_table(
+        "entity_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("entity_type", sa.String(), nullable=False),
+        sa.Column("deleted_at", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column(
+            "archived_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("data", postgresql.JSONB(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_entity_archive")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("entity_archive")
+    op.drop_index(op.f("ix_asset_entity_id"), table_name="asset")
+    op.drop_index(op.f("ix_attribute_entity_id"), table_name="attribute")
+    op.drop_index(
+        "ix_entity_relation_live_target_entity_id", table_name="entity_relation"
+    )
+    op.drop_index("ix_entity_deleted_entity_type", table_name="entity")
+    op.drop_index("ix_entity_live_entity_type", table_name="entity")
+    op.drop_column("entity", "deleted_at")
+    op.drop_column("entity_definition", "retention_days")
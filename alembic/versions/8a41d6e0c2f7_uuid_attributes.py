@@ -0,0 +1,29 @@
+"""UUID attributes
+
+Revision ID: 8a41d6e0c2f7
+Revises: 3f9c2a7d1b4e
+Create Date: 2026-10-19 11:03:52.118564
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8a41d6e0c2f7"
+down_revision: Union[str, None] = "3f9c2a7d1b4e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE attribute_type ADD VALUE IF NOT EXISTS 'UUID'")
+    op.execute("ALTER TYPE attribute_type_def ADD VALUE IF NOT EXISTS 'UUID'")
+    op.add_column("attribute", sa.Column("value_uuid", sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    # Postgres can not drop values from an enum type, so only the column is removed.
+    op.drop_column("attribute", "value_uuid")
@@ -0,0 +1,77 @@
+"""Resumable asset uploads
+
+Revision ID: 9b3f6c1e8d20
+Revises: 5d7e2b9f4a16
+Create Date: 2026-10-19 16:52:19.004718
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9b3f6c1e8d20"
+down_revision: Union[str, None] = "5d7e2b9f4a16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Uploaded files can be larger than 2 GiB.
+    op.alter_column(
+        "asset",
+        "file_size",
+        existing_type=sa.Integer(),
+        type_=sa.BigInteger(),
+        existing_nullable=False,
+    )
+    op.create_table(
+        "asset_upload",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("entity_id", sa.UUID(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("mimetype", sa.String(), nullable=False),
+        sa.Column("storage_backend", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["entity_id"],
+            ["entity.id"],
+            name=op.f("fk_asset_upload_entity_id_entity"),
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_asset_upload")),
+    )
+    op.create_index(op.f("ix_asset_upload_expires_at"), "asset_upload", ["expires_at"])
+    op.create_table(
+        "asset_upload_part",
+        sa.Column("upload_id", sa.UUID(), nullable=False),
+        sa.Column("part_number", sa.Integer(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("checksum", sa.String(), nullable=False),
+        sa.Column("storage_key", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["upload_id"],
+            ["asset_upload.id"],
+            name=op.f("fk_asset_upload_part_upload_id_asset_upload"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(
+            "upload_id", "part_number", name=op.f("pk_asset_upload_part")
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("asset_upload_part")
+    op.drop_index(op.f("ix_asset_upload_expires_at"), table_name="asset_upload")
+    op.drop_table("asset_upload")
+    op.alter_column(
+        "asset",
+        "file_size",
+        existing_type=sa.BigInteger(),
+        type_=sa.Integer(),
+        existing_nullable=False,
+    )
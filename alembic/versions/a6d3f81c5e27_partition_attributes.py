@@ -0,0 +1,73 @@
+"""Hash partitioning of attributes by entity
+
+Revision ID: a6d3f81c5e27
+Revises: 4b8d2e6f0a13
+Create Date: 2026-10-19 21:12:37.504291
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d3f81c5e27"
+down_revision: Union[str, None] = "4b8d2e6f0a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Changing the number of partitions means rewriting the table again.
+ATTRIBUTE_PARTITIONS = 16
+
+
+def upgrade() -> None:
+    # The rows are copied into the partitioned table before its keys and
+    # indexes are built, and the old table is dropped first so they can take
+    # over the names of its constraints.
+    op.execute("ALTER TABLE attribute RENAME TO attribute_unpartitioned")
+    op.execute(
+        "CREATE TABLE attribute (LIKE attribute_unpartitioned INCLUDING DEFAULTS)"
+        " PARTITION BY HASH (entity_id)"
+    )
+    for remainder in range(ATTRIBUTE_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE attribute_p{remainder} PARTITION OF attribute"
+            f" FOR VALUES WITH (MODULUS {ATTRIBUTE_PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute("INSERT INTO attribute SELECT * FROM attribute_unpartitioned")
+    op.execute("DROP TABLE attribute_unpartitioned")
+
+    op.create_primary_key(op.f("pk_attribute"), "attribute", ["entity_id", "id"])
+    op.create_foreign_key(
+        op.f("fk_attribute_entity_id_entity"),
+        "attribute",
+        "entity",
+        ["entity_id"],
+        ["id"],
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_attribute_value_geom"
+        " ON attribute USING gist (value_geom)"
+    )
+    op.execute("ANALYZE attribute")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE attribute RENAME TO attribute_partitioned")
+    op.execute("CREATE TABLE attribute (LIKE attribute_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO attribute SELECT * FROM attribute_partitioned")
+    op.execute("DROP TABLE attribute_partitioned")
+
+    op.create_primary_key(op.f("pk_attribute"), "attribute", ["id"])
+    op.create_foreign_key(
+        op.f("fk_attribute_entity_id_entity"),
+        "attribute",
+        "entity",
+        ["entity_id"],
+        ["id"],
+    )
+    op.create_index(op.f("ix_attribute_entity_id"), "attribute", ["entity_id"])
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_attribute_value_geom"
+        " ON attribute USING gist (value_geom)"
+    )
@@ -0,0 +1,40 @@
+"""Asset storage backends
+
+Revision ID: c41b7e93d2a5
+Revises: 8a41d6e0c2f7
+Create Date: 2026-10-19 13:27:40.581903
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c41b7e93d2a5"
+down_revision: Union[str, None] = "8a41d6e0c2f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing content stays in asset_content and is read by the database backend.
+    op.add_column(
+        "asset",
+        sa.Column(
+            "storage_backend",
+            sa.String(),
+            nullable=False,
+            server_default="database",
+        ),
+    )
+    op.add_column("asset", sa.Column("storage_key", sa.String(), nullable=True))
+    op.execute("UPDATE asset SET storage_key = id::text")
+    op.alter_column("asset", "storage_key", nullable=False)
+    op.alter_column("asset", "storage_backend", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("asset", "storage_key")
+    op.drop_column("asset", "storage_backend")
@@ -0,0 +1,111 @@
+"""Change feed of entities
+
+Revision ID: d8e1b4a7c392
+Revises: a6d3f81c5e27
+Create Date: 2026-10-19 22:03:14.881907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "d8e1b4a7c392"
+down_revision: Union[str, None] = "a6d3f81c5e27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "entity_change",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column(
+            "transaction_id",
+            sa.BigInteger(),
+            server_default=sa.text("pg_current_xact_id()::text::bigint"),
+            nullable=False,
+        ),
+        sa.Column("entity_id", sa.UUID(), nullable=False),
+        sa.Column("entity_type", sa.String(), nullable=False),
+        sa.Column("operation", sa.String(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column(
+            "changed_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_entity_change")),
+    )
+    op.create_index(
+        "ix_entity_change_position", "entity_change", ["transaction_id", "id"]
+    )
+    op.create_index("ix_entity_change_changed_at", "entity_change", ["changed_at"])
+
+    # Every write to entities records its changes, whichever path made it.
+    op.execute(
+        """
+        CREATE FUNCTION record_entity_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            operation text;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                IF NOT NEW.is_deleted THEN
+                    operation := 'create';
+                END IF;
+            ELSIF NEW.is_deleted AND NOT OLD.is_deleted THEN
+                operation := 'delete';
+            ELSIF NOT NEW.is_deleted AND NEW.version <> OLD.version THEN
+                operation := 'update';
+            END IF;
+            IF operation IS NOT NULL THEN
+                INSERT INTO entity_change (entity_id, entity_type, operation, version)
+                VALUES (NEW.id, NEW.entity_type, operation, NEW.version);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER record_entity_change
+        AFTER INSERT OR UPDATE OF is_deleted, version ON entity
+        FOR EACH ROW EXECUTE FUNCTION record_entity_change()
+        """
+    )
+    # One notification per statement, which PostgreSQL delivers on commit
+    # and folds together within a transaction; listeners read the rows.
+    op.execute(
+        """
+        CREATE FUNCTION notify_entity_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('entity_change', '');
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER notify_entity_change
+        AFTER INSERT ON entity_change
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_entity_change()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER notify_entity_change ON entity_change")
+    op.execute("DROP FUNCTION notify_entity_change()")
+    op.execute("DROP TRIGGER record_entity_change ON entity")
+    op.execute("DROP FUNCTION record_entity_change()")
+    op.drop_index("ix_entity_change_changed_at", table_name="entity_change")
+    op.drop_index("ix_entity_change_position", table_name="entity_change")
+    op.drop_table("entity_change")
@@ -0,0 +1,44 @@
+"""Compressed asset content
+
+Revision ID: e2a8c5f7b934
+Revises: 9b3f6c1e8d20
+Create Date: 2026-10-19 18:03:44.661902
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a8c5f7b934"
+down_revision: Union[str, None] = "9b3f6c1e8d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "asset_blob", sa.Column("content_encoding", sa.String(), nullable=True)
+    )
+    op.add_column(
+        "asset_blob", sa.Column("stored_size", sa.BigInteger(), nullable=True)
+    )
+    op.execute("UPDATE asset_blob SET stored_size = size")
+
+
+def downgrade() -> None:
+    # Compressed content can not be read without the codec, so refuse to lose it.
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM asset_blob WHERE content_encoding IS NOT NULL) THEN
+                RAISE EXCEPTION 'asset_blob holds compressed content';
+            END IF;
+        END $$
+        """
+    )
+    op.drop_column("asset_blob", "stored_size")
+    op.drop_column("asset_blob", "content_encoding")
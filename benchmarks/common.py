@@ -0,0 +1,67 @@
+import random
+import statistics
+import string
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from eav_backend.models import AttributeType
+from eav_backend.registry import AttributeSnapshot, EntityDefinitionSnapshot
+from eav_backend.schemas.entity_definition import EntityDefinitionRequest
+
+
+def sample_value(attribute: AttributeSnapshot, rng: random.Random) -> Any:
+    match attribute.type:
+        case AttributeType.INTEGER:
+            return rng.randint(0, 1_000_000)
+        case AttributeType.FLOAT:
+            return rng.uniform(0, 1_000)
+        case AttributeType.BOOLEAN:
+            return rng.random() < 0.5
+        case AttributeType.DATE:
+            return (date(2020, 1, 1) + timedelta(days=rng.randint(0, 2000))).isoformat()
+        case AttributeType.ENUM:
+            return rng.choice(attribute.allowed_values or ["A", "B", "C"])
+        case AttributeType.UUID:
+            return str(uuid.UUID(int=rng.getrandbits(128)))
+        case AttributeType.GEOMETRY:
+            return {
+                "type": "Point",
+                "coordinates": [rng.uniform(-180, 180), rng.uniform(-90, 90)],
+            }
+        case _:
+            return "".join(rng.choices(string.ascii_letters + " ", k=24))
+
+
+def sample_payload(
+    ed: EntityDefinitionSnapshot, rng: random.Random, children: int = 0
+) -> dict[str, Any]:
+    """A request body for an entity definition, with `children` entities per relation."""
+    payload = {attr.name: sample_value(attr, rng) for attr in ed.attributes}
+    if children:
+        for relation in ed.relations:
+            payload[relation.collection_name] = [
+                sample_payload(relation.target, rng, children - 1)
+                for _ in range(children)
+            ]
+    return payload
+
+
+def load_definitions(directory: Path) -> dict[str, EntityDefinitionRequest]:
+    """The entity definition files of a directory, like examples/entities, by name."""
+    definitions = [
+        EntityDefinitionRequest.model_validate_json(path.read_text())
+        for path in sorted(directory.glob("*.json"))
+    ]
+    return {definition.name: definition for definition in definitions}
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "mean": statistics.fmean(samples),
+    }
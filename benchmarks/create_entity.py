@@ -0,0 +1,115 @@
+"""
+Latency benchmark of entity creation against the configured database.
+
+Creates entities through EntityService.create_entity, or through the session
+unit of work it replaced (`--mode orm`), and reports latency percentiles and
+statements per create. Entity definitions must already be imported.
+
+    python -m benchmarks.create_entity --definition Event --parent Project --requests 2000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from fastapi import FastAPI
+
+from eav_backend.builders.EntityBuilder import EntityBuilder
+from eav_backend.database import SessionLocal
+from eav_backend.models import Entity, EntityRelation
+from eav_backend.registry import DefinitionRegistry
+from eav_backend.services.dynamic_model_service import DynamicModelService
+from eav_backend.services.entity_definition_service import EntityDefinitionService
+from eav_backend.services.entity_service import EntityService
+from eav_backend.util.query_budget import count_statements
+from benchmarks.common import sample_payload, percentiles
+
+
+def create_with_service(session, ed, item, relations, relation_collection):
+    entity = EntityService(session).create_entity(
+        EntityBuilder.to_entity(ed, item), relations, relation_collection
+    )
+    return EntityBuilder.to_dict(entity, ed)
+
+
+def create_with_orm(session, ed, item, relations, relation_collection):
+    entity = EntityBuilder.to_entity(ed, item)
+    session.add(entity)
+    session.flush()
+    if relations:
+        parent = session.get(Entity, list(relations.values())[-1])
+        parent.relations.append(
+            EntityRelation(target_entity=entity, collection_name=relation_collection)
+        )
+    session.commit()
+    return EntityBuilder.to_dict(entity, ed)
+
+
+MODES = {"service": create_with_service, "orm": create_with_orm}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--definition", required=True)
+    parser.add_argument("--parent", help="Create the entities under a new parent")
+    parser.add_argument("--children", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--mode", choices=MODES, default="service")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    session = SessionLocal()
+    registry = DefinitionRegistry.from_entity_definitions(
+        EntityDefinitionService(session).get_entity_definitions()
+    )
+    models = DynamicModelService(None, FastAPI())
+    ed = registry.get(args.definition)
+    request_model = models.build_model(ed).request_model
+
+    relations, relation_collection = {}, None
+    if args.parent:
+        parent = registry.get(args.parent)
+        relation_collection = next(
+            r.collection_name for r in parent.relations if r.target.name == ed.name
+        )
+        parent_entity = EntityService(session).create_entity(
+            EntityBuilder.to_entity(
+                parent,
+                models.build_model(parent).request_model.model_validate(
+                    sample_payload(parent, rng)
+                ),
+            ),
+            {},
+        )
+        relations = {parent.identifier: str(parent_entity.id)}
+
+    create = MODES[args.mode]
+    latencies, statements = [], []
+    for _ in range(args.requests):
+        item = request_model.model_validate(sample_payload(ed, rng, args.children))
+        with count_statements() as counter:
+            start = time.perf_counter()
+            create(session, ed, item, relations, relation_collection)
+            latencies.append((time.perf_counter() - start) * 1000)
+        statements.append(counter.statements)
+        session.expunge_all()
+    session.close()
+
+    print(
+        json.dumps(
+            {
+                "mode": args.mode,
+                "definition": args.definition,
+                "requests": args.requests,
+                "latency_ms": percentiles(latencies),
+                "statements_per_create": sum(statements) / len(statements),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
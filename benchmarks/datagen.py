@@ -0,0 +1,445 @@
+"""
+Synthetic dataset generator driven by entity definition files.
+
+Reads EntityDefinitionRequest JSON files (like examples/entities) and generates
+`--count` entities of a root definition with their related entities, with
+values that follow the attribute types, relation fan-out, a ratio of soft
+deleted entities and assets of a range of sizes. Entities are written either
+as NDJSON (one file per batch, one entity per line, parents before their
+children) or straight into the configured database with COPY, in which case
+the definitions must be imported and asset content goes to the configured
+storage backend.
+
+Every root entity is generated from its own seed, so the output only depends
+on `--seed` and not on the number of `--workers` or the batch size.
+
+    python -m benchmarks.datagen --definitions examples/entities --root Project --count 100000 \\
+        --fanout 2-5 --fanout-for incidents=0-20 --deleted-ratio 0.05 \\
+        --geometry clustered --bbox 4,57,31,71 --assets 0-2 --asset-size 1024-262144 \\
+        --output db --workers 8
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from eav_backend.models import AttributeType
+from eav_backend.models.attribute_codec import codec_for_type
+from eav_backend.schemas.entity_definition import EntityDefinitionRequest
+from benchmarks.common import sample_value, load_definitions
+
+GEOMETRY_DISTRIBUTIONS = ["uniform", "clustered"]
+ASSET_MIMETYPE = "application/octet-stream"
+
+
+@dataclass
+class GeneratedAsset:
+    id: uuid.UUID
+    name: str
+    content: bytes
+
+
+@dataclass
+class GeneratedEntity:
+    id: uuid.UUID
+    entity_type: str
+    is_deleted: bool
+    attributes: dict[str, tuple[AttributeType, Any]]
+    parent_id: Optional[uuid.UUID] = None
+    collection_name: Optional[str] = None
+    assets: list[GeneratedAsset] = field(default_factory=list)
+
+
+def parse_range(value: str) -> tuple[int, int]:
+    """Parses `N` or `MIN-MAX`."""
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def parse_bbox(value: str) -> tuple[float, float, float, float]:
+    min_x, min_y, max_x, max_y = (float(v) for v in value.split(","))
+    return min_x, min_y, max_x, max_y
+
+
+class Generator:
+    def __init__(self, definitions: dict[str, EntityDefinitionRequest], args):
+        self.definitions = definitions
+        self.fanout = parse_range(args.fanout)
+        self.fanout_for = {
+            collection: parse_range(fanout)
+            for collection, fanout in (f.split("=") for f in args.fanout_for)
+        }
+        self.max_depth = args.max_depth
+        self.deleted_ratio = args.deleted_ratio
+        self.optional_ratio = args.optional_ratio
+        self.geometry = args.geometry
+        self.bbox = parse_bbox(args.bbox)
+        self.polygon_ratio = args.polygon_ratio
+        self.assets = parse_range(args.assets)
+        self.asset_size = parse_range(args.asset_size)
+
+        rng = random.Random(f"{args.seed}:clusters")
+        min_x, min_y, max_x, max_y = self.bbox
+        self.clusters = [
+            (rng.uniform(min_x, max_x), rng.uniform(min_y, max_y))
+            for _ in range(args.clusters)
+        ]
+        self.cluster_spread = min(max_x - min_x, max_y - min_y) / 50
+
+    def point(self, rng: random.Random) -> tuple[float, float]:
+        min_x, min_y, max_x, max_y = self.bbox
+        if self.geometry == "clustered":
+            center_x, center_y = rng.choice(self.clusters)
+            x = rng.gauss(center_x, self.cluster_spread)
+            y = rng.gauss(center_y, self.cluster_spread)
+        else:
+            x, y = rng.uniform(min_x, max_x), rng.uniform(min_y, max_y)
+        return min(max(x, min_x), max_x), min(max(y, min_y), max_y)
+
+    def geometry_value(self, rng: random.Random) -> dict[str, Any]:
+        x, y = self.point(rng)
+        if rng.random() >= self.polygon_ratio:
+            return {"type": "Point", "coordinates": [x, y]}
+        size = self.cluster_spread * rng.uniform(0.01, 0.1)
+        ring = [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+        return {"type": "Polygon", "coordinates": [ring]}
+
+    def value(self, attribute, rng: random.Random) -> Any:
+        if attribute.type == AttributeType.GEOMETRY:
+            return self.geometry_value(rng)
+        value = sample_value(attribute, rng)
+        if attribute.type == AttributeType.DATE:
+            return date.fromisoformat(value)
+        if attribute.type == AttributeType.UUID:
+            return uuid.UUID(value)
+        return value
+
+    def entities(
+        self,
+        definition: EntityDefinitionRequest,
+        rng: random.Random,
+        parent: Optional[GeneratedEntity] = None,
+        collection_name: Optional[str] = None,
+        depth: int = 0,
+    ) -> Iterator[GeneratedEntity]:
+        attributes = {
+            attr.name: (attr.type, self.value(attr, rng))
+            for attr in definition.required_attributes
+        }
+        for attr in definition.optional_attributes:
+            if rng.random() < self.optional_ratio:
+                attributes[attr.name] = (attr.type, self.value(attr, rng))
+
+        entity = GeneratedEntity(
+            id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            entity_type=definition.name,
+            is_deleted=rng.random() < self.deleted_ratio,
+            attributes=attributes,
+            parent_id=parent.id if parent else None,
+            collection_name=collection_name,
+        )
+        if definition.supports_assets:
+            for i in range(rng.randint(*self.assets)):
+                entity.assets.append(
+                    GeneratedAsset(
+                        id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                        name=f"{definition.name.lower()}-{i}.bin",
+                        content=rng.randbytes(rng.randint(*self.asset_size)),
+                    )
+                )
+        yield entity
+
+        if depth >= self.max_depth:
+            return
+        for relation in definition.related_entities:
+            fanout = self.fanout_for.get(relation.collection_name, self.fanout)
+            for _ in range(rng.randint(*fanout)):
+                yield from self.entities(
+                    self.definitions[relation.entity],
+                    rng,
+                    entity,
+                    relation.collection_name,
+                    depth + 1,
+                )
+
+    def root_entities(self, root: str, index: int, seed: int):
+        rng = random.Random(f"{seed}:{index}")
+        return self.entities(self.definitions[root], rng)
+
+
+def json_value(value: Any) -> Any:
+    if isinstance(value, (date, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def write_ndjson(path: Path, entities: Iterator[GeneratedEntity]) -> int:
+    written = 0
+    with path.open("w") as file:
+        for entity in entities:
+            record = {
+                "id": str(entity.id),
+                "entity_type": entity.entity_type,
+                "is_deleted": entity.is_deleted,
+                "parent_id": str(entity.parent_id) if entity.parent_id else None,
+                "collection_name": entity.collection_name,
+                "attributes": {
+                    name: json_value(value)
+                    for name, (_, value) in entity.attributes.items()
+                },
+                "assets": [
+                    {
+                        "id": str(asset.id),
+                        "name": asset.name,
+                        "mimetype": ASSET_MIMETYPE,
+                        "size": len(asset.content),
+                        "checksum": hashlib.sha256(asset.content).hexdigest(),
+                    }
+                    for asset in entity.assets
+                ],
+            }
+            file.write(json.dumps(record) + "\n")
+            written += 1
+    return written
+
+
+def copy_text(value: Any) -> str:
+    """A value in the text format of COPY."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, dict):
+        return f"SRID=4326;{wkt(value)}"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def wkt(geometry: dict[str, Any]) -> str:
+    if geometry["type"] == "Point":
+        x, y = geometry["coordinates"]
+        return f"POINT({x} {y})"
+    ring = ", ".join(f"{x} {y}" for x, y in geometry["coordinates"][0])
+    return f"POLYGON(({ring}))"
+
+
+class CopyBuffer:
+    def __init__(self, table: str, columns: list[str]):
+        self.table = table
+        self.columns = columns
+        self.buffer = io.StringIO()
+
+    def add(self, *values: Any):
+        self.buffer.write("\t".join(copy_text(v) for v in values) + "\n")
+
+    def copy(self, cursor):
+        self.buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN",
+            self.buffer,
+        )
+
+
+def write_database(entities: Iterator[GeneratedEntity]) -> int:
+    from eav_backend.database import engine
+    from eav_backend.services.entity_service import attribute_columns
+    from eav_backend.storage import get_asset_storage
+
+    columns = attribute_columns()
+    value_columns = sorted({columns[codec_for_type(t).column] for t in AttributeType})
+    entity_rows = CopyBuffer(
+        "entity", ["id", "entity_type", "is_deleted", "deleted_at"]
+    )
+    attribute_rows = CopyBuffer(
+        "attribute", ["id", "entity_id", "name", "type"] + value_columns
+    )
+    relation_rows = CopyBuffer(
+        "entity_relation",
+        ["source_entity_id", "target_entity_id", "collection_name", "is_deleted"],
+    )
+    blob_rows = CopyBuffer(
+        "asset_blob",
+        [
+            "checksum",
+            "size",
+            "mimetype",
+            "stored_size",
+            "storage_backend",
+            "storage_key",
+            "ref_count",
+            "created_at",
+        ],
+    )
+    asset_rows = CopyBuffer(
+        "asset",
+        [
+            "id",
+            "name",
+            "mimetype",
+            "file_size",
+            "checksum",
+            "entity_id",
+            "created_at",
+            "updated_at",
+        ],
+    )
+
+    storage = get_asset_storage()
+    now = datetime.now()
+    written, checksums = 0, set()
+    for entity in entities:
+        entity_rows.add(
+            entity.id,
+            entity.entity_type,
+            entity.is_deleted,
+            now if entity.is_deleted else None,
+        )
+        for name, (attribute_type, value) in entity.attributes.items():
+            column = columns[codec_for_type(attribute_type).column]
+            attribute_rows.add(
+                uuid.uuid5(entity.id, name),
+                entity.id,
+                name,
+                attribute_type.name,
+                *(value if c == column else None for c in value_columns),
+            )
+        if entity.parent_id:
+            relation_rows.add(
+                entity.parent_id, entity.id, entity.collection_name, entity.is_deleted
+            )
+        for asset in entity.assets:
+            stored = storage.write(io.BytesIO(asset.content))
+            if stored.checksum not in checksums:
+                checksums.add(stored.checksum)
+                blob_rows.add(
+                    stored.checksum,
+                    stored.size,
+                    ASSET_MIMETYPE,
+                    stored.stored_size,
+                    storage.name,
+                    stored.key,
+                    1,
+                    now,
+                )
+            asset_rows.add(
+                asset.id,
+                asset.name,
+                ASSET_MIMETYPE,
+                stored.size,
+                stored.checksum,
+                entity.id,
+                now,
+                now,
+            )
+        written += 1
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            for rows in (entity_rows, attribute_rows, relation_rows, blob_rows):
+                rows.copy(cursor)
+            asset_rows.copy(cursor)
+        connection.commit()
+    finally:
+        connection.close()
+    return written
+
+
+_generator: Optional[Generator] = None
+
+
+def init_worker(definitions: Path, args):
+    global _generator
+    _generator = Generator(load_definitions(definitions), args)
+    if args.output == "db":
+        from eav_backend.database import engine
+
+        # Connections inherited from the parent process must not be shared.
+        engine.dispose(close=False)
+
+
+def generate_batch(args, batch: int, start: int, stop: int) -> int:
+    entities = (
+        entity
+        for index in range(start, stop)
+        for entity in _generator.root_entities(args.root, index, args.seed)
+    )
+    if args.output == "db":
+        return write_database(entities)
+    return write_ndjson(args.out / f"part-{batch:05d}.ndjson", entities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--definitions", type=Path, required=True)
+    parser.add_argument("--root", required=True, help="Definition to generate")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--fanout", default="0-3", help="Entities per relation")
+    parser.add_argument(
+        "--fanout-for",
+        nargs="*",
+        default=[],
+        metavar="COLLECTION=RANGE",
+        help="Fan-out of a relation collection",
+    )
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--deleted-ratio", type=float, default=0.0)
+    parser.add_argument("--optional-ratio", type=float, default=0.5)
+    parser.add_argument("--geometry", choices=GEOMETRY_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--bbox", default="-180,-90,180,90", help="minx,miny,maxx,maxy")
+    parser.add_argument("--clusters", type=int, default=20)
+    parser.add_argument("--polygon-ratio", type=float, default=0.0)
+    parser.add_argument("--assets", default="0", help="Assets per entity")
+    parser.add_argument("--asset-size", default="1024-65536", help="Bytes")
+    parser.add_argument("--output", choices=["ndjson", "db"], default="ndjson")
+    parser.add_argument("--out", type=Path, default=Path("data/generated"))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.output == "ndjson":
+        args.out.mkdir(parents=True, exist_ok=True)
+    batches = [
+        (i, start, min(start + args.batch_size, args.count))
+        for i, start in enumerate(range(0, args.count, args.batch_size))
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        args.workers, initializer=init_worker, initargs=(args.definitions, args)
+    ) as pool:
+        futures = [pool.submit(generate_batch, args, *batch) for batch in batches]
+        written = sum(future.result() for future in futures)
+    elapsed = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {
+                "root": args.root,
+                "roots": args.count,
+                "entities": written,
+                "output": str(args.out) if args.output == "ndjson" else "db",
+                "seconds": round(elapsed, 3),
+                "entities_per_second": round(written / elapsed, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Synthetic entity definitions for the load benchmarks.
+
+Writes a chain of `--depth` definitions (Bench0 with a collection of Bench1,
+which has a collection of Bench2, ...) in the format of examples/entities,
+each with `--width` attributes of all attribute types. The files are numbered
+so that importing them in order creates the related definitions first:
+
+    python -m benchmarks.definitions --width 20 --depth 3 --out data/bench/entities
+    IMPORT_ENTITIES=true IMPORT_CONFIG=data/bench/entities ENABLE_METRICS=true python -m eav_backend
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+from eav_backend.models import AttributeType
+
+ALL_ENDPOINTS = ["LIST", "GET", "POST", "PUT", "DELETE"]
+ATTRIBUTE_TYPES = list(AttributeType)
+
+
+def definition_name(level: int) -> str:
+    return f"Bench{level}"
+
+
+def collection_name(level: int) -> str:
+    return f"bench{level}s"
+
+
+def attribute(index: int) -> dict[str, Any]:
+    attribute_type = ATTRIBUTE_TYPES[index % len(ATTRIBUTE_TYPES)]
+    definition = {
+        "name": f"{attribute_type.lower()}_{index}",
+        "type": attribute_type,
+        "includeInSummary": index < 2,
+    }
+    if attribute_type == AttributeType.ENUM:
+        definition["allowed_values"] = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+    return definition
+
+
+def synthetic_definitions(
+    width: int, depth: int, assets: bool = True
+) -> list[dict[str, Any]]:
+    """
+    Definitions of `depth` levels, leaf first. Half of the attributes of each
+    level are required, like the name and description of the examples, and
+    the others optional. The leaf supports assets, like the Incident example.
+    """
+    attributes = [attribute(i) for i in range(width)]
+    required = (width + 1) // 2
+
+    definitions = []
+    for level in reversed(range(depth)):
+        related = []
+        if level < depth - 1:
+            related.append(
+                {
+                    "entity": definition_name(level + 1),
+                    "collection_name": collection_name(level + 1),
+                    "apiEndpoints": ALL_ENDPOINTS,
+                }
+            )
+        definitions.append(
+            {
+                "name": definition_name(level),
+                "collection_name": collection_name(level),
+                "apiEndpoints": ALL_ENDPOINTS if level == 0 else [],
+                "returnSummaryOnCollection": True,
+                "supportsAssets": assets and level == depth - 1,
+                "requiredAttributes": attributes[:required],
+                "optionalAttributes": attributes[required:],
+                "relatedEntities": related,
+            }
+        )
+    return definitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--no-assets", action="store_true")
+    parser.add_argument("--out", type=Path, default=Path("data/bench/entities"))
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    definitions = synthetic_definitions(args.width, args.depth, not args.no_assets)
+    for i, definition in enumerate(definitions):
+        path = args.out / f"{i:02d}_{definition['name'].lower()}.json"
+        path.write_text(json.dumps(definition, indent=2))
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
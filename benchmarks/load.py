@@ -0,0 +1,361 @@
+"""
+Load test of the generated endpoints of a running backend.
+
+Drives the LIST, GET, POST, PUT and DELETE endpoints of a definition and the
+asset endpoints of the definition at the end of its relations, one scenario
+after the other, each with `--requests` requests at a fixed `--concurrency`.
+Reports latency percentiles, throughput and the database statements per
+request, which are read from /metrics (start the backend with
+ENABLE_METRICS=true). The definitions are read from the files they were
+imported from, see benchmarks.definitions:
+
+    python -m benchmarks.load --url http://localhost:8080 --definitions data/bench/entities \\
+        --entity Bench0 --concurrency 16 --requests 2000 --out load.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+from eav_backend.schemas.entity_definition import EntityDefinitionRequest
+from benchmarks.common import sample_value, percentiles, load_definitions
+
+METRIC_LINE = re.compile(
+    r"^eav_db_statements_per_request_(sum|count)\{(.*)\} ([0-9.e+-]+)$"
+)
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    body: Optional[bytes] = None
+    content_type: str = "application/json"
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    handler: str  # path template, as in the metrics
+    request: Callable[[int], Request]
+    collect: Optional[Callable[[dict], None]] = None
+    # The number of requests the scenario can make, negative if unlimited
+    available: Optional[Callable[[], int]] = None
+
+
+class Client:
+    """A keep-alive HTTP connection per worker thread."""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connect = lambda: connection_class(parts.netloc, timeout=60)
+        self.root = parts.path.rstrip("/")
+        self.connection = self.connect()
+
+    def send(self, request: Request) -> tuple[int, bytes]:
+        headers = {"Content-Type": request.content_type} if request.body else {}
+        try:
+            self.connection.request(
+                request.method, self.root + request.path, request.body, headers
+            )
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            self.connection = self.connect()
+            raise
+
+    def json(self, method: str, path: str, body: Any = None) -> Any:
+        status, content = self.send(
+            Request(method, path, json.dumps(body).encode() if body else None)
+        )
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} returned {status}: {content[:200]}")
+        return json.loads(content) if content else None
+
+
+def payload(definition: EntityDefinitionRequest, rng: random.Random) -> bytes:
+    attributes = definition.required_attributes + definition.optional_attributes
+    return json.dumps(
+        {attr.name: sample_value(attr, rng) for attr in attributes}
+    ).encode()
+
+
+def multipart(name: str, content: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        + content
+        + f"\r\n--{boundary}--\r\n".encode()
+    )
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def read_statements(client: Client) -> dict[tuple[str, str], list[float]]:
+    """The sum and count of statements per request, by method and handler."""
+    status, content = client.send(Request("GET", "/metrics"))
+    totals = {}
+    if status != 200:
+        return totals
+    for line in content.decode().splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        kind, labels, value = match.groups()
+        labels = dict(LABEL.findall(labels))
+        total = totals.setdefault((labels["method"], labels["handler"]), [0.0, 0.0])
+        total[0 if kind == "sum" else 1] += float(value)
+    return totals
+
+
+def run_scenario(
+    url: str, scenario: Scenario, requests: int, concurrency: int
+) -> dict[str, Any]:
+    counter = itertools.count()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker():
+        client = Client(url)
+        while (i := next(counter)) < requests:
+            request = scenario.request(i)
+            start = time.perf_counter()
+            try:
+                status, content = client.send(request)
+            except (http.client.HTTPException, OSError):
+                status, content = 599, b""
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors[0] += 1
+            if status < 400 and scenario.collect and content:
+                scenario.collect(json.loads(content))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {k: round(v, 3) for k, v in percentiles(latencies).items()},
+    }
+
+
+def build_scenarios(
+    client: Client,
+    definitions: dict[str, EntityDefinitionRequest],
+    root: EntityDefinitionRequest,
+    working_set: int,
+    asset_size: int,
+    rng: random.Random,
+) -> list[Scenario]:
+    """
+    Creates a working set of root entities, each with a chain of related
+    entities down to the last definition, and the scenarios that use them.
+    """
+    chain = [root]
+    while chain[-1].related_entities:
+        chain.append(definitions[chain[-1].related_entities[0].entity])
+
+    base = f"/v1/{root.collection_name}"
+    item = f"{base}/{{{root.name.lower()}}}"
+    roots, created, leaves, assets = [], [], [], []
+    for _ in range(working_set):
+        entity = client.json("POST", base, json.loads(payload(root, rng)))
+        path = f"{base}/{entity['id']}"
+        roots.append(path)
+        for parent, child in zip(chain, chain[1:]):
+            collection = f"{path}/{parent.related_entities[0].collection_name}"
+            entity = client.json("POST", collection, json.loads(payload(child, rng)))
+            path = f"{collection}/{entity['id']}"
+        leaves.append(path)
+
+    scenarios = [
+        Scenario(
+            "post",
+            "POST",
+            base,
+            lambda i: Request("POST", base, payload(root, rng)),
+            lambda body: created.append(f"{base}/{body['id']}"),
+        ),
+        Scenario("list", "GET", base, lambda i: Request("GET", base)),
+        Scenario("get", "GET", item, lambda i: Request("GET", roots[i % len(roots)])),
+        Scenario(
+            "put",
+            "PUT",
+            item,
+            lambda i: Request("PUT", roots[i % len(roots)], payload(root, rng)),
+        ),
+    ]
+
+    if len(chain) > 1:
+        relation = root.related_entities[0].collection_name
+        scenarios.append(
+            Scenario(
+                "list_related",
+                "GET",
+                f"{item}/{relation}",
+                lambda i: Request("GET", f"{roots[i % len(roots)]}/{relation}"),
+            )
+        )
+
+    if chain[-1].supports_assets:
+        leaf = "/".join(
+            [base]
+            + [
+                f"{{{parent.name.lower()}}}/{parent.related_entities[0].collection_name}"
+                for parent in chain[:-1]
+            ]
+            + [f"{{{chain[-1].name.lower()}}}/assets"]
+        )
+        content = rng.randbytes(asset_size)
+
+        def upload(i: int) -> Request:
+            body, content_type = multipart(f"asset-{i}.bin", content)
+            return Request(
+                "POST", f"{leaves[i % len(leaves)]}/assets", body, content_type
+            )
+
+        scenarios += [
+            Scenario(
+                "asset_upload",
+                "POST",
+                leaf,
+                upload,
+                lambda body: assets.append(f"/assets/{body['id']}"),
+            ),
+            Scenario(
+                "asset_list",
+                "GET",
+                leaf,
+                lambda i: Request("GET", f"{leaves[i % len(leaves)]}/assets"),
+            ),
+            Scenario(
+                "asset_download",
+                "GET",
+                "/assets/{asset_id}",
+                lambda i: Request("GET", assets[i % len(assets)]),
+                available=lambda: len(assets) and -1,
+            ),
+        ]
+
+    # Deletes the entities the post scenario created, each once.
+    scenarios.append(
+        Scenario(
+            "delete",
+            "DELETE",
+            item,
+            lambda i: Request("DELETE", created.pop()),
+            available=lambda: len(created),
+        )
+    )
+    return scenarios
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--definitions", type=Path, required=True)
+    parser.add_argument("--entity", required=True)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--working-set", type=int, default=50)
+    parser.add_argument("--asset-size", type=int, default=64 * 1024)
+    parser.add_argument("--scenarios", nargs="*", help="Only run these scenarios")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="Write the results to a file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    client = Client(args.url)
+    definitions = load_definitions(args.definitions)
+    scenarios = build_scenarios(
+        client,
+        definitions,
+        definitions[args.entity],
+        args.working_set,
+        args.asset_size,
+        rng,
+    )
+
+    results = {}
+    for scenario in scenarios:
+        if args.scenarios and scenario.name not in args.scenarios:
+            continue
+        requests = args.requests
+        if scenario.available:
+            available = scenario.available()
+            if available == 0:
+                print(f"{scenario.name}: skipped, nothing to request", flush=True)
+                continue
+            if available > 0:
+                requests = min(requests, available)
+        before = read_statements(client)
+        result = run_scenario(args.url, scenario, requests, args.concurrency)
+        after = read_statements(client)
+        key = (scenario.method, scenario.handler)
+        statements, count = (
+            a - b for a, b in zip(after.get(key, [0, 0]), before.get(key, [0, 0]))
+        )
+        result["statements_per_request"] = (
+            round(statements / count, 2) if count else None
+        )
+        results[scenario.name] = result
+        print(f"{scenario.name}: {json.dumps(result)}", flush=True)
+
+    report = json.dumps(
+        {
+            "commit": git_commit(),
+            "entity": args.entity,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "scenarios": results,
+        },
+        indent=2,
+    )
+    if args.out:
+        args.out.write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Microbenchmarks of the builder and serialisation layer.
+
+Times EntityBuilder.to_entity, to_dict and diff, the Attribute.value property
+against the codecs, DynamicModelService.build_model and the dispatch of the
+endpoints made by create_endpoint_wrapper, in memory, on synthetic definitions
+(see benchmarks.definitions) of each `--widths` and `--depths`. Each case is
+run `--repeat` times and the fastest run is reported.
+
+    python -m benchmarks.micro --out before.json
+    python -m benchmarks.micro --compare before.json --threshold 0.1
+
+With `--compare`, cases that got slower by more than the threshold are listed
+and the exit status is 1.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from fastapi import FastAPI
+
+from eav_backend.builders.EntityBuilder import EntityBuilder
+from eav_backend.models import Attribute, AttributeType
+from eav_backend.models.attribute_codec import codec_for_type
+from eav_backend.registry import DefinitionRegistry, EntityDefinitionSnapshot
+from eav_backend.schemas.entity_definition import EntityDefinitionRequest
+from eav_backend.services.dynamic_model_service import DynamicModelService
+from eav_backend.util.endpoint_utils import create_endpoint_wrapper
+from benchmarks.common import sample_value
+from benchmarks.definitions import synthetic_definitions, definition_name
+
+FANOUT = 2
+
+
+def registry(definitions: list[dict]) -> DefinitionRegistry:
+    """A registry of definition files, without a database."""
+    built = {}
+    for definition in definitions:
+        request = EntityDefinitionRequest.model_validate(definition)
+        built[request.name] = SimpleNamespace(
+            id=uuid.uuid5(uuid.NAMESPACE_OID, request.name),
+            name=request.name,
+            hash=hashlib.md5(json.dumps(definition).encode()).hexdigest(),
+            collection_name=request.collection_name,
+            api_endpoints=request.api_endpoints,
+            return_summary_on_collection=request.return_summary_on_collection,
+            supports_assets=request.supports_assets,
+            required_attributes=request.required_attributes,
+            optional_attributes=request.optional_attributes,
+            entity_relations=[
+                SimpleNamespace(
+                    collection_name=relation.collection_name,
+                    target_entity=built[relation.entity],
+                    api_endpoints=relation.api_endpoints,
+                )
+                for relation in request.related_entities
+            ],
+        )
+    return DefinitionRegistry.from_entity_definitions(built.values())
+
+
+def nested_payload(ed: EntityDefinitionSnapshot, rng: random.Random) -> dict:
+    payload = {attr.name: sample_value(attr, rng) for attr in ed.attributes}
+    for relation in ed.relations:
+        payload[relation.collection_name] = [
+            nested_payload(relation.target, rng) for _ in range(FANOUT)
+        ]
+    return payload
+
+
+def best(run: Callable[[], float], repeat: int) -> float:
+    return min(run() for _ in range(repeat))
+
+
+def builder_cases(ed: EntityDefinitionSnapshot, ops: int, repeat: int) -> dict:
+    rng = random.Random(1)
+    request_model = DynamicModelService(None, FastAPI()).build_model(ed).request_model
+    items = [request_model.model_validate(nested_payload(ed, rng)) for _ in range(ops)]
+
+    def build_model():
+        start = time.perf_counter()
+        for _ in range(max(1, ops // 100)):
+            DynamicModelService(None, FastAPI()).build_model(ed)
+        return (time.perf_counter() - start) / max(1, ops // 100)
+
+    def to_entity():
+        start = time.perf_counter()
+        for item in items:
+            EntityBuilder.to_entity(ed, item)
+        return (time.perf_counter() - start) / ops
+
+    entities = [EntityBuilder.to_entity(ed, item) for item in items]
+
+    def to_dict():
+        start = time.perf_counter()
+        for entity in entities:
+            EntityBuilder.to_dict(entity, ed)
+        return (time.perf_counter() - start) / ops
+
+    def diff():
+        pairs = [
+            (EntityBuilder.to_entity(ed, a), EntityBuilder.to_entity(ed, b))
+            for a, b in zip(items, reversed(items))
+        ]
+        start = time.perf_counter()
+        for to_update, with_new_values in pairs:
+            EntityBuilder.diff(ed, to_update, with_new_values)
+        return (time.perf_counter() - start) / ops
+
+    return {
+        "build_model": best(build_model, repeat),
+        "to_entity": best(to_entity, repeat),
+        "to_dict": best(to_dict, repeat),
+        "diff": best(diff, repeat),
+    }
+
+
+def dispatch_case(ed: EntityDefinitionSnapshot, ops: int, repeat: int) -> float:
+    async def handler(**kwargs):
+        return None
+
+    path_params = [f"{definition_name(i).lower()}" for i in range(3)]
+    endpoint = create_endpoint_wrapper(
+        handler,
+        http_method="GET",
+        path_params=path_params,
+        entity_definition=ed,
+    )
+    kwargs = {param: str(uuid.uuid4()) for param in path_params}
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(ops):
+            await endpoint(service=None, **kwargs)
+        return (time.perf_counter() - start) / ops
+
+    return best(lambda: asyncio.run(run()), repeat)
+
+
+def attribute_value_cases(ops: int, repeat: int) -> dict:
+    """Reads and writes of the Attribute.value property and of the codecs, per type."""
+    rng = random.Random(1)
+    results = {}
+    for attribute_type in AttributeType:
+        codec = codec_for_type(attribute_type)
+        attr = SimpleNamespace(type=attribute_type, allowed_values=None)
+        value = sample_value(attr, rng)
+        if attribute_type == AttributeType.UUID:
+            value = uuid.UUID(value)
+        elif attribute_type == AttributeType.DATE:
+            value = date.fromisoformat(value)
+        count = ops if attribute_type != AttributeType.GEOMETRY else ops // 10
+
+        def timed(fn, read: bool) -> Callable[[], float]:
+            def run():
+                # Fresh attributes for every run, so each write pays the same
+                # cost for the first assignment of the instrumented columns.
+                attributes = [Attribute(name="bench") for _ in range(count)]
+                if read:
+                    for attribute in attributes:
+                        codec.write(attribute, value)
+                start = time.perf_counter()
+                for attribute in attributes:
+                    fn(attribute)
+                return (time.perf_counter() - start) / count
+
+            return run
+
+        cases = {
+            "codec_write": (lambda a: codec.write(a, value), False),
+            "property_write": (lambda a: setattr(a, "value", value), False),
+            "codec_read": (codec.read, True),
+            "property_read": (lambda a: a.value, True),
+        }
+        for case, (fn, read) in cases.items():
+            results[(f"attribute_{case}", attribute_type.value)] = best(
+                timed(fn, read), repeat
+            )
+    return results
+
+
+def run_benchmarks(args) -> list[dict[str, Any]]:
+    results = []
+
+    def add(case: str, seconds: float, **params):
+        results.append({"case": case, **params, "ns_per_op": round(seconds * 1e9, 1)})
+        print(
+            f"{case:<40} {json.dumps(params):<28} {seconds * 1e9:>14.1f} ns/op",
+            file=sys.stderr,
+        )
+
+    for width in args.widths:
+        for depth in args.depths:
+            root = registry(synthetic_definitions(width, depth)).get(definition_name(0))
+            for case, seconds in builder_cases(root, args.ops, args.repeat).items():
+                add(case, seconds, width=width, depth=depth)
+
+    root = registry(synthetic_definitions(1, 1)).get(definition_name(0))
+    add("endpoint_dispatch", dispatch_case(root, args.ops * 10, args.repeat))
+
+    for (case, type), seconds in attribute_value_cases(
+        args.ops * 10, args.repeat
+    ).items():
+        add(case, seconds, type=type)
+    return results
+
+
+def key(result: dict[str, Any]) -> tuple:
+    return tuple((k, v) for k, v in result.items() if k != "ns_per_op")
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> bool:
+    """Prints the change of every case against a baseline, True if none regressed."""
+    previous = {key(result): result["ns_per_op"] for result in baseline}
+    regressed = False
+    for result in results:
+        before = previous.get(key(result))
+        if not before:
+            continue
+        change = result["ns_per_op"] / before - 1
+        flag = ""
+        if change > threshold:
+            flag, regressed = "REGRESSION", True
+        params = {k: v for k, v in key(result)}
+        print(
+            f"{params.pop('case'):<40} {json.dumps(params):<28}"
+            f" {before:>12.1f} -> {result['ns_per_op']:>12.1f} ns/op {change:>+8.1%} {flag}"
+        )
+    return not regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--widths", type=int, nargs="*", default=[5, 20, 50])
+    parser.add_argument("--depths", type=int, nargs="*", default=[1, 3])
+    parser.add_argument("--ops", type=int, default=200, help="Entities per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="Write the results to a file")
+    parser.add_argument("--compare", type=Path, help="Results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)
+    elif not args.out:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
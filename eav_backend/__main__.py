@@ -1,16 +1,29 @@
+import asyncio
 import logging.config
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
+from sqlalchemy import exc
 
 from eav_backend import migrate
 from eav_backend.config import settings
 from eav_backend.database import SessionLocal
-from eav_backend.routes.v1 import admin_routes, asset_routes
+from eav_backend.metrics import DatabaseMetricsMiddleware
+from eav_backend.routes.v1 import admin_routes, asset_routes, change_routes
+from eav_backend.services.asset_service import AssetService
+from eav_backend.services.asset_upload_service import AssetUploadService
+from eav_backend.services.change_feed_service import ChangeFeedService, change_broker
+from eav_backend.services.compaction_service import CompactionService
+from eav_backend.services.definition_migration_service import (
+    definition_migration_runner,
+)
 from eav_backend.services.dynamic_model_service import DynamicModelService
 from eav_backend.services.entity_definition_service import EntityDefinitionService
 from eav_backend.services.entity_import_service import EntityImportService
+from eav_backend.util.openapi_cache import OpenAPICache
+from eav_backend.util.read_your_writes import ReadYourWritesMiddleware
 
 
 logging.config.dictConfig(settings.logging_config)
@@ -18,6 +31,77 @@ logger = logging.getLogger("openepi")
 logger.info(f"LogLevel is set to {settings.log_level}")
 
 
+async def refresh_entity_definitions(app: FastAPI):
+    """Picks up entity definitions changed through another worker."""
+    while True:
+        await asyncio.sleep(settings.definition_refresh_interval)
+        session = SessionLocal()
+        try:
+            eds = EntityDefinitionService(session)
+            if DynamicModelService(eds, app).refresh_if_changed():
+                logger.info("Entity definitions changed, rebuilt generated routes")
+        except Exception as e:
+            logger.error(f"Refreshing entity definitions failed: {e}")
+        finally:
+            session.close()
+
+
+async def collect_asset_garbage():
+    """Removes expired uploads and the content of assets that is no longer referenced."""
+    while True:
+        await asyncio.sleep(settings.asset_gc_interval)
+        session = SessionLocal()
+        try:
+            expired = AssetUploadService(session).remove_expired()
+            if expired:
+                logger.info(f"Removed {expired} expired asset uploads")
+            removed = AssetService(session).collect_garbage(
+                settings.asset_gc_grace_period
+            )
+            if removed:
+                logger.info(f"Removed {removed} unreferenced asset blobs")
+        except Exception as e:
+            logger.error(f"Collecting asset garbage failed: {e}")
+        finally:
+            session.close()
+
+
+def compact_entities():
+    session = SessionLocal()
+    try:
+        compacted = CompactionService(session).compact()
+        if compacted:
+            logger.info(f"Compacted {compacted} deleted entities")
+    finally:
+        session.close()
+
+
+async def compact_deleted_entities():
+    """Removes deleted entities that are past the retention of their definition."""
+    while True:
+        await asyncio.sleep(settings.compaction_interval)
+        try:
+            # Batches pause between each other, so this runs off the event loop.
+            await asyncio.to_thread(compact_entities)
+        except Exception as e:
+            logger.error(f"Compacting deleted entities failed: {e}")
+
+
+async def prune_entity_changes():
+    """Removes the changes that are older than the change feed can be resumed from."""
+    while True:
+        await asyncio.sleep(settings.change_prune_interval)
+        session = SessionLocal()
+        try:
+            removed = ChangeFeedService(session).prune(settings.change_retention)
+            if removed:
+                logger.info(f"Removed {removed} entity changes")
+        except Exception as e:
+            logger.error(f"Pruning entity changes failed: {e}")
+        finally:
+            session.close()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     session = SessionLocal()
@@ -27,7 +111,34 @@ async def lifespan(app: FastAPI):
         DynamicModelService(eds, app).build_models_from_entity_definitions()
     finally:
         session.close()
+    definition_migration_runner.resume_pending()
+
+    tasks = []
+    if settings.definition_refresh_interval > 0:
+        tasks.append(asyncio.create_task(refresh_entity_definitions(app)))
+    if settings.enable_assets and settings.asset_gc_interval > 0:
+        tasks.append(asyncio.create_task(collect_asset_garbage()))
+    if settings.compaction_interval > 0:
+        tasks.append(asyncio.create_task(compact_deleted_entities()))
+    if settings.change_prune_interval > 0:
+        tasks.append(asyncio.create_task(prune_entity_changes()))
+    if settings.enable_change_feed:
+        change_broker.start(asyncio.get_running_loop())
     yield
+    change_broker.stop()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+async def database_unavailable(request: Request, e: exc.TimeoutError) -> Response:
+    logger.warning(f"No database connection available for {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The service is busy, please retry"},
+        headers={"Retry-After": str(settings.database_retry_after)},
+    )
 
 
 def get_application() -> FastAPI:
@@ -39,15 +150,28 @@ def get_application() -> FastAPI:
         version=settings.version,
     )
 
+    api.add_exception_handler(exc.TimeoutError, database_unavailable)
+
+    if settings.replica_database_connection:
+        api.add_middleware(
+            ReadYourWritesMiddleware, window=settings.read_your_writes_window
+        )
+
     if settings.enable_assets:
         api.include_router(asset_routes.router)
 
     if settings.enable_admin_api:
         api.include_router(admin_routes.router)
 
+    if settings.enable_change_feed:
+        api.include_router(change_routes.router)
+
     if settings.enable_metrics:
+        api.add_middleware(DatabaseMetricsMiddleware)
         Instrumentator().instrument(api).expose(api)
 
+    OpenAPICache(api).install()
+
     return api
 
 
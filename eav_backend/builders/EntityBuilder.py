@@ -1,35 +1,44 @@
-from typing import Any
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Collection, Optional
 
 from pydantic.main import ModelT
 
-from eav_backend.models import EntityDefinition, Entity, Attribute, EntityRelation
+from eav_backend.models import Entity, Attribute, EntityRelation
+from eav_backend.models.attribute_codec import CODECS
+from eav_backend.registry import EntityDefinitionSnapshot
 
 
 class EntityBuilder:
 
     @staticmethod
-    def to_entity(ed: EntityDefinition, item: type[ModelT]) -> Entity:
+    def to_entity(ed: EntityDefinitionSnapshot, item: type[ModelT]) -> Entity:
         main_entity = Entity(entity_type=ed.name)
-        main_attributes = item.model_dump(
-            exclude=set([x.collection_name for x in ed.entity_relations])
-        )
+        main_attributes = item.model_dump(exclude=ed.relation_collections)
 
+        codecs = ed.attribute_codecs
         attrs = []
-        for attr_name in [x for x in main_attributes if main_attributes[x] is not None]:
+        for attr_name, value in main_attributes.items():
+            if value is None:
+                continue
             attribute = Attribute(name=attr_name)
-            attribute.value = main_attributes[attr_name]
+            codec = codecs.get(attr_name)
+            if codec:
+                codec.write(attribute, value)
+            else:
+                attribute.value = value
             attrs.append(attribute)
 
         main_entity.attributes = attrs
         main_entity.relations = []
 
-        for relation_def in ed.entity_relations:
+        for relation_def in ed.relations:
             relations = getattr(item, relation_def.collection_name, [])
             for relation in relations if relations else []:
                 main_entity.relations.append(
                     EntityRelation(
                         target_entity=EntityBuilder.to_entity(
-                            relation_def.target_entity, relation
+                            relation_def.target, relation
                         ),
                         collection_name=relation_def.collection_name,
                     )
@@ -38,47 +47,139 @@ class EntityBuilder:
         return main_entity
 
     @staticmethod
-    def to_dict(entity: Entity, entity_definition: EntityDefinition) -> dict[str, Any]:
+    def to_dict(
+        entity: Entity, entity_definition: EntityDefinitionSnapshot
+    ) -> dict[str, Any]:
         response_data: dict[str, Any] = {"id": entity.id}
 
+        codecs = entity_definition.attribute_codecs
         for attr in entity.attributes:
-            response_data[attr.name] = attr.value
+            codec = codecs.get(attr.name)
+            # Rows written before their definition was known may use another type.
+            if codec is None or codec.type != attr.type:
+                codec = CODECS[attr.type]
+            response_data[attr.name] = codec.read(attr)
 
         for relation in entity.relations:
-            response_data[relation.collection_name] = response_data.get(
-                relation.collection_name, []
+            relation_def = entity_definition.relations_by_collection.get(
+                relation.collection_name
             )
-            response_data[relation.collection_name].append(
-                EntityBuilder.to_dict(relation.target_entity, entity_definition)
+            if not relation_def:
+                continue
+            response_data.setdefault(relation.collection_name, []).append(
+                EntityBuilder.to_dict(relation.target_entity, relation_def.target)
             )
 
         return response_data
 
     @classmethod
-    def merge(cls, to_update: Entity, with_new_values: Entity) -> Entity:
-        for attr in with_new_values.attributes:
-            existing_attr = next(
-                (a for a in to_update.attributes if a.name == attr.name), None
-            )
-            if existing_attr:
-                existing_attr.value = attr.value
-            else:
-                to_update.attributes.append(attr)
+    def diff(
+        cls,
+        ed: EntityDefinitionSnapshot,
+        to_update: Entity,
+        with_new_values: Entity,
+        diff: Optional["EntityDiff"] = None,
+    ) -> "EntityDiff":
+        """
+        The changes that turn an entity and the entities nested under it into
+        new values. Attributes of the definition that the new values don't
+        have are removed. Nested entities are matched by their position in
+        their collection, and new values beyond the existing ones are added.
+        """
+        diff = diff if diff is not None else EntityDiff()
+        changes = len(diff)
+
+        cls._diff_attributes(
+            to_update, with_new_values.attributes, ed.attribute_types, diff
+        )
 
+        existing_relations = defaultdict(list)
+        for relation in to_update.relations:
+            existing_relations[relation.collection_name].append(relation)
+        new_relations = defaultdict(list)
         for relation in with_new_values.relations:
-            existing_relation = next(
-                (
-                    r
-                    for r in to_update.relations
-                    if r.collection_name == relation.collection_name
-                ),
-                None,
-            )
-            if existing_relation:
-                existing_relation.target_entity = cls.merge(
-                    existing_relation.target_entity, relation.target_entity
+            new_relations[relation.collection_name].append(relation)
+        for collection_name, relations in new_relations.items():
+            relation_def = ed.relations_by_collection.get(collection_name)
+            if not relation_def:
+                continue
+            current = existing_relations[collection_name]
+            for existing_relation, relation in zip(current, relations):
+                cls.diff(
+                    relation_def.target,
+                    existing_relation.target_entity,
+                    relation.target_entity,
+                    diff,
                 )
-            else:
-                to_update.relations.append(relation)
+            for relation in relations[len(current) :]:
+                diff.added_relations.append((to_update, relation))
+
+        if len(diff) > changes:
+            diff.changed_entities.append(to_update)
+        return diff
+
+    @classmethod
+    def patch(
+        cls, ed: EntityDefinitionSnapshot, to_update: Entity, item: type[ModelT]
+    ) -> "EntityDiff":
+        """
+        The changes of a JSON merge patch of the attributes of an entity. The
+        attributes that are set to null are removed, the ones that are left out
+        are kept.
+        """
+        nulls = {
+            name
+            for name, value in item.model_dump(exclude_unset=True).items()
+            if value is None
+        }
+        diff = EntityDiff()
+        cls._diff_attributes(to_update, cls.to_entity(ed, item).attributes, nulls, diff)
+        if diff:
+            diff.changed_entities.append(to_update)
+        return diff
 
-        return to_update
+    @staticmethod
+    def _diff_attributes(
+        to_update: Entity,
+        attributes: list[Attribute],
+        removable: Collection[str],
+        diff: "EntityDiff",
+    ):
+        """Adds the changes of the attributes of an entity, removing the `removable` ones that are missing."""
+        existing = {attr.name: attr for attr in to_update.attributes}
+        new = {attr.name: attr for attr in attributes}
+        for name, attr in new.items():
+            current = existing.get(name)
+            if current is None:
+                diff.added.append((to_update, attr))
+            elif current.type != attr.type:
+                diff.removed.append((to_update, current))
+                diff.added.append((to_update, attr))
+            elif not CODECS[attr.type].equal(attr, current):
+                diff.changed.append((current, attr))
+        for name, current in existing.items():
+            if name not in new and name in removable:
+                diff.removed.append((to_update, current))
+
+
+@dataclass
+class EntityDiff:
+    """
+    The attributes and nested entities to change, add and remove, over an
+    entity and all the entities nested under it, with the entity they belong to.
+    """
+
+    changed: list[tuple[Attribute, Attribute]] = field(default_factory=list)
+    added: list[tuple[Entity, Attribute]] = field(default_factory=list)
+    removed: list[tuple[Entity, Attribute]] = field(default_factory=list)
+    added_relations: list[tuple[Entity, EntityRelation]] = field(default_factory=list)
+    # The entities whose values, or nested entities, changed get a new version.
+    changed_entities: list[Entity] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return (
+            len(self.changed)
+            + len(self.added)
+            + len(self.removed)
+            + len(self.added_relations)
+        )
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ValidationError
 from pydantic_settings import BaseSettings
 
@@ -24,6 +26,25 @@ class Settings(BaseSettings):
     postgres_host: str = "localhost"
     postgres_port: str = "5432"
     postgres_schema: str = "public"
+    postgres_replica_host: str | None = None
+    postgres_replica_port: str | None = None  # defaults to postgres_port
+    read_your_writes_window: int = 5  # seconds reads stay on the primary
+
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_recycle: int = 1800  # seconds, -1 disables
+    database_pool_timeout: float = 5.0  # seconds to wait for a connection
+    database_retry_after: int = 1  # seconds, sent when no connection is available
+    # Statement timeouts per kind of endpoint, in milliseconds, 0 disables
+    statement_timeout_read: int = 5000
+    statement_timeout_write: int = 15000
+    statement_timeout_admin: int = 60000
+    slow_query_threshold: int = 0  # milliseconds, 0 disables the slow query log
+    slow_query_explain_rate: float = 0.1  # fraction of slow SELECTs explained
+    slow_query_log_size: int = 100  # slow queries kept for the admin API
+    query_budget_mode: str = "off"  # off, log or raise when a route exceeds its budget
+    collection_count_ttl: int = 60  # seconds before a cached exact count is refreshed
+    collection_count_cache_size: int = 1000  # collections with a cached exact count
 
     run_migrations: bool = True
     alembic_directory: str = "./alembic"
@@ -32,15 +53,64 @@ class Settings(BaseSettings):
     import_entities: bool = False
     update_entities: bool = False
     import_config: str | None = None
+    definition_refresh_interval: int = 30  # seconds, 0 disables the refresh
+
+    definition_migration_batch_size: int = 1000
+    definition_migration_batch_delay: float = 0.2  # seconds between batches
+    definition_migration_lock_timeout: int = 2000  # milliseconds
+    definition_migration_max_retries: int = 5
+    definition_migration_stale_after: int = 300  # seconds without progress
+
+    cascade_delete_chunk_size: int = 1000  # entities marked deleted per transaction
+    compaction_interval: int = 3600  # seconds, 0 disables the compaction
+    compaction_batch_size: int = 100  # deleted entities, with their subtrees
+    compaction_batch_delay: float = 0.2  # seconds between batches
+    compaction_archive: bool = True  # archive compacted entities, or drop them
+
+    enable_change_feed: bool = False
+    change_feed_heartbeat: int = 15  # seconds between keep-alive comments
+    change_feed_poll_interval: float = (
+        5.0  # seconds, reads changes without a notification
+    )
+    change_feed_batch_size: int = 1000  # changes read per query
+    change_feed_buffer_size: int = 10000  # changes a subscriber may lag behind
+    change_retention: int = 7 * 24 * 3600  # seconds changes can be resumed from
+    change_prune_interval: int = 3600  # seconds, 0 disables pruning the changes
 
     enable_admin_api: bool = True
     enable_metrics: bool = False
     enable_assets: bool = False
 
     max_upload_size: int = 10 * 1024 * 1024  # 10 MB
+    # The database is only read from, for assets stored before the backends.
+    asset_storage_backend: Literal["filesystem", "s3"] = "filesystem"
+    asset_storage_path: str = "./data/assets"
+    asset_chunk_size: int = 1024 * 1024  # 1 MB
+    asset_compression: str = "none"  # none, zstd (needs zstandard) or gzip
+    asset_compression_mimetypes: list[str] = [
+        "text/*",
+        "application/json",
+        "application/geo+json",
+        "application/x-ndjson",
+        "application/xml",
+        "application/csv",
+    ]
+    asset_compression_sample_size: int = 64 * 1024  # 64 KB
+    asset_compression_min_saving: float = 0.1  # fraction the sample must shrink by
+    asset_upload_expiry: int = 24 * 3600  # seconds to complete an upload in
+    max_upload_part_size: int = 64 * 1024 * 1024  # 64 MB
+    asset_gc_interval: int = 3600  # seconds, 0 disables the garbage collection
+    asset_gc_grace_period: int = 24 * 3600  # seconds an unreferenced blob is kept
+
+    s3_bucket: str | None = None
+    s3_endpoint_url: str | None = None
+    s3_region: str | None = None
+    s3_access_key_id: str | None = None
+    s3_secret_access_key: str | None = None
+    s3_part_size: int = 8 * 1024 * 1024  # 8 MB, at least 5 MB
 
-    def asset_content_url(self, asset_id: str) -> str:
-        return f"{self.api_url}/assets/{asset_id}"
+    def asset_content_url(self, checksum: str) -> str:
+        return f"{self.api_url}/assets/content/{checksum}"
 
     @property
     def api_url(self):
@@ -51,7 +121,18 @@ class Settings(BaseSettings):
 
     @property
     def database_connection(self):
-        return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}?options=-csearch_path={self.postgres_schema}"
+        return self._database_connection(self.postgres_host, self.postgres_port)
+
+    @property
+    def replica_database_connection(self) -> str | None:
+        if not self.postgres_replica_host:
+            return None
+        return self._database_connection(
+            self.postgres_replica_host, self.postgres_replica_port or self.postgres_port
+        )
+
+    def _database_connection(self, host: str, port: str) -> str:
+        return f"postgresql://{self.postgres_user}:{self.postgres_password}@{host}:{port}/{self.postgres_db}?options=-csearch_path={self.postgres_schema}"
 
     @property
     def logging_config(self) -> dict:
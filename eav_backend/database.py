@@ -2,15 +2,83 @@ import uuid
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, event
 from sqlalchemy.dialects import postgresql
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
 
 from eav_backend.config import settings
+from eav_backend.metrics import InstrumentedQueuePool, instrument_engine
+from eav_backend.util.query_budget import count_engine_statements
+from eav_backend.util.slow_queries import log_slow_queries
 
-engine = create_engine(settings.database_connection, pool_pre_ping=True)
+
+STATEMENT_TIMEOUTS = {
+    "read": settings.statement_timeout_read,
+    "write": settings.statement_timeout_write,
+    "admin": settings.statement_timeout_admin,
+}
+
+
+def create_pooled_engine(connection: str, name: str, kind: str):
+    """
+    An engine whose connections start with the statement timeout of a kind of
+    endpoint, set while connecting, so only sessions of another kind set theirs.
+    """
+    engine = create_engine(
+        connection,
+        poolclass=InstrumentedQueuePool,
+        pool_pre_ping=True,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_recycle=settings.database_pool_recycle,
+        pool_timeout=settings.database_pool_timeout,
+        pool_logging_name=name,
+    )
+    timeout = int(STATEMENT_TIMEOUTS[kind])
+
+    @event.listens_for(engine, "do_connect")
+    def set_default_statement_timeout(dialect, connection_record, cargs, cparams):
+        options = cparams.get("options", "")
+        cparams["options"] = f"{options} -c statement_timeout={timeout}".strip()
+        connection_record.info["statement_timeout"] = timeout
+
+    instrument_engine(engine, name)
+    count_engine_statements(engine)
+    if settings.slow_query_threshold > 0:
+        log_slow_queries(engine)
+    return engine
+
+
+engine = create_pooled_engine(settings.database_connection, "primary", "write")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Requests that only read use the replica, if one is configured.
+replica_engine = (
+    create_pooled_engine(settings.replica_database_connection, "replica", "read")
+    if settings.replica_database_connection
+    else engine
+)
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=replica_engine
+)
+
+
+def with_statement_timeout(session: Session, kind: str) -> Session:
+    """Limits the statements of a session to the timeout of a kind of endpoint."""
+    session.info["statement_timeout"] = STATEMENT_TIMEOUTS[kind]
+    return session
+
+
+@event.listens_for(Session, "after_begin")
+def set_statement_timeout(session: Session, transaction, connection):
+    # Sessions of no kind (background tasks) are not limited.
+    timeout = int(session.info.get("statement_timeout", 0))
+    if timeout != connection.info.get("statement_timeout", 0):
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {timeout}",
+            execution_options={"count_statement": False},
+        )
+
 
 class Base(DeclarativeBase):
     metadata = MetaData(
@@ -1,24 +1,60 @@
+from fastapi import Request
 from fastapi.params import Depends
 from sqlalchemy.orm import Session
 
 from eav_backend.config import settings
-from eav_backend.database import SessionLocal
+from eav_backend.database import (
+    SessionLocal,
+    ReplicaSessionLocal,
+    with_statement_timeout,
+)
 from eav_backend.services.asset_service import AssetService
+from eav_backend.services.asset_upload_service import AssetUploadService
+from eav_backend.services.definition_migration_service import (
+    DefinitionMigrationService,
+)
 from eav_backend.services.entity_definition_service import EntityDefinitionService
 from eav_backend.services.entity_import_service import EntityImportService
 from eav_backend.services.entity_service import EntityService
+from eav_backend.util.read_your_writes import reads_from_primary
 
 
 def get_db() -> Session:
-    db = SessionLocal()
+    # The responses are built from the objects that were just written, which
+    # would each be loaded again if the commit expired them.
+    db = with_statement_timeout(SessionLocal(expire_on_commit=False), "write")
     try:
         yield db
     finally:
         db.close()
 
 
-def get_entity_definition_service(
-    db: Session = Depends(get_db),
+def get_read_db(request: Request) -> Session:
+    """A session for requests that only read: on the replica, unless the client wrote recently."""
+    db = SessionLocal() if reads_from_primary(request) else ReplicaSessionLocal()
+    with_statement_timeout(db, "read")
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_admin_db() -> Session:
+    db = with_statement_timeout(SessionLocal(), "admin")
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_admin_entity_definition_service(
+    db: Session = Depends(get_admin_db),
+) -> EntityDefinitionService:
+    return EntityDefinitionService(db)
+
+
+def get_read_entity_definition_service(
+    db: Session = Depends(get_read_db),
 ) -> EntityDefinitionService:
     return EntityDefinitionService(db)
 
@@ -29,8 +65,14 @@ def get_entity_service(
     return EntityService(db)
 
 
+def get_read_entity_service(
+    db: Session = Depends(get_read_db),
+) -> EntityService:
+    return EntityService(db)
+
+
 def get_entity_import_service(
-    eds: EntityDefinitionService = Depends(get_entity_definition_service),
+    eds: EntityDefinitionService = Depends(get_admin_entity_definition_service),
 ) -> EntityImportService:
     return EntityImportService(eds)
 
@@ -39,3 +81,21 @@ def get_asset_service(
     db: Session = Depends(get_db),
 ) -> AssetService:
     return AssetService(db)
+
+
+def get_read_asset_service(
+    db: Session = Depends(get_read_db),
+) -> AssetService:
+    return AssetService(db)
+
+
+def get_asset_upload_service(
+    db: Session = Depends(get_db),
+) -> AssetUploadService:
+    return AssetUploadService(db)
+
+
+def get_read_definition_migration_service(
+    db: Session = Depends(get_read_db),
+) -> DefinitionMigrationService:
+    return DefinitionMigrationService(db)
@@ -0,0 +1,145 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import Engine, exc, event
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+DB_POOL_SIZE = Gauge(
+    "eav_db_pool_size",
+    "Number of connections the database pool keeps open.",
+    ["pool"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "eav_db_pool_checked_out",
+    "Number of database connections in use.",
+    ["pool"],
+)
+DB_POOL_OVERFLOW = Gauge(
+    "eav_db_pool_overflow",
+    "Number of database connections open beyond the pool size.",
+    ["pool"],
+)
+DB_POOL_WAIT = Histogram(
+    "eav_db_pool_wait_seconds",
+    "Time spent waiting for a database connection from the pool.",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "eav_db_pool_timeouts",
+    "Requests that could not get a database connection in time.",
+    ["pool"],
+)
+
+REQUEST_LABELS = ["method", "handler", "entity_definition"]
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "eav_db_statements_per_request",
+    "Number of database statements executed by a request.",
+    REQUEST_LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "eav_db_time_per_request_seconds",
+    "Time a request spent executing database statements.",
+    REQUEST_LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_ROWS_PER_REQUEST = Histogram(
+    "eav_db_rows_per_request",
+    "Number of rows returned by the database statements of a request.",
+    REQUEST_LABELS,
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+
+
+@dataclass
+class RequestDatabaseStats:
+    entity_definition: str = ""
+    statements: int = 0
+    time: float = 0.0
+    rows: int = 0
+
+
+request_database_stats: ContextVar[RequestDatabaseStats | None] = ContextVar(
+    "request_database_stats", default=None
+)
+
+
+def set_request_entity_definition(name: str):
+    """Labels the database metrics of the current request with an entity definition."""
+    if stats := request_database_stats.get():
+        stats.entity_definition = name
+
+
+class DatabaseMetricsMiddleware:
+    """
+    Records the statements, database time and rows of each request, labelled
+    like the HTTP metrics by the path template of the route it matched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDatabaseStats()
+        token = request_database_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_database_stats.reset(token)
+            if route := scope.get("route"):
+                labels = (scope["method"], route.path, stats.entity_definition)
+                DB_STATEMENTS_PER_REQUEST.labels(*labels).observe(stats.statements)
+                DB_TIME_PER_REQUEST.labels(*labels).observe(stats.time)
+                DB_ROWS_PER_REQUEST.labels(*labels).observe(stats.rows)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_database_stats.get():
+        context._eav_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_database_stats.get()
+    started = getattr(context, "_eav_started", None)
+    if not stats or started is None:
+        return
+    stats.statements += 1
+    stats.time += time.perf_counter() - started
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that records how long getting a connection takes, labelled by its logging name."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(self._orig_logging_name).inc()
+            raise
+        finally:
+            DB_POOL_WAIT.labels(self._orig_logging_name).observe(
+                time.perf_counter() - start
+            )
+
+
+def instrument_engine(engine: Engine, name: str):
+    """
+    Reports the state of the pool of an engine when the metrics are scraped,
+    and counts its statements for the request they are executed in.
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    DB_POOL_SIZE.labels(name).set_function(lambda: engine.pool.size())
+    DB_POOL_CHECKED_OUT.labels(name).set_function(lambda: engine.pool.checkedout())
+    DB_POOL_OVERFLOW.labels(name).set_function(lambda: max(engine.pool.overflow(), 0))
@@ -3,4 +3,10 @@ from eav_backend.models.attribute_type import *
 from eav_backend.models.entity_definition import *
 from eav_backend.models.attribute import *
 from eav_backend.models.entity import *
+from eav_backend.models.entity_archive import *
+from eav_backend.models.entity_change import *
+from eav_backend.models.asset_blob import *
 from eav_backend.models.asset import *
+from eav_backend.models.asset_content import *
+from eav_backend.models.asset_upload import *
+from eav_backend.models.definition_migration import *
@@ -2,14 +2,14 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey
+from sqlalchemy import String, BigInteger, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from eav_backend.config import settings
 from eav_backend.database import Base
-from eav_backend.models.asset_content import AssetContent
+from eav_backend.models.asset_blob import AssetBlob
 
 
 class Asset(Base):
@@ -36,7 +36,7 @@ class Asset(Base):
     )
 
     file_size: Mapped[int] = mapped_column(
-        Integer,
+        BigInteger,
         nullable=False,
         doc="The size of the file in bytes.",
     )
@@ -57,24 +57,30 @@ class Asset(Base):
 
     checksum: Mapped[str] = mapped_column(
         String,
-        nullable=True,
-        doc="A checksum to verify the integrity of the file.",
+        ForeignKey("asset_blob.checksum"),
+        nullable=False,
+        index=True,
+        doc="The SHA-256 checksum of the file, referencing its content.",
     )
 
     entity_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("entity.id"),
         nullable=False,
+        index=True,
         doc="Reference to the entity that this asset belongs to.",
     )
 
-    content: Mapped[AssetContent] = relationship(
-        "AssetContent",
-        uselist=False,
-        back_populates="asset",
-        lazy="select",
+    blob: Mapped[AssetBlob] = relationship(
+        "AssetBlob",
+        lazy="joined",
     )
 
+    @property
+    def content_encoding(self) -> Optional[str]:
+        """The codec the content of the asset is compressed with in storage, if any."""
+        return self.blob.content_encoding if self.blob else None
+
     @hybrid_property
     def is_valid(self) -> bool:
         """Check if the asset has a valid checksum."""
@@ -82,4 +88,4 @@ class Asset(Base):
 
     @hybrid_property
     def url(self) -> str:
-        return settings.asset_content_url(self.id)
+        return settings.asset_content_url(self.checksum)
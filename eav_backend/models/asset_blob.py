@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, BigInteger, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from eav_backend.database import Base
+
+
+class AssetBlob(Base):
+    """
+    The content of assets, stored once per checksum. Assets with the same
+    content share a blob; a blob that is no longer referenced is removed from
+    storage by the garbage collection after a grace period.
+    """
+
+    __tablename__ = "asset_blob"
+
+    checksum: Mapped[str] = mapped_column(
+        String,
+        primary_key=True,
+        doc="The SHA-256 checksum of the content.",
+    )
+
+    size: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        doc="The size of the content in bytes.",
+    )
+
+    mimetype: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        doc="The MIME type of the asset the content was first uploaded as.",
+    )
+
+    content_encoding: Mapped[Optional[str]] = mapped_column(
+        String,
+        nullable=True,
+        doc="The codec the content is compressed with in storage, if any (zstd or gzip).",
+    )
+
+    stored_size: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True,
+        doc="The size of the content in storage, after compression.",
+    )
+
+    storage_backend: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        doc="The storage backend holding the content.",
+    )
+
+    storage_key: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        doc="The key of the content in the storage backend.",
+    )
+
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        doc="The number of assets referencing the content.",
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        nullable=False,
+        doc="The timestamp when the content was first stored.",
+    )
+
+    orphaned_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        nullable=True,
+        doc="The timestamp when the last asset referencing the content was removed.",
+    )
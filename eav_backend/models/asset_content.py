@@ -1,16 +1,13 @@
-from sqlalchemy import Column, ForeignKey, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, LargeBinary, UUID
 
 from eav_backend.models import Base
 
 
 class AssetContent(Base):
+    """Content of assets uploaded before the storage backends, keyed by the asset it was uploaded with."""
+
     __tablename__ = "asset_content"
 
-    asset_id = Column(
-        ForeignKey("asset.id", ondelete="CASCADE"), primary_key=True, nullable=False
-    )
+    asset_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
 
     content = Column(LargeBinary, nullable=False)
-
-    asset = relationship("Asset", back_populates="content")
@@ -0,0 +1,100 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, BigInteger, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from eav_backend.database import Base
+
+
+class AssetUpload(Base):
+    """
+    A resumable upload of an asset. Parts are stored as they arrive and are
+    combined into the content of the asset when the upload is completed.
+    """
+
+    __tablename__ = "asset_upload"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+        doc="Unique identifier for the upload.",
+    )
+
+    entity_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("entity.id"),
+        nullable=False,
+        doc="Reference to the entity that the uploaded asset will belong to.",
+    )
+
+    name: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The name of the file asset."
+    )
+
+    mimetype: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The MIME type of the file."
+    )
+
+    storage_backend: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The storage backend holding the parts."
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        nullable=False,
+        doc="The timestamp when the upload was started.",
+    )
+
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        index=True,
+        doc="The timestamp after which an unfinished upload is removed.",
+    )
+
+    parts: Mapped[list["AssetUploadPart"]] = relationship(
+        "AssetUploadPart",
+        order_by="AssetUploadPart.part_number",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+
+
+class AssetUploadPart(Base):
+    __tablename__ = "asset_upload_part"
+
+    upload_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("asset_upload.id", ondelete="CASCADE"),
+        primary_key=True,
+        doc="Reference to the upload the part belongs to.",
+    )
+
+    part_number: Mapped[int] = mapped_column(
+        Integer, primary_key=True, doc="The position of the part in the file."
+    )
+
+    size: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, doc="The size of the part in bytes."
+    )
+
+    checksum: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The SHA-256 checksum of the part."
+    )
+
+    storage_key: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The key of the part in the storage backend."
+    )
+
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        onupdate=datetime.now,
+        doc="The timestamp when the part was stored.",
+    )
@@ -3,22 +3,36 @@ from datetime import date
 from typing import Optional
 
 from geoalchemy2 import Geometry, WKBElement
-from geoalchemy2.shape import to_shape, from_shape
-from pydantic_core import ValidationError
-from shapely.geometry.geo import mapping, shape
-from sqlalchemy import UUID, String, Integer, Float, Boolean, Date, Enum, ForeignKey
+from sqlalchemy import (
+    UUID,
+    String,
+    Integer,
+    Float,
+    Boolean,
+    Date,
+    Enum,
+    ForeignKey,
+    PrimaryKeyConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from eav_backend.database import Base
 from eav_backend.models import AttributeType
+from eav_backend.models.attribute_codec import CODECS, codec_for_value
 
 
 class Attribute(Base):
     __tablename__ = "attribute"
+    # Hash partitioned by entity, see the partition_attributes migration. The
+    # partition key has to be part of the primary key, and statements that
+    # filter on entity_id only scan the partitions of those entities.
+    __table_args__ = (
+        PrimaryKeyConstraint("entity_id", "id"),
+        {"postgresql_partition_by": "HASH (entity_id)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
-        primary_key=True,
         default=uuid.uuid4,
         nullable=False,
         doc="Unique identifier for the attribute.",
@@ -53,6 +67,9 @@ class Attribute(Base):
     value_enum: Mapped[Optional[str]] = mapped_column(
         String, nullable=True, doc="Enum value of the attribute."
     )
+    value_uuid: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True, doc="UUID value of the attribute."
+    )
     value_geometry: Mapped[Optional[WKBElement]] = mapped_column(
         Geometry(geometry_type="GEOMETRY", srid=4326),
         name="value_geom",
@@ -74,48 +91,9 @@ class Attribute(Base):
     @property
     def value(self):
         """Return the stored value based on the attribute's type."""
-        if self.type == AttributeType.STRING:
-            return self.value_str
-        elif self.type == AttributeType.INTEGER:
-            return self.value_int
-        elif self.type == AttributeType.FLOAT:
-            return self.value_float
-        elif self.type == AttributeType.BOOLEAN:
-            return self.value_boolean
-        elif self.type == AttributeType.DATE:
-            return self.value_date
-        elif self.type == AttributeType.ENUM:
-            return self.value_enum
-        elif self.type == AttributeType.GEOMETRY:
-            return mapping(to_shape(self.value_geometry))
-        return None
+        return CODECS[self.type].read(self)
 
     @value.setter
     def value(self, new_value):
-        if isinstance(new_value, bool):
-            self.value_boolean = new_value
-            self.type = AttributeType.BOOLEAN
-        elif isinstance(new_value, int):
-            self.value_int = new_value
-            self.type = AttributeType.INTEGER
-        elif isinstance(new_value, float):
-            self.value_float = new_value
-            self.type = AttributeType.FLOAT
-        elif isinstance(new_value, date):
-            self.value_date = new_value
-            self.type = AttributeType.DATE
-        elif isinstance(new_value, Enum):
-            self.value_enum = new_value.name
-            self.type = AttributeType.ENUM
-        elif isinstance(new_value, dict):
-            try:
-                self.value_geometry = from_shape(shape(new_value), srid=4326)
-                self.type = AttributeType.GEOMETRY
-            except (ValidationError, ValueError) as e:
-                raise ValueError("Invalid geometry value.")
-
-        elif isinstance(new_value, str):
-            self.value_str = new_value
-            self.type = AttributeType.STRING
-        else:
-            raise ValueError("Unsupported type for attribute value.")
+        """Store a value in the column matching its Python type."""
+        codec_for_value(new_value).write(self, new_value)
@@ -0,0 +1,125 @@
+import uuid
+from datetime import date
+from enum import Enum
+from typing import Any
+
+from geoalchemy2.shape import to_shape, from_shape
+from shapely.geometry.geo import mapping, shape
+
+from eav_backend.models.attribute_type import AttributeType
+
+
+class AttributeCodec:
+    """
+    Converts between the value of an attribute and the typed column of the
+    `attribute` table it is stored in. Codecs are chosen once per attribute
+    definition, so reading and writing a value is a single attribute access
+    on the right column.
+    """
+
+    __slots__ = ("type", "column")
+
+    def __init__(self, type: AttributeType, column: str):
+        self.type = type
+        self.column = column
+
+    def encode(self, value: Any) -> Any:
+        return value
+
+    def decode(self, stored: Any) -> Any:
+        return stored
+
+    def write(self, attribute, value: Any):
+        attribute.type = self.type
+        setattr(attribute, self.column, self.encode(value))
+
+    def read(self, attribute) -> Any:
+        stored = getattr(attribute, self.column)
+        return None if stored is None else self.decode(stored)
+
+    def copy(self, source, target):
+        """Copies the stored value of one attribute to another without converting it."""
+        target.type = self.type
+        setattr(target, self.column, getattr(source, self.column))
+
+    def equal(self, source, target) -> bool:
+        """Whether two attributes store the same value, compared without converting it."""
+        return getattr(source, self.column) == getattr(target, self.column)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}(type={self.type}, column={self.column})>"
+
+
+class EnumCodec(AttributeCodec):
+    __slots__ = ()
+
+    def encode(self, value: Any) -> str:
+        return value.name if isinstance(value, Enum) else value
+
+
+class UUIDCodec(AttributeCodec):
+    __slots__ = ()
+
+    def encode(self, value: Any) -> uuid.UUID:
+        return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+
+
+class GeometryCodec(AttributeCodec):
+    __slots__ = ()
+
+    def encode(self, value: Any):
+        if hasattr(value, "model_dump"):
+            value = value.model_dump(exclude_none=True)
+        try:
+            return from_shape(shape(value), srid=4326)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError("Invalid geometry value.")
+
+    def decode(self, stored: Any) -> dict:
+        return mapping(to_shape(stored))
+
+    def equal(self, source, target) -> bool:
+        # Geometries read from the database are extended WKB, written ones are not.
+        source, target = getattr(source, self.column), getattr(target, self.column)
+        if source is None or target is None:
+            return source is target
+        return to_shape(source).wkb == to_shape(target).wkb
+
+
+CODECS: dict[AttributeType, AttributeCodec] = {
+    AttributeType.STRING: AttributeCodec(AttributeType.STRING, "value_str"),
+    AttributeType.INTEGER: AttributeCodec(AttributeType.INTEGER, "value_int"),
+    AttributeType.FLOAT: AttributeCodec(AttributeType.FLOAT, "value_float"),
+    AttributeType.BOOLEAN: AttributeCodec(AttributeType.BOOLEAN, "value_boolean"),
+    AttributeType.DATE: AttributeCodec(AttributeType.DATE, "value_date"),
+    AttributeType.ENUM: EnumCodec(AttributeType.ENUM, "value_enum"),
+    AttributeType.UUID: UUIDCodec(AttributeType.UUID, "value_uuid"),
+    AttributeType.GEOMETRY: GeometryCodec(AttributeType.GEOMETRY, "value_geometry"),
+}
+
+# Codecs for values written without a definition, by the Python type of the value.
+VALUE_CODECS: dict[type, AttributeCodec] = {
+    bool: CODECS[AttributeType.BOOLEAN],
+    int: CODECS[AttributeType.INTEGER],
+    float: CODECS[AttributeType.FLOAT],
+    date: CODECS[AttributeType.DATE],
+    str: CODECS[AttributeType.STRING],
+    uuid.UUID: CODECS[AttributeType.UUID],
+    dict: CODECS[AttributeType.GEOMETRY],
+    Enum: CODECS[AttributeType.ENUM],
+}
+
+
+def codec_for_type(type: AttributeType | str) -> AttributeCodec:
+    return CODECS[AttributeType(type)]
+
+
+def codec_for_value(value: Any) -> AttributeCodec:
+    codec = VALUE_CODECS.get(type(value))
+    if codec is None:
+        codec = next(
+            (VALUE_CODECS[t] for t in type(value).__mro__ if t in VALUE_CODECS), None
+        )
+        if codec is None:
+            raise ValueError("Unsupported type for attribute value.")
+    return codec
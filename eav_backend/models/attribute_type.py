@@ -8,4 +8,5 @@ class AttributeType(PyStrEnum):
     BOOLEAN = "BOOLEAN"
     DATE = "DATE"
     ENUM = "ENUM"
+    UUID = "UUID"
     GEOMETRY = "GEOMETRY"
@@ -0,0 +1,124 @@
+import uuid
+from datetime import datetime
+from enum import StrEnum as PyStrEnum
+from typing import Any, Optional
+
+from sqlalchemy import UUID, String, Integer, DateTime, Enum, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from eav_backend.database import Base
+
+
+class DefinitionMigrationKind(PyStrEnum):
+    BACKFILL = "BACKFILL"
+    VALIDATE = "VALIDATE"
+    PURGE = "PURGE"
+
+
+class DefinitionMigrationStatus(PyStrEnum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+class DefinitionMigrationJob(Base):
+    __tablename__ = "definition_migration_job"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+        doc="Unique identifier for the migration job.",
+    )
+
+    entity_definition_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("entity_definition.id"),
+        nullable=False,
+        doc="The entity definition whose existing entities are migrated.",
+    )
+
+    entity_type: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The entity type the job operates on."
+    )
+
+    kind: Mapped[DefinitionMigrationKind] = mapped_column(
+        Enum(DefinitionMigrationKind, name="definition_migration_kind"),
+        nullable=False,
+        doc="What the job does with the attribute rows: BACKFILL, VALIDATE or PURGE.",
+    )
+
+    status: Mapped[DefinitionMigrationStatus] = mapped_column(
+        Enum(DefinitionMigrationStatus, name="definition_migration_status"),
+        nullable=False,
+        default=DefinitionMigrationStatus.PENDING,
+        doc="The current status of the job.",
+    )
+
+    attribute_name: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The name of the attribute being migrated."
+    )
+
+    attribute_type: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The type of the attribute being migrated."
+    )
+
+    default_value: Mapped[Optional[Any]] = mapped_column(
+        JSONB,
+        nullable=True,
+        doc="The value written to entities missing the attribute (BACKFILL only).",
+    )
+
+    cursor: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+        doc="The last entity id processed, used to resume the job.",
+    )
+
+    processed: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, doc="Number of entities processed."
+    )
+
+    total: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, doc="Number of entities to process."
+    )
+
+    affected: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        doc="Rows written or deleted, or entities missing the attribute for VALIDATE.",
+    )
+
+    error: Mapped[Optional[str]] = mapped_column(
+        String, nullable=True, doc="The error that made the job fail."
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        nullable=False,
+        doc="The timestamp when the job was created.",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.now,
+        onupdate=datetime.now,
+        nullable=False,
+        doc="The timestamp when the job last made progress.",
+    )
+
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, doc="The timestamp when the job finished."
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<DefinitionMigrationJob(id={self.id}, kind={self.kind}, "
+            f"entity_type={self.entity_type}, attribute={self.attribute_name}, "
+            f"status={self.status})>"
+        )
@@ -1,7 +1,8 @@
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import UUID, String, ForeignKey, and_
+from sqlalchemy import UUID, String, ForeignKey, Index, and_
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from eav_backend.database import Base
@@ -10,6 +11,22 @@ from eav_backend.models.entity_relation import EntityRelation
 
 class Entity(Base):
     __tablename__ = "entity"
+    __table_args__ = (
+        # The live entities of a type, without the tombstones of deleted ones.
+        Index(
+            "ix_entity_live_entity_type",
+            "entity_type",
+            "id",
+            postgresql_where="NOT is_deleted",
+        ),
+        # The deleted entities of a type, for the compaction job.
+        Index(
+            "ix_entity_deleted_entity_type",
+            "entity_type",
+            "deleted_at",
+            postgresql_where="is_deleted",
+        ),
+    )
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         primary_key=True,
@@ -28,6 +45,18 @@ class Entity(Base):
         doc="Flag indicating whether the entity is deleted.",
     )
 
+    version: Mapped[int] = mapped_column(
+        default=1,
+        server_default="1",
+        nullable=False,
+        doc="Incremented whenever the values of the entity change.",
+    )
+
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(
+        nullable=True,
+        doc="When the entity was deleted, the retention of its definition starts then.",
+    )
+
     attributes: Mapped[List["Attribute"]] = relationship(
         "Attribute", back_populates="entity", cascade="all, delete-orphan"
     )
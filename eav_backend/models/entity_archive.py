@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import UUID, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from eav_backend.database import Base
+
+
+class EntityArchive(Base):
+    """
+    A deleted entity that was compacted, with its attributes, relations and
+    assets as JSONB, which PostgreSQL stores compressed.
+    """
+
+    __tablename__ = "entity_archive"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        doc="The id the entity had.",
+    )
+
+    entity_type: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The type of the entity."
+    )
+
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(
+        nullable=True,
+        doc="When the entity was deleted, null if only an entity above it was.",
+    )
+
+    archived_at: Mapped[datetime] = mapped_column(
+        nullable=False,
+        server_default=func.now(),
+        doc="When the entity was compacted.",
+    )
+
+    data: Mapped[dict[str, Any]] = mapped_column(
+        nullable=False,
+        doc="The attributes, relations and assets of the entity.",
+    )
@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import UUID, String, BigInteger, Identity, Index, text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from eav_backend.database import Base
+
+
+class EntityChange(Base):
+    """
+    A creation, update or deletion of an entity, recorded by a trigger on the
+    entity table in the transaction that made it. The change feed streams
+    them in the order of (transaction_id, id).
+    """
+
+    __tablename__ = "entity_change"
+    __table_args__ = (
+        Index("ix_entity_change_position", "transaction_id", "id"),
+        Index("ix_entity_change_changed_at", "changed_at"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        Identity(),
+        primary_key=True,
+        doc="Orders the changes within a transaction.",
+    )
+
+    transaction_id: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        server_default=text("pg_current_xact_id()::text::bigint"),
+        doc="The transaction that made the change. Changes are read once all "
+        "transactions before theirs have ended, so none is skipped.",
+    )
+
+    entity_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), nullable=False, doc="The entity that changed."
+    )
+
+    entity_type: Mapped[str] = mapped_column(
+        String, nullable=False, doc="The type of the entity."
+    )
+
+    operation: Mapped[str] = mapped_column(
+        String, nullable=False, doc="create, update or delete."
+    )
+
+    version: Mapped[int] = mapped_column(
+        nullable=False, doc="The version of the entity after the change."
+    )
+
+    changed_at: Mapped[datetime] = mapped_column(
+        nullable=False,
+        server_default=func.now(),
+        doc="When the transaction that made the change started.",
+    )
@@ -1,5 +1,5 @@
 import uuid
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy import (
     UUID,
@@ -98,6 +98,12 @@ class EntityDefinition(Base):
         doc="Whether this entity supports to have assets/files linked to it.",
     )
 
+    retention_days: Mapped[Optional[int]] = mapped_column(
+        INTEGER,
+        nullable=True,
+        doc="Days deleted entities are kept before they are compacted, forever if null.",
+    )
+
     required_attributes: Mapped[List[AttributeDefinition]] = relationship(
         "AttributeDefinition",
         secondary=entity_required_attributes,
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import String, ForeignKey, and_
+from sqlalchemy import String, ForeignKey, Index, and_
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -9,6 +9,14 @@ from eav_backend.database import Base
 
 class EntityRelation(Base):
     __tablename__ = "entity_relation"
+    __table_args__ = (
+        # Finds the parent of a live entity, the primary key covers its children.
+        Index(
+            "ix_entity_relation_live_target_entity_id",
+            "target_entity_id",
+            postgresql_where="NOT is_deleted",
+        ),
+    )
 
     source_entity_id: Mapped[uuid.UUID] = mapped_column(
         PG_UUID(as_uuid=True),
@@ -13,3 +13,23 @@ class EAVException(Exception):
 class ExistsException(EAVException):
     def __init__(self, msg: str):
         super().__init__(msg)
+
+
+class UnsupportedChangeException(EAVException):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+
+class NotFoundException(EAVException):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+
+class InvalidUploadException(EAVException):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+
+class TooLargeException(EAVException):
+    def __init__(self, msg: str):
+        super().__init__(msg)
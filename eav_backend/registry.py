@@ -0,0 +1,171 @@
+import uuid
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping, Optional
+
+from eav_backend.models import EntityDefinition, AttributeType
+from eav_backend.models.attribute_codec import AttributeCodec, codec_for_type
+from eav_backend.services.entity_definition_service import definition_version
+
+
+@dataclass(frozen=True, slots=True)
+class AttributeSnapshot:
+    name: str
+    type: AttributeType
+    required: bool
+    include_in_summary: bool
+    allowed_values: Optional[tuple[str, ...]] = None
+
+
+@dataclass(frozen=True, slots=True)
+class RelationSnapshot:
+    collection_name: str
+    target: "EntityDefinitionSnapshot"
+    api_endpoints: frozenset[str]
+
+
+@dataclass(frozen=True, slots=True)
+class EntityDefinitionSnapshot:
+    """
+    An immutable copy of an entity definition, with everything the request
+    handlers look up precomputed. Snapshots are built once per definition
+    version and shared by all requests, instead of the ORM objects of the
+    session that loaded the definitions.
+    """
+
+    id: uuid.UUID
+    name: str
+    hash: str
+    identifier: str
+    collection_name: str
+    api_endpoints: frozenset[str]
+    return_summary_on_collection: bool
+    supports_assets: bool
+    attributes: tuple[AttributeSnapshot, ...]
+    relations: tuple[RelationSnapshot, ...]
+    attribute_types: Mapping[str, AttributeType] = field(repr=False)
+    attribute_codecs: Mapping[str, AttributeCodec] = field(repr=False)
+    required_attributes: frozenset[str] = field(repr=False)
+    summary_fields: frozenset[str] = field(repr=False)
+    relation_collections: frozenset[str] = field(repr=False)
+    relations_by_collection: Mapping[str, RelationSnapshot] = field(repr=False)
+
+    @classmethod
+    def create(
+        cls,
+        ed: EntityDefinition,
+        attributes: tuple[AttributeSnapshot, ...],
+        relations: tuple[RelationSnapshot, ...],
+    ) -> "EntityDefinitionSnapshot":
+        return cls(
+            id=ed.id,
+            name=ed.name,
+            hash=ed.hash,
+            identifier=ed.name.lower(),
+            collection_name=ed.collection_name,
+            api_endpoints=frozenset(ed.api_endpoints),
+            return_summary_on_collection=ed.return_summary_on_collection,
+            supports_assets=ed.supports_assets,
+            attributes=attributes,
+            relations=relations,
+            attribute_types=MappingProxyType({a.name: a.type for a in attributes}),
+            attribute_codecs=MappingProxyType(
+                {a.name: codec_for_type(a.type) for a in attributes}
+            ),
+            required_attributes=frozenset(a.name for a in attributes if a.required),
+            summary_fields=frozenset(
+                a.name for a in attributes if a.required and a.include_in_summary
+            ),
+            relation_collections=frozenset(r.collection_name for r in relations),
+            relations_by_collection=MappingProxyType(
+                {r.collection_name: r for r in relations}
+            ),
+        )
+
+    def should_have_endpoint(self, endpoint: str) -> bool:
+        return endpoint in self.api_endpoints
+
+    def reachable_hashes(self) -> frozenset[tuple[str, str]]:
+        """The names and hashes of this definition and the definitions nested under it."""
+        hashes = {(self.name, self.hash)}
+        for relation in self.relations:
+            hashes |= relation.target.reachable_hashes()
+        return frozenset(hashes)
+
+    def relation_depth(self) -> int:
+        """The number of levels of definitions nested under this definition."""
+        return max((1 + r.target.relation_depth() for r in self.relations), default=0)
+
+
+class DefinitionRegistry:
+    """The snapshots of all entity definitions of one definition version."""
+
+    __slots__ = ("version", "definitions")
+
+    def __init__(
+        self, version: str, definitions: Mapping[str, EntityDefinitionSnapshot]
+    ):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "definitions", MappingProxyType(dict(definitions)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __iter__(self) -> Iterator[EntityDefinitionSnapshot]:
+        return iter(self.definitions.values())
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    def get(self, name: str) -> Optional[EntityDefinitionSnapshot]:
+        return self.definitions.get(name)
+
+    @classmethod
+    def from_entity_definitions(
+        cls, entity_definitions: Iterable[EntityDefinition]
+    ) -> "DefinitionRegistry":
+        snapshots: dict[uuid.UUID, EntityDefinitionSnapshot] = {}
+        building: set[uuid.UUID] = set()
+
+        def snapshot(ed: EntityDefinition) -> EntityDefinitionSnapshot:
+            if ed.id in snapshots:
+                return snapshots[ed.id]
+            if ed.id in building:
+                raise ValueError(f"Entity definition {ed.name} is related to itself")
+            building.add(ed.id)
+
+            attributes = tuple(
+                AttributeSnapshot(
+                    name=attr.name,
+                    type=AttributeType(attr.type),
+                    required=required,
+                    include_in_summary=bool(attr.include_in_summary),
+                    allowed_values=(
+                        tuple(attr.allowed_values) if attr.allowed_values else None
+                    ),
+                )
+                for required, attrs in (
+                    (True, ed.required_attributes),
+                    (False, ed.optional_attributes),
+                )
+                for attr in attrs
+            )
+            relations = tuple(
+                RelationSnapshot(
+                    collection_name=relation.collection_name,
+                    target=snapshot(relation.target_entity),
+                    api_endpoints=frozenset(relation.api_endpoints or []),
+                )
+                for relation in ed.entity_relations
+            )
+            snapshots[ed.id] = EntityDefinitionSnapshot.create(
+                ed, attributes, relations
+            )
+            building.discard(ed.id)
+            return snapshots[ed.id]
+
+        definitions = {ed.name: snapshot(ed) for ed in entity_definitions}
+        return cls(
+            definition_version((s.name, s.hash) for s in definitions.values()),
+            definitions,
+        )
@@ -6,17 +6,24 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.params import Depends
 
 from eav_backend.dependencies import (
-    get_entity_definition_service,
+    get_read_entity_definition_service,
     get_entity_import_service,
+    get_read_definition_migration_service,
 )
-from eav_backend.models.exceptions import ExistsException
+from eav_backend.models.exceptions import ExistsException, UnsupportedChangeException
+from eav_backend.schemas.definition_migration import DefinitionMigrationJobResponse
+from eav_backend.schemas.slow_query import SlowQueryResponse
 from eav_backend.schemas.entity_definition import (
     EntityDefinitionResponse,
     EntityDefinitionRequest,
 )
+from eav_backend.services.definition_migration_service import (
+    DefinitionMigrationService,
+)
 from eav_backend.services.dynamic_model_service import DynamicModelService
 from eav_backend.services.entity_definition_service import EntityDefinitionService
 from eav_backend.services.entity_import_service import EntityImportService
+from eav_backend.util.slow_queries import slow_queries
 
 router = APIRouter()
 logger = logging.getLogger("openepi")
@@ -31,7 +38,7 @@ logger = logging.getLogger("openepi")
     response_model_exclude_none=True,
 )
 async def get_entity_definitions(
-    service: EntityDefinitionService = Depends(get_entity_definition_service),
+    service: EntityDefinitionService = Depends(get_read_entity_definition_service),
 ) -> List[EntityDefinitionResponse]:
     return [
         EntityDefinitionResponse.model_validate(entity)
@@ -49,7 +56,7 @@ async def get_entity_definitions(
 )
 async def get_entity_definition(
     id: uuid.UUID,
-    service: EntityDefinitionService = Depends(get_entity_definition_service),
+    service: EntityDefinitionService = Depends(get_read_entity_definition_service),
 ) -> Optional[EntityDefinitionResponse]:
     ed = service.get_entity_definition(id)
     if not ed:
@@ -79,6 +86,59 @@ async def create_entity_definition(
         return imported_entity
     except ExistsException as e:
         raise HTTPException(status_code=409, detail=e.msg)
+    except UnsupportedChangeException as e:
+        raise HTTPException(status_code=422, detail=e.msg)
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail="Unknown error")
+
+
+@router.get(
+    "/v1/admin/definition_migrations",
+    summary="Get definition migrations",
+    description="Returns the jobs migrating existing entities after entity definition changes",
+    tags=["admin"],
+    response_model=List[DefinitionMigrationJobResponse],
+)
+async def get_definition_migrations(
+    entity_definition_id: Optional[uuid.UUID] = None,
+    service: DefinitionMigrationService = Depends(
+        get_read_definition_migration_service
+    ),
+) -> List[DefinitionMigrationJobResponse]:
+    return [
+        DefinitionMigrationJobResponse.model_validate(job)
+        for job in service.get_jobs(entity_definition_id)
+    ]
+
+
+@router.get(
+    "/v1/admin/definition_migrations/{id}",
+    summary="Get definition migration",
+    description="Returns the progress of a job migrating existing entities",
+    tags=["admin"],
+    response_model=DefinitionMigrationJobResponse,
+)
+async def get_definition_migration(
+    id: uuid.UUID,
+    service: DefinitionMigrationService = Depends(
+        get_read_definition_migration_service
+    ),
+) -> DefinitionMigrationJobResponse:
+    job = service.get_job(id)
+    if not job:
+        raise HTTPException(
+            status_code=404, detail=f"Definition migration with id {id} not found"
+        )
+    return DefinitionMigrationJobResponse.model_validate(job)
+
+
+@router.get(
+    "/v1/admin/slow_queries",
+    summary="Get slow queries",
+    description="Returns the most recent queries of this worker that exceeded the slow query threshold, newest first",
+    tags=["admin"],
+    response_model=List[SlowQueryResponse],
+)
+async def get_slow_queries() -> List[SlowQueryResponse]:
+    return [SlowQueryResponse.model_validate(query) for query in reversed(slow_queries)]
@@ -1,22 +1,32 @@
 import logging
 import uuid
 
-from fastapi import UploadFile, HTTPException, APIRouter, Depends
+from fastapi import UploadFile, HTTPException, APIRouter, Depends, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from eav_backend.config import settings
-from eav_backend.dependencies import get_asset_service
-from eav_backend.models import EntityDefinition
+from eav_backend.dependencies import get_asset_service, get_read_asset_service
+from eav_backend.registry import EntityDefinitionSnapshot
 from eav_backend.schemas.asset import Asset as SchemaAsset
 from eav_backend.models.asset import Asset as ModelAsset
+from eav_backend.models.asset_blob import AssetBlob
 from eav_backend.services.asset_service import AssetService
+from eav_backend.util.content_encoding import accepts_encoding
+from eav_backend.util.http_range import (
+    parse_range,
+    if_range_matches,
+    RangeNotSatisfiable,
+)
 
 logger = logging.getLogger("openepi")
 router = APIRouter(prefix="/assets")
 
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 
 async def get_assets(
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     service: AssetService,
     path_params: list[str],
     param_values: list[str],
@@ -33,7 +43,7 @@ async def get_assets(
 
 
 async def add_asset(
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     file: UploadFile,
     path_params: list[str],
     param_values: list[str],
@@ -58,26 +68,114 @@ async def add_asset(
     logger.info(
         f"Adding asset with file size {file_size} for entity with id {param_dict.get(entity_definition.identifier)}"
     )
-    file_contents = await file.read()
-
-    asset = service.add_asset_for_id_and_path(
+    asset = await run_in_threadpool(
+        service.add_asset_for_id_and_path,
         entity_definition,
-        ModelAsset(name=file.filename, mimetype=file.content_type, file_size=file_size),
-        file_contents,
+        ModelAsset(name=file.filename, mimetype=file.content_type),
+        file.file,
         **param_dict,
     )
 
     return SchemaAsset.model_validate(asset)
 
 
+def representation(request: Request, blob: AssetBlob) -> dict[str, str]:
+    """
+    The headers of the representation of a blob sent for a request. Content
+    compressed in storage is sent as it is stored to clients that accept its
+    encoding, under its own ETag, and decompressed for other clients.
+    """
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{blob.checksum}"'}
+    if blob.content_encoding:
+        headers["Vary"] = "Accept-Encoding"
+        if accepts_encoding(
+            request.headers.get("accept-encoding"), blob.content_encoding
+        ):
+            headers["Content-Encoding"] = blob.content_encoding
+            headers["ETag"] = f'"{blob.checksum}-{blob.content_encoding}"'
+    return headers
+
+
+def stream_content(
+    request: Request,
+    service: AssetService,
+    blob: AssetBlob,
+    headers: dict[str, str],
+    media_type: str,
+) -> Response:
+    """Streams the content of a blob, or the byte range of it the request asks for."""
+    headers = headers | representation(request, blob)
+    encoded = "Content-Encoding" in headers
+    size = blob.stored_size if encoded else blob.size
+
+    byte_range = None
+    if if_range_matches(request.headers.get("if-range"), headers["ETag"]):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416, headers=headers | {"Content-Range": f"bytes */{size}"}
+            )
+
+    start, end = byte_range or (0, size)
+    try:
+        content = service.open_content(blob, start, end, decode=not encoded)
+    except FileNotFoundError:
+        logger.error(f"Content {blob.checksum} is missing from storage")
+        raise HTTPException(
+            status_code=404, detail=f"Content {blob.checksum} not found"
+        )
+
+    headers["Content-Length"] = str(end - start)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(
+        content,
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get(
+    "/content/{checksum}",
+    summary="Get content by checksum",
+    response_class=StreamingResponse,
+    responses={206: {"description": "Partial content"}, 304: {}, 416: {}},
+    tags=["assets"],
+)
+async def get_content(
+    checksum: str,
+    request: Request,
+    service: AssetService = Depends(get_read_asset_service),
+):
+    """
+    Content addressed by its checksum never changes, so it may be cached
+    indefinitely by browsers and CDNs.
+    """
+    blob = service.get_blob(checksum)
+    if not blob or blob.ref_count <= 0:
+        raise HTTPException(status_code=404, detail=f"Content {checksum} not found")
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    etag = representation(request, blob)["ETag"]
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers | {"ETag": etag})
+    return stream_content(request, service, blob, headers, blob.mimetype)
+
+
 @router.get(
     "/{asset_id}",
     summary="Get asset content",
     response_class=StreamingResponse,
+    responses={206: {"description": "Partial content"}, 416: {}},
     tags=["assets"],
 )
 async def get_asset_content(
-    asset_id: uuid.UUID, service: AssetService = Depends(get_asset_service)
+    asset_id: uuid.UUID,
+    request: Request,
+    service: AssetService = Depends(get_read_asset_service),
 ):
     asset = service.get_asset_by_id(asset_id)
     if not asset:
@@ -85,8 +183,27 @@ async def get_asset_content(
             status_code=404, detail=f"Asset with id {asset_id} not found"
         )
 
-    return StreamingResponse(
-        iter([asset.content.content]),
-        media_type=asset.mimetype,
-        headers={"Content-Disposition": f"filename={asset.name}"},
+    return stream_content(
+        request,
+        service,
+        asset.blob,
+        {"Content-Disposition": f"filename={asset.name}"},
+        asset.mimetype,
     )
+
+
+@router.delete(
+    "/{asset_id}",
+    summary="Delete asset",
+    status_code=204,
+    response_class=Response,
+    responses={204: {}, 404: {}},
+    tags=["assets"],
+)
+async def delete_asset(
+    asset_id: uuid.UUID, service: AssetService = Depends(get_asset_service)
+):
+    if not service.remove_asset(asset_id):
+        raise HTTPException(
+            status_code=404, detail=f"Asset with id {asset_id} not found"
+        )
@@ -0,0 +1,154 @@
+import logging
+import uuid
+
+from fastapi import HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from eav_backend.config import settings
+from eav_backend.models.exceptions import (
+    InvalidUploadException,
+    NotFoundException,
+    TooLargeException,
+)
+from eav_backend.registry import EntityDefinitionSnapshot
+from eav_backend.schemas.asset import Asset as SchemaAsset
+from eav_backend.schemas.asset_upload import (
+    AssetUploadRequest,
+    AssetUpload as SchemaAssetUpload,
+    AssetUploadPart as SchemaAssetUploadPart,
+)
+from eav_backend.services.asset_upload_service import AssetUploadService
+from eav_backend.util.request_stream import RequestStream
+
+logger = logging.getLogger("openepi")
+
+MAX_PART_NUMBER = 10000
+
+
+def get_upload_or_404(
+    entity_definition: EntityDefinitionSnapshot,
+    service: AssetUploadService,
+    upload_id: uuid.UUID,
+    param_dict: dict[str, str],
+    for_update: bool = False,
+    with_parts: bool = True,
+):
+    upload = service.get_upload(
+        entity_definition,
+        upload_id,
+        for_update=for_update,
+        with_parts=with_parts,
+        **param_dict,
+    )
+    if not upload:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+    return upload
+
+
+async def start_upload(
+    item: AssetUploadRequest,
+    entity_definition: EntityDefinitionSnapshot,
+    service: AssetUploadService,
+    path_params: list[str],
+    param_values: list[str],
+    **kwargs,
+):
+    param_dict = dict(zip(path_params, param_values))
+    logger.info(
+        f"Starting upload of {item.name} for entity with id {param_dict.get(entity_definition.identifier)}"
+    )
+    upload = service.start_upload(
+        entity_definition, item.name, item.mimetype, **param_dict
+    )
+    return SchemaAssetUpload.model_validate(upload)
+
+
+async def get_upload(
+    entity_definition: EntityDefinitionSnapshot,
+    service: AssetUploadService,
+    path_params: list[str],
+    param_values: list[str],
+    upload_id: uuid.UUID,
+    **kwargs,
+):
+    param_dict = dict(zip(path_params, param_values))
+    upload = get_upload_or_404(entity_definition, service, upload_id, param_dict)
+    return SchemaAssetUpload.model_validate(upload)
+
+
+async def put_upload_part(
+    entity_definition: EntityDefinitionSnapshot,
+    service: AssetUploadService,
+    path_params: list[str],
+    param_values: list[str],
+    upload_id: uuid.UUID,
+    part_number: int,
+    request: Request,
+    **kwargs,
+):
+    param_dict = dict(zip(path_params, param_values))
+    if not 1 <= part_number <= MAX_PART_NUMBER:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Part numbers range from 1 to {MAX_PART_NUMBER}",
+        )
+    if int(request.headers.get("content-length") or 0) > settings.max_upload_part_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Part size exceeds the maximum allowed limit of {settings.max_upload_part_size} bytes",
+        )
+
+    upload = get_upload_or_404(
+        entity_definition, service, upload_id, param_dict, with_parts=False
+    )
+    try:
+        part = await run_in_threadpool(
+            service.put_part,
+            upload,
+            part_number,
+            RequestStream(request, settings.max_upload_part_size),
+            request.headers.get("x-checksum-sha256"),
+        )
+    except InvalidUploadException as e:
+        raise HTTPException(status_code=400, detail=e.msg)
+    except TooLargeException as e:
+        raise HTTPException(status_code=413, detail=e.msg)
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=e.msg)
+    return SchemaAssetUploadPart.model_validate(part)
+
+
+async def complete_upload(
+    entity_definition: EntityDefinitionSnapshot,
+    service: AssetUploadService,
+    path_params: list[str],
+    param_values: list[str],
+    upload_id: uuid.UUID,
+    **kwargs,
+):
+    param_dict = dict(zip(path_params, param_values))
+    upload = get_upload_or_404(entity_definition, service, upload_id, param_dict)
+    logger.info(f"Completing upload {upload_id} with {len(upload.parts)} parts")
+    try:
+        asset = await run_in_threadpool(service.complete_upload, upload)
+    except InvalidUploadException as e:
+        raise HTTPException(status_code=400, detail=e.msg)
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=e.msg)
+    return SchemaAsset.model_validate(asset)
+
+
+async def abort_upload(
+    entity_definition: EntityDefinitionSnapshot,
+    service: AssetUploadService,
+    path_params: list[str],
+    param_values: list[str],
+    upload_id: uuid.UUID,
+    **kwargs,
+):
+    param_dict = dict(zip(path_params, param_values))
+    upload = get_upload_or_404(
+        entity_definition, service, upload_id, param_dict, for_update=True
+    )
+    service.abort_upload(upload)
+    return Response(status_code=204)
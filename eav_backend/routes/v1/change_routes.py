@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from eav_backend.config import settings
+from eav_backend.database import SessionLocal
+from eav_backend.services.change_feed_service import (
+    Change,
+    ChangeFeedService,
+    Position,
+    change_broker,
+)
+
+router = APIRouter(prefix="/v1/changes", tags=["changes"])
+logger = logging.getLogger("openepi")
+
+CHANGE_FEED_DESCRIPTION = (
+    " as Server-Sent Events: create, update and delete events with the id,"
+    " type and version of the entity. To resume after a disconnect, send the id"
+    " of the last event received as the Last-Event-ID header, or as `after`."
+)
+EVENT_STREAM = {200: {"content": {"text/event-stream": {}}}}
+
+
+@router.get(
+    "",
+    summary="Stream the changes of all entities",
+    description="The changes of all entities" + CHANGE_FEED_DESCRIPTION,
+    response_class=StreamingResponse,
+    responses=EVENT_STREAM,
+)
+async def get_changes(
+    after: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    return stream_changes(None, after or last_event_id)
+
+
+@router.get(
+    "/{collection}",
+    summary="Stream the changes of the entities of a collection",
+    description="The changes of the entities of a collection" + CHANGE_FEED_DESCRIPTION,
+    response_class=StreamingResponse,
+    responses=EVENT_STREAM,
+)
+async def get_collection_changes(
+    collection: str,
+    request: Request,
+    after: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    ed = next(
+        (
+            ed
+            for ed in request.app.state.definition_registry
+            if ed.collection_name == collection
+        ),
+        None,
+    )
+    if not ed:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Collection {collection} not found",
+        )
+    return stream_changes(ed.name, after or last_event_id)
+
+
+def stream_changes(
+    entity_type: Optional[str], last_event_id: Optional[str]
+) -> StreamingResponse:
+    try:
+        after = Position.parse(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Invalid event id {last_event_id}",
+        )
+    return StreamingResponse(
+        events(entity_type, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def events(entity_type: Optional[str], after: Optional[Position]):
+    """
+    The events of the changes after a position, or of new changes. The
+    changes the client missed are read from the database up to where the
+    broker was when the client subscribed, the ones after from the broker.
+    """
+    subscription, subscribed_at = change_broker.subscribe(entity_type)
+    try:
+        while after and after < subscribed_at:
+            changes = await asyncio.to_thread(
+                missed_changes, after, subscribed_at, entity_type
+            )
+            for change in changes:
+                yield change.event()
+            if len(changes) < settings.change_feed_batch_size:
+                break
+            after = changes[-1].position
+
+        while True:
+            changes = await subscription.next(settings.change_feed_heartbeat)
+            for change in changes:
+                # Clients resuming on a worker whose broker is behind the
+                # one they came from have seen some of its changes already.
+                if not after or change.position > after:
+                    yield change.event()
+            if subscription.overflowed:
+                logger.info("Dropped a change feed client that fell behind")
+                return
+            if not changes:
+                yield ": keep-alive\n\n"
+    finally:
+        change_broker.unsubscribe(subscription)
+
+
+def missed_changes(
+    after: Position, until: Position, entity_type: Optional[str]
+) -> list[Change]:
+    with SessionLocal() as session:
+        return ChangeFeedService(session).changes_after(after, until, entity_type)
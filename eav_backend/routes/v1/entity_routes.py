@@ -1,30 +1,54 @@
 import logging
+from datetime import datetime, timezone
 from http import HTTPStatus
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from pydantic.main import ModelT
 
 from eav_backend.builders.EntityBuilder import EntityBuilder
-from eav_backend.models import EntityDefinition, Entity
+from eav_backend.database import ReplicaSessionLocal, with_statement_timeout
+from eav_backend.models import Entity
+from eav_backend.models.exceptions import NotFoundException
+from eav_backend.registry import EntityDefinitionSnapshot
 from eav_backend.services.entity_service import EntityService
+from eav_backend.util.collection_counts import (
+    CountMode,
+    collection_counts,
+    TOTAL_COUNT_HEADER,
+    ESTIMATED_COUNT_HEADER,
+)
 
 logger = logging.getLogger("openepi")
 
 
 async def get_entities(
     response_model: type[ModelT],
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     service: EntityService,
     path_params: list[str],
     param_values: list[str],
+    response: Response,
+    count: CountMode = CountMode.NONE,
     **kwargs,
 ) -> list[ModelT]:
     logger.info("Getting entities")
 
-    entities = service.get_entities_by_type(
-        entity_type=entity_definition.name,
-        **dict(zip(path_params, param_values)),
-    )
+    filters = dict(zip(path_params, param_values))
+    entities = service.get_entities_by_type(entity_definition, **filters)
+
+    if count == CountMode.EXACT:
+        response.headers[TOTAL_COUNT_HEADER] = str(
+            collection_counts.get(
+                (entity_definition.name, *filters.values()),
+                lambda: service.count_entities(entity_definition, **filters),
+                lambda: count_in_new_session(entity_definition, filters),
+            )
+        )
+    elif count == CountMode.ESTIMATED:
+        response.headers[TOTAL_COUNT_HEADER] = str(
+            service.estimate_entities(entity_definition, **filters)
+        )
+        response.headers[ESTIMATED_COUNT_HEADER] = "true"
 
     resp_dicts = []
     for entity in entities:
@@ -37,10 +61,17 @@ async def get_entities(
     return resp_dicts
 
 
+def count_in_new_session(
+    entity_definition: EntityDefinitionSnapshot, filters: dict[str, str]
+) -> int:
+    with with_statement_timeout(ReplicaSessionLocal(), "read") as session:
+        return EntityService(session).count_entities(entity_definition, **filters)
+
+
 async def get_entity(
     response_model: type[ModelT],
     service: EntityService,
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     path_params: list[str],
     param_values: list[str],
     **kwargs,
@@ -68,7 +99,7 @@ async def get_entity(
 async def add_entity(
     item: type[ModelT],
     response_model: type[ModelT],
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     service: EntityService,
     path_params: list[str],
     param_values: list[str],
@@ -82,11 +113,14 @@ async def add_entity(
         f"Posting entity of type {entity_definition.name} with params {param_dict}"
     )
 
-    saved_entity = service.create_entity(
-        entity=EntityBuilder.to_entity(entity_definition, item),
-        relations=param_dict,
-        relation_collection=relation_collection,
-    )
+    try:
+        saved_entity = service.create_entity(
+            entity=EntityBuilder.to_entity(entity_definition, item),
+            relations=param_dict,
+            relation_collection=relation_collection,
+        )
+    except NotFoundException as e:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=e.msg)
     response_data = EntityBuilder.to_dict(saved_entity, entity_definition)
     validated_model = response_model.model_validate(response_data)
     return validated_model
@@ -95,11 +129,12 @@ async def add_entity(
 async def update_entity(
     item: type[ModelT],
     response_model: type[ModelT],
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     service: EntityService,
     path_params: list[str],
     param_values: list[str],
     relation_collection: str = None,
+    **kwargs,
 ) -> ModelT:
     param_dict = {}
     if path_params and param_values:
@@ -118,28 +153,59 @@ async def update_entity(
             detail=f"Entity with id {entity_id} of type {entity_definition.name} not found",
         )
 
-    merged: Entity = EntityBuilder.merge(
-        to_update, EntityBuilder.to_entity(entity_definition, item)
+    diff = EntityBuilder.diff(
+        entity_definition, to_update, EntityBuilder.to_entity(entity_definition, item)
     )
+    if not service.apply_diff(diff):
+        logger.info(f"Entity {entity_id} of type {entity_definition.name} is unchanged")
 
-    updated_entity = service.update_entity(
-        entity=merged,
-        relations=param_dict,
-        relation_collection=relation_collection,
-    )
-
-    response_data = EntityBuilder.to_dict(updated_entity, entity_definition)
+    response_data = EntityBuilder.to_dict(to_update, entity_definition)
     validated_model = response_model.model_validate(response_data)
 
     return validated_model
 
 
+async def patch_entity(
+    item: type[ModelT],
+    entity_definition: EntityDefinitionSnapshot,
+    service: EntityService,
+    path_params: list[str],
+    param_values: list[str],
+    **kwargs,
+):
+    param_dict = {}
+    if path_params and param_values:
+        param_dict = dict(zip(path_params, param_values))
+    logger.info(
+        f"Patching entity of type {entity_definition.name} with params {param_dict}"
+    )
+
+    entity_id: str = param_dict.get(entity_definition.identifier)
+    # Only the attributes in the patch are loaded, not the nested entities.
+    to_update: Entity = service.get_entity_by_type_and_path(
+        entity_definition,
+        with_related=False,
+        attributes=item.model_fields_set,
+        **param_dict,
+    )
+    if not to_update:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=f"Entity with id {entity_id} of type {entity_definition.name} not found",
+        )
+
+    if not service.apply_diff(EntityBuilder.patch(entity_definition, to_update, item)):
+        logger.info(f"Entity {entity_id} of type {entity_definition.name} is unchanged")
+
+
 async def delete_entity(
-    entity_definition: EntityDefinition,
+    entity_definition: EntityDefinitionSnapshot,
     service: EntityService,
     path_params: list[str],
     param_values: list[str],
     relation_collection: str = None,
+    cascade: bool = False,
+    include_assets: bool = False,
     **kwargs,
 ):
     param_dict = {}
@@ -148,7 +214,9 @@ async def delete_entity(
 
     identifier: str = param_dict.get(entity_definition.identifier)
 
-    entity = service.get_entity_by_type_and_path(entity_definition, **param_dict)
+    entity = service.get_entity_by_type_and_path(
+        entity_definition, with_related=False, **param_dict
+    )
     if not entity:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
@@ -156,4 +224,16 @@ async def delete_entity(
         )
 
     entity.is_deleted = True
-    service.update_entity(entity, param_dict, relation_collection)
+    entity.deleted_at = datetime.now(timezone.utc)
+    try:
+        service.update_entity(entity, param_dict, relation_collection)
+    except NotFoundException as e:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=e.msg)
+
+    if include_assets:
+        service.delete_assets([entity.id])
+    if cascade:
+        deleted = service.delete_subtree(entity, include_assets)
+        logger.info(
+            f"Deleted {deleted} entities nested under {entity_definition.name} {identifier}"
+        )
@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime
+
+from pydantic import Field
+
+from eav_backend.schemas.basemodel import BaseModel
+
+
+class AssetUploadRequest(BaseModel):
+    name: str = Field(description="The name of the file asset.")
+    mimetype: str = Field(
+        description="The MIME type of the file (e.g., application/pdf, image/png)."
+    )
+
+
+class AssetUploadPart(BaseModel):
+    part_number: int = Field(description="The position of the part in the file.")
+    size: int = Field(description="The size of the part in bytes.")
+    checksum: str = Field(description="The SHA-256 checksum of the part.")
+
+
+class AssetUpload(BaseModel):
+    id: uuid.UUID = Field(description="Unique identifier for the upload.")
+    name: str = Field(description="The name of the file asset.")
+    mimetype: str = Field(description="The MIME type of the file.")
+    created_at: datetime = Field(description="When the upload was started.")
+    expires_at: datetime = Field(
+        description="When the upload is removed if it has not been completed."
+    )
+    parts: list[AssetUploadPart] = Field(
+        default_factory=list, description="The parts received so far."
+    )
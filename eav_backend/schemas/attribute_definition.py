@@ -1,5 +1,5 @@
 import uuid
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from pydantic import Field
 
@@ -16,6 +16,10 @@ class AttributeDefinitionRequest(BaseModel):
         default=False,
     )
     allowed_values: Optional[List[str]] = None
+    default: Optional[Any] = Field(
+        description="Value written to existing entities when this attribute becomes required.",
+        default=None,
+    )
 
 
 class AttributeDefinitionResponse(BaseModel):
@@ -7,3 +7,10 @@ class BaseModel(PydanticBaseModel, abc.ABC):
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+class MergePatchModel(BaseModel, abc.ABC):
+    """A JSON merge patch: fields that are left out are kept, null removes a value."""
+
+    class Config:
+        extra = "forbid"
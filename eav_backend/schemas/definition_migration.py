@@ -0,0 +1,33 @@
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import Field
+
+from eav_backend.models.definition_migration import (
+    DefinitionMigrationKind,
+    DefinitionMigrationStatus,
+)
+from eav_backend.schemas.basemodel import BaseModel
+
+
+class DefinitionMigrationJobResponse(BaseModel):
+    id: uuid.UUID
+    entity_definition_id: uuid.UUID
+    entity_type: str
+    kind: DefinitionMigrationKind
+    status: DefinitionMigrationStatus
+    attribute_name: str
+    attribute_type: str
+    default_value: Optional[Any] = None
+    processed: int = Field(description="Number of entities processed so far.")
+    total: Optional[int] = Field(
+        default=None, description="Number of entities the job will process."
+    )
+    affected: int = Field(
+        description="Rows written or deleted, or entities missing the attribute for VALIDATE jobs."
+    )
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
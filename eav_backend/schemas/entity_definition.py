@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import uuid
-from typing import List
+from typing import List, Optional
 
 from pydantic import Field, field_validator
 
@@ -36,6 +36,12 @@ class EntityDefinitionRequest(BaseModel):
         description="Whether this entity supports to have assets/files linked to it.",
         default=False,
     )
+    retention_days: Optional[int] = Field(
+        alias="retentionDays",
+        description="Days deleted entities are kept before they are compacted, forever if not set.",
+        default=None,
+        ge=0,
+    )
     required_attributes: List[AttributeDefinitionRequest] = Field(
         alias="requiredAttributes",
         description="The required attributes for this entity.",
@@ -73,6 +79,11 @@ class EntityDefinitionResponse(BaseModel):
         description="Whether this entity supports to have assets/files linked to it.",
         default=False,
     )
+    retention_days: Optional[int] = Field(
+        alias="retentionDays",
+        description="Days deleted entities are kept before they are compacted, forever if not set.",
+        default=None,
+    )
 
     required_attributes: List[AttributeDefinitionResponse] = Field(
         alias="requiredAttributes",
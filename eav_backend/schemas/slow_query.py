@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import Field
+
+from eav_backend.schemas.basemodel import BaseModel
+
+
+class SlowQueryResponse(BaseModel):
+    statement: str
+    parameters: Any = Field(
+        description="Types and lengths of the bind parameters, without their values."
+    )
+    duration_ms: float
+    engine: str
+    entity_definition: Optional[str] = None
+    path: dict[str, str]
+    plan: Optional[str] = Field(
+        default=None, description="EXPLAIN (ANALYZE, BUFFERS) output, if sampled."
+    )
+    occurred_at: datetime
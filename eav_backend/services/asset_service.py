@@ -1,17 +1,23 @@
-import hashlib
 import logging
 import uuid
+from datetime import timedelta
+from typing import BinaryIO, Iterator, Optional
 
-from sqlalchemy.dialects import postgresql
+from sqlalchemy import update, delete, func, case
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session, aliased
 
 from eav_backend.models import (
     Asset,
-    EntityDefinition,
+    AssetBlob,
     EntityRelation,
     Entity,
-    AssetContent,
 )
+from eav_backend.registry import EntityDefinitionSnapshot
+from eav_backend.storage import get_asset_storage, StoredContent
+from eav_backend.storage.base import slice_chunks
+from eav_backend.storage.compression import store_content, get_codec
+from eav_backend.util.slow_queries import describe_queries
 
 
 class AssetService:
@@ -29,7 +35,7 @@ class AssetService:
         return self.session.query(Asset).filter(Asset.id == asset_id).first()
 
     def get_assets_by_id_and_path(
-        self, ed: EntityDefinition, **filters
+        self, ed: EntityDefinitionSnapshot, **filters
     ) -> list["Asset"]:
         identifier = filters.pop(ed.identifier)
 
@@ -65,29 +71,134 @@ class AssetService:
 
             current_alias = parent_alias
 
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(
-                query.statement.compile(
-                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
-                )
-            )
-
-        return query.all()
+        with describe_queries(ed.name, filters | {ed.identifier: identifier}):
+            return query.all()
 
     def add_asset_for_id_and_path(
         self,
-        entity_definition: EntityDefinition,
+        entity_definition: EntityDefinitionSnapshot,
         asset: Asset,
-        contents: bytes,
+        stream: BinaryIO,
         **param_dict,
     ):
-
+        """
+        Streams the content of an asset to the configured storage backend and
+        stores its metadata. Content that is already stored under the same
+        checksum is referenced instead, and the new copy is removed again.
+        """
         entity_identifier = param_dict.get(entity_definition.identifier)
-        asset.entity_id = uuid.UUID(entity_identifier)
-        asset.content = AssetContent(content=contents)
-        asset.checksum = hashlib.sha256(contents).hexdigest()
+        storage = get_asset_storage()
+        stored = store_content(storage, stream, asset.mimetype)
+
+        try:
+            storage_key = self.reference_blob(stored, asset.mimetype, storage.name)
+            asset.entity_id = uuid.UUID(entity_identifier)
+            asset.file_size = stored.size
+            asset.checksum = stored.checksum
+            self.session.add(asset)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            storage.delete(stored.key)
+            raise
+
+        if storage_key != stored.key:
+            self.logger.debug(f"Content of asset {asset.id} is already stored")
+            storage.delete(stored.key)
+        return asset
 
-        self.session.add(asset)
-        self.session.flush()
+    def reference_blob(
+        self, stored: StoredContent, mimetype: str, storage_backend: str
+    ) -> str:
+        """
+        Adds a reference to the blob with a checksum, creating the blob with the
+        given storage location if there is none. Returns the storage key of the
+        blob. The row lock taken here keeps the garbage collection from removing
+        a blob that is referenced again.
+        """
+        statement = insert(AssetBlob).values(
+            checksum=stored.checksum,
+            size=stored.size,
+            mimetype=mimetype,
+            content_encoding=stored.content_encoding,
+            stored_size=stored.stored_size,
+            storage_backend=storage_backend,
+            storage_key=stored.key,
+            ref_count=1,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[AssetBlob.checksum],
+            set_={
+                "ref_count": AssetBlob.ref_count + 1,
+                "orphaned_at": None,
+            },
+        ).returning(AssetBlob.storage_key)
+        return self.session.execute(statement).scalar_one()
+
+    def remove_asset(self, asset_id: uuid.UUID) -> bool:
+        asset = self.get_asset_by_id(asset_id)
+        if not asset:
+            return False
+        self.session.execute(
+            update(AssetBlob)
+            .where(AssetBlob.checksum == asset.checksum)
+            .values(
+                ref_count=AssetBlob.ref_count - 1,
+                orphaned_at=case(
+                    (AssetBlob.ref_count <= 1, func.now()), else_=AssetBlob.orphaned_at
+                ),
+            )
+        )
+        self.session.delete(asset)
         self.session.commit()
-        return asset
+        return True
+
+    def get_blob(self, checksum: str) -> Optional[AssetBlob]:
+        return self.session.get(AssetBlob, checksum)
+
+    def collect_garbage(self, grace_period: int) -> int:
+        """
+        Removes blobs that have not been referenced for `grace_period` seconds,
+        first from the database and then from storage, so a failure can only
+        leave unreferenced content behind.
+        """
+        removed = self.session.execute(
+            delete(AssetBlob)
+            .where(
+                AssetBlob.ref_count <= 0,
+                AssetBlob.orphaned_at < func.now() - timedelta(seconds=grace_period),
+            )
+            .returning(AssetBlob.storage_backend, AssetBlob.storage_key)
+        ).all()
+        self.session.commit()
+
+        for storage_backend, storage_key in removed:
+            try:
+                get_asset_storage(storage_backend).delete(storage_key)
+            except Exception as e:
+                self.logger.error(
+                    f"Could not remove {storage_key} from {storage_backend} storage: {e}"
+                )
+        return len(removed)
+
+    def open_content(
+        self,
+        blob: AssetBlob,
+        start: int = 0,
+        end: Optional[int] = None,
+        decode: bool = True,
+    ) -> Iterator[bytes]:
+        """
+        Opens the content of a blob, from byte `start` up to byte `end`.
+        Compressed content is decompressed unless `decode` is false, in which
+        case the offsets are those of the stored bytes.
+        """
+        storage = get_asset_storage(blob.storage_backend)
+        codec = get_codec(blob.content_encoding)
+        if codec is None or not decode:
+            return storage.open(blob.storage_key, start, end)
+        return slice_chunks(
+            codec.decompress_chunks(storage.open(blob.storage_key)),
+            start,
+            blob.size if end is None else end,
+        )
@@ -0,0 +1,279 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, lazyload
+
+from eav_backend.config import settings
+from eav_backend.models import Asset, AssetUpload, AssetUploadPart
+from eav_backend.models.exceptions import InvalidUploadException, NotFoundException
+from eav_backend.registry import EntityDefinitionSnapshot
+from eav_backend.services.asset_service import AssetService
+from eav_backend.storage import get_asset_storage, AssetStorage, StoredContent
+from eav_backend.storage.base import HashingReader
+from eav_backend.storage.compression import store_content
+
+
+class AssetUploadService:
+    """
+    Resumable uploads: an upload is started, its parts are stored in any order
+    (and stored again to retry them), and completing it combines the parts
+    into the content of a new asset.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.logger = logging.getLogger("openepi")
+
+    def start_upload(
+        self,
+        entity_definition: EntityDefinitionSnapshot,
+        name: str,
+        mimetype: str,
+        **param_dict,
+    ) -> AssetUpload:
+        upload = AssetUpload(
+            entity_id=uuid.UUID(param_dict.get(entity_definition.identifier)),
+            name=name,
+            mimetype=mimetype,
+            storage_backend=get_asset_storage().name,
+            expires_at=datetime.now() + timedelta(seconds=settings.asset_upload_expiry),
+            # A new upload has no parts, there is no need to load them.
+            parts=[],
+        )
+        self.session.add(upload)
+        self.session.commit()
+        return upload
+
+    def get_upload(
+        self,
+        entity_definition: EntityDefinitionSnapshot,
+        upload_id: uuid.UUID,
+        for_update: bool = False,
+        with_parts: bool = True,
+        **param_dict,
+    ) -> Optional[AssetUpload]:
+        query = select(AssetUpload).where(
+            AssetUpload.id == upload_id,
+            AssetUpload.entity_id
+            == uuid.UUID(param_dict.get(entity_definition.identifier)),
+            AssetUpload.expires_at > datetime.now(),
+        )
+        if for_update:
+            query = query.with_for_update()
+        if not with_parts:
+            query = query.options(lazyload(AssetUpload.parts))
+        return self.session.scalars(query).first()
+
+    def put_part(
+        self,
+        upload: AssetUpload,
+        part_number: int,
+        stream: BinaryIO,
+        expected_checksum: Optional[str] = None,
+    ) -> AssetUploadPart:
+        """
+        Streams a part to storage. A part that is stored again replaces the
+        previous one, so a failed part can simply be retried.
+        """
+        upload_id = upload.id
+        storage = get_asset_storage(upload.storage_backend)
+        # Don't hold on to a connection while the part is streamed.
+        self.session.close()
+
+        stored = storage.write(stream)
+        if expected_checksum and expected_checksum.lower() != stored.checksum:
+            storage.delete(stored.key)
+            raise InvalidUploadException(
+                f"Checksum of part {part_number} is {stored.checksum}, expected {expected_checksum}"
+            )
+
+        try:
+            # Completing an upload locks it, so a part can't be added while it
+            # is turned into an asset.
+            if not self.session.scalar(
+                select(AssetUpload.id)
+                .where(AssetUpload.id == upload_id)
+                .with_for_update(read=True)
+            ):
+                raise NotFoundException(f"Upload {upload_id} no longer exists")
+            replaced = self.session.scalar(
+                select(AssetUploadPart.storage_key)
+                .where(
+                    AssetUploadPart.upload_id == upload_id,
+                    AssetUploadPart.part_number == part_number,
+                )
+                .with_for_update()
+            )
+            values = {
+                "size": stored.size,
+                "checksum": stored.checksum,
+                "storage_key": stored.key,
+                "created_at": datetime.now(),
+            }
+            part = self.session.scalars(
+                insert(AssetUploadPart)
+                .values(upload_id=upload_id, part_number=part_number, **values)
+                .on_conflict_do_update(
+                    index_elements=[
+                        AssetUploadPart.upload_id,
+                        AssetUploadPart.part_number,
+                    ],
+                    set_=values,
+                )
+                .returning(AssetUploadPart)
+            ).one()
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            storage.delete(stored.key)
+            raise
+
+        if replaced:
+            storage.delete(replaced)
+        return part
+
+    def complete_upload(self, upload: AssetUpload) -> Asset:
+        """
+        Combines the parts of an upload, which must be numbered from 1 without
+        gaps, into the content of a new asset. The parts are combined before
+        the upload is locked, which only turns it into the asset, so an upload
+        is completed only once and not with parts that changed meanwhile.
+        """
+        parts = upload.parts
+        if not parts:
+            raise InvalidUploadException("The upload has no parts")
+        missing = sorted(
+            set(range(1, parts[-1].part_number + 1))
+            - {part.part_number for part in parts}
+        )
+        if missing:
+            raise InvalidUploadException(f"The upload is missing parts {missing}")
+
+        upload_id = upload.id
+        storage = get_asset_storage(upload.storage_backend)
+        part_keys = [part.storage_key for part in parts]
+        asset = Asset(
+            name=upload.name,
+            mimetype=upload.mimetype,
+            entity_id=upload.entity_id,
+        )
+        # Don't hold on to a connection while the parts are combined.
+        self.session.close()
+
+        stored = self._combine(storage, parts, asset.mimetype)
+        asset.file_size = stored.size
+        asset.checksum = stored.checksum
+        try:
+            locked_keys = self.session.scalars(
+                select(AssetUploadPart.storage_key)
+                .join(AssetUpload)
+                .where(AssetUpload.id == upload_id)
+                .order_by(AssetUploadPart.part_number)
+                .with_for_update(of=AssetUpload)
+            ).all()
+            if not locked_keys:
+                raise NotFoundException(f"Upload {upload_id} no longer exists")
+            if locked_keys != part_keys:
+                raise InvalidUploadException(
+                    "Parts of the upload were stored while it was completed"
+                )
+            storage_key = AssetService(self.session).reference_blob(
+                stored, asset.mimetype, storage.name
+            )
+            self.session.add(asset)
+            self.session.execute(delete(AssetUpload).where(AssetUpload.id == upload_id))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            if stored.key not in part_keys:
+                storage.delete(stored.key)
+            raise
+
+        self._delete_keys(
+            storage.name,
+            [key for key in {stored.key, *part_keys} if key != storage_key],
+        )
+        return asset
+
+    def _combine(
+        self, storage: AssetStorage, parts: list[AssetUploadPart], mimetype: str
+    ) -> StoredContent:
+        """
+        The content of the parts, one after the other. A single part is used as
+        it is. Backends that can combine content themselves do so without
+        writing it again, and the combined content is only read to compute its
+        checksum. Otherwise the parts are read and stored again.
+        """
+        if len(parts) == 1:
+            part = parts[0]
+            return StoredContent(
+                key=part.storage_key,
+                size=part.size,
+                checksum=part.checksum,
+                stored_size=part.size,
+            )
+
+        part_keys = [part.storage_key for part in parts]
+        sizes = [part.size for part in parts]
+        if key := storage.combine(part_keys, sizes):
+            try:
+                # Content is addressed by the checksum of all of it, which the
+                # checksums of the parts don't give.
+                content = HashingReader(storage.reader([key]), storage.chunk_size)
+                for _ in content:
+                    pass
+            except BaseException:
+                storage.delete(key)
+                raise
+            return content.stored(key)
+        return store_content(storage, storage.reader(part_keys), mimetype)
+
+    def abort_upload(self, upload: AssetUpload):
+        part_keys = [part.storage_key for part in upload.parts]
+        self.session.delete(upload)
+        self.session.commit()
+        self._delete_keys(upload.storage_backend, part_keys)
+
+    def remove_expired(self) -> int:
+        """Removes uploads that were neither completed nor aborted before they expired."""
+        expired = self.session.scalars(
+            select(AssetUpload)
+            .where(AssetUpload.expires_at <= datetime.now())
+            .with_for_update(skip_locked=True)
+        ).all()
+        removed = self.delete_uploads(expired)
+        self.session.commit()
+
+        self.remove_part_content(removed)
+        return len(removed)
+
+    def delete_uploads(self, uploads: list[AssetUpload]) -> list[tuple[str, list[str]]]:
+        """
+        Deletes uploads in the session, and returns the storage keys of their
+        parts to remove with remove_part_content once the deletion is committed.
+        """
+        removed = [
+            (upload.storage_backend, [part.storage_key for part in upload.parts])
+            for upload in uploads
+        ]
+        for upload in uploads:
+            self.session.delete(upload)
+        return removed
+
+    def remove_part_content(self, removed: list[tuple[str, list[str]]]):
+        for storage_backend, part_keys in removed:
+            self._delete_keys(storage_backend, part_keys)
+
+    def _delete_keys(self, storage_backend: str, keys: list[str]):
+        storage = get_asset_storage(storage_backend)
+        for key in keys:
+            try:
+                storage.delete(key)
+            except Exception as e:
+                self.logger.error(
+                    f"Could not remove upload part {key} from {storage_backend} storage: {e}"
+                )
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+import select as io_select
+import threading
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import select, delete, func, tuple_, BigInteger, Text
+from sqlalchemy.orm import Session
+
+from eav_backend.config import settings
+from eav_backend.database import SessionLocal, engine
+from eav_backend.models import EntityChange
+
+logger = logging.getLogger("openepi")
+
+CHANGE_CHANNEL = "entity_change"
+
+
+@dataclass(frozen=True, order=True)
+class Position:
+    """Where a change is in the feed, sent to clients as the id of its event."""
+
+    transaction_id: int
+    id: int
+
+    def __str__(self) -> str:
+        return f"{self.transaction_id}-{self.id}"
+
+    @classmethod
+    def parse(cls, value: str) -> "Position":
+        transaction_id, id = value.split("-")
+        return cls(int(transaction_id), int(id))
+
+
+@dataclass(frozen=True)
+class Change:
+    position: Position
+    entity_id: uuid.UUID
+    entity_type: str
+    operation: str
+    version: int
+    changed_at: datetime
+
+    def event(self) -> str:
+        data = {
+            "id": str(self.entity_id),
+            "entityType": self.entity_type,
+            "version": self.version,
+            "changedAt": self.changed_at.isoformat(),
+        }
+        return (
+            f"id: {self.position}\n"
+            f"event: {self.operation}\n"
+            f"data: {json.dumps(data)}\n\n"
+        )
+
+
+def visible_before():
+    """
+    The oldest transaction that is still running. Changes of transactions
+    before it can no longer be joined by changes with a lower position.
+    """
+    return func.pg_snapshot_xmin(func.pg_current_snapshot()).cast(Text).cast(BigInteger)
+
+
+class ChangeFeedService:
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def position(self) -> Position:
+        """The position before all changes that are not readable yet."""
+        return Position(self.session.scalar(select(visible_before())), 0)
+
+    def changes_after(
+        self,
+        after: Position,
+        until: Optional[Position] = None,
+        entity_type: Optional[str] = None,
+    ) -> list[Change]:
+        """
+        Up to CHANGE_FEED_BATCH_SIZE readable changes after a position, and up
+        to `until`, in the order of the feed.
+        """
+        position = tuple_(EntityChange.transaction_id, EntityChange.id)
+        query = (
+            select(EntityChange)
+            .where(
+                position > tuple_(after.transaction_id, after.id),
+                EntityChange.transaction_id < visible_before(),
+            )
+            .order_by(EntityChange.transaction_id, EntityChange.id)
+            .limit(settings.change_feed_batch_size)
+        )
+        if until:
+            query = query.where(position <= tuple_(until.transaction_id, until.id))
+        if entity_type:
+            query = query.where(EntityChange.entity_type == entity_type)
+        changes = [
+            Change(
+                position=Position(change.transaction_id, change.id),
+                entity_id=change.entity_id,
+                entity_type=change.entity_type,
+                operation=change.operation,
+                version=change.version,
+                changed_at=change.changed_at,
+            )
+            for change in self.session.scalars(query)
+        ]
+        self.session.commit()
+        return changes
+
+    def prune(self, retention: int) -> int:
+        """Removes the changes older than `retention` seconds."""
+        removed = self.session.execute(
+            delete(EntityChange).where(
+                EntityChange.changed_at < func.now() - timedelta(seconds=retention)
+            )
+        ).rowcount
+        self.session.commit()
+        return removed
+
+
+class Subscription:
+    """
+    The changes waiting to be sent to one client. A client that falls more
+    than CHANGE_FEED_BUFFER_SIZE changes behind is dropped, and resumes from
+    its last event when it reconnects.
+    """
+
+    def __init__(self, entity_type: Optional[str]):
+        self.entity_type = entity_type
+        self.changes: deque[Change] = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+    def push(self, changes: list[Change]):
+        if len(self.changes) + len(changes) > settings.change_feed_buffer_size:
+            self.overflowed = True
+        else:
+            self.changes.extend(changes)
+        self.ready.set()
+
+    async def next(self, timeout: float) -> list[Change]:
+        """The waiting changes, or none if there were none within the timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except TimeoutError:
+            return []
+        self.ready.clear()
+        changes = list(self.changes)
+        self.changes.clear()
+        return changes
+
+
+class ChangeBroker:
+    """
+    Reads the changes once per worker and fans them out to the subscribers
+    of the change feed, which hold no database connection. A thread LISTENs
+    on one connection and reads the new changes when it is notified, and
+    every CHANGE_FEED_POLL_INTERVAL seconds, as changes held back behind a
+    running transaction become readable without a notification.
+    """
+
+    def __init__(self):
+        self.subscribers: dict[Optional[str], set[Subscription]] = defaultdict(set)
+        # The position of the last change published to the subscribers, only
+        # changed on the event loop, like the subscribers.
+        self.position: Optional[Position] = None
+        self.read_position: Optional[Position] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        with SessionLocal() as session:
+            self.position = self.read_position = ChangeFeedService(session).position()
+        self.loop = loop
+        self.stopped.clear()
+        self.thread = threading.Thread(
+            target=self._run, name="change-feed", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=settings.change_feed_poll_interval + 1)
+
+    def subscribe(self, entity_type: Optional[str]) -> tuple[Subscription, Position]:
+        """
+        A subscription to the changes of a type, or of all types, and the
+        position it receives changes after.
+        """
+        subscription = Subscription(entity_type)
+        self.subscribers[entity_type].add(subscription)
+        return subscription, self.position
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers[subscription.entity_type].discard(subscription)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"Listening for entity changes failed: {e}")
+                self.stopped.wait(settings.change_feed_poll_interval)
+
+    def _listen(self):
+        # A connection of its own, outside the pool, with the options of the
+        # engine; the connection URL itself is not one psycopg2 can parse.
+        args, kwargs = engine.dialect.create_connect_args(engine.url)
+        connection = psycopg2.connect(*args, **kwargs)
+        try:
+            connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+            while not self.stopped.is_set():
+                # Also reads the changes made while not listening.
+                self._read()
+                ready, _, _ = io_select.select(
+                    [connection], [], [], settings.change_feed_poll_interval
+                )
+                if ready:
+                    connection.poll()
+                    connection.notifies.clear()
+        finally:
+            connection.close()
+
+    def _read(self):
+        with SessionLocal() as session:
+            service = ChangeFeedService(session)
+            while changes := service.changes_after(self.read_position):
+                self.read_position = changes[-1].position
+                self.loop.call_soon_threadsafe(self._publish, changes)
+                if len(changes) < settings.change_feed_batch_size:
+                    break
+
+    def _publish(self, changes: list[Change]):
+        self.position = changes[-1].position
+        for subscription in self.subscribers.get(None, ()):
+            subscription.push(changes)
+        by_type = defaultdict(list)
+        for change in changes:
+            by_type[change.entity_type].append(change)
+        for entity_type, typed_changes in by_type.items():
+            for subscription in self.subscribers.get(entity_type, ()):
+                subscription.push(typed_changes)
+
+
+change_broker = ChangeBroker()
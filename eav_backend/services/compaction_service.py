@@ -0,0 +1,178 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import select, insert, update, delete, func, case, or_, literal
+from sqlalchemy.orm import Session
+
+from eav_backend.config import settings
+from eav_backend.models import (
+    Asset,
+    AssetBlob,
+    AssetUpload,
+    Attribute,
+    Entity,
+    EntityArchive,
+    EntityDefinition,
+    EntityRelation,
+)
+from eav_backend.services.asset_upload_service import AssetUploadService
+
+logger = logging.getLogger("openepi")
+
+
+class CompactionService:
+    """
+    Removes deleted entities once the retention of their definition has passed,
+    together with the entities nested under them, their attributes, relations,
+    assets and unfinished uploads. Entities are archived to entity_archive
+    first, unless COMPACTION_ARCHIVE is false. The content of the assets is
+    left to the asset garbage collection, as other assets may share it.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def compact(self) -> int:
+        """Compacts the expired entities of all definitions, returns how many were removed."""
+        retentions = self.session.execute(
+            select(EntityDefinition.name, EntityDefinition.retention_days).where(
+                EntityDefinition.retention_days.is_not(None)
+            )
+        ).all()
+        self.session.commit()
+
+        compacted = 0
+        for entity_type, retention_days in retentions:
+            while removed := self.compact_batch(entity_type, retention_days):
+                compacted += removed
+                time.sleep(settings.compaction_batch_delay)
+        return compacted
+
+    def compact_batch(self, entity_type: str, retention_days: int) -> int:
+        """
+        Removes up to COMPACTION_BATCH_SIZE expired entities of a type with
+        their subtrees in one transaction. The expired entities are locked with
+        SKIP LOCKED, so workers that compact at the same time take different
+        batches.
+        """
+        roots = self.session.scalars(
+            select(Entity.id)
+            .where(
+                Entity.entity_type == entity_type,
+                Entity.is_deleted == True,
+                Entity.deleted_at < func.now() - timedelta(days=retention_days),
+            )
+            .order_by(Entity.deleted_at)
+            .limit(settings.compaction_batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not roots:
+            self.session.rollback()
+            return 0
+
+        entity_ids = self._subtree(roots)
+        if settings.compaction_archive:
+            self.session.execute(self._archive_statement(entity_ids))
+
+        uploads = AssetUploadService(self.session)
+        removed_parts = uploads.delete_uploads(
+            self.session.scalars(
+                select(AssetUpload).where(AssetUpload.entity_id.in_(entity_ids))
+            ).all()
+        )
+        self._release_blobs(entity_ids)
+        self.session.execute(delete(Asset).where(Asset.entity_id.in_(entity_ids)))
+        self.session.execute(
+            delete(Attribute).where(Attribute.entity_id.in_(entity_ids))
+        )
+        self.session.execute(
+            delete(EntityRelation).where(
+                or_(
+                    EntityRelation.source_entity_id.in_(entity_ids),
+                    EntityRelation.target_entity_id.in_(entity_ids),
+                )
+            )
+        )
+        self.session.execute(delete(Entity).where(Entity.id.in_(entity_ids)))
+        self.session.commit()
+
+        uploads.remove_part_content(removed_parts)
+        logger.info(
+            f"Compacted {len(roots)} deleted {entity_type} entities,"
+            f" {len(entity_ids)} entities in total"
+        )
+        return len(entity_ids)
+
+    def _subtree(self, roots: list[uuid.UUID]) -> list[uuid.UUID]:
+        """The ids of the entities and everything nested under them, deleted or not."""
+        subtree = (
+            select(Entity.id).where(Entity.id.in_(roots)).cte("subtree", recursive=True)
+        )
+        subtree = subtree.union(
+            select(EntityRelation.target_entity_id).join(
+                subtree, EntityRelation.source_entity_id == subtree.c.id
+            )
+        )
+        return self.session.scalars(select(subtree.c.id)).all()
+
+    @staticmethod
+    def _archive_statement(entity_ids: list[uuid.UUID]):
+        def rows(table, condition):
+            return (
+                select(
+                    func.coalesce(
+                        func.jsonb_agg(func.to_jsonb(table.table_valued())),
+                        literal([], type_=EntityArchive.data.type),
+                    )
+                )
+                .where(condition)
+                .scalar_subquery()
+            )
+
+        attribute = Attribute.__table__
+        relation = EntityRelation.__table__
+        asset = Asset.__table__
+        return insert(EntityArchive).from_select(
+            ["id", "entity_type", "deleted_at", "data"],
+            select(
+                Entity.id,
+                Entity.entity_type,
+                Entity.deleted_at,
+                func.jsonb_build_object(
+                    "attributes",
+                    rows(attribute, attribute.c.entity_id == Entity.id),
+                    "relations",
+                    rows(
+                        relation,
+                        or_(
+                            relation.c.source_entity_id == Entity.id,
+                            relation.c.target_entity_id == Entity.id,
+                        ),
+                    ),
+                    "assets",
+                    rows(asset, asset.c.entity_id == Entity.id),
+                ),
+            ).where(Entity.id.in_(entity_ids)),
+        )
+
+    def _release_blobs(self, entity_ids: list[uuid.UUID]):
+        """Drops the references of the assets of entities to their blobs, like remove_asset."""
+        references = (
+            select(Asset.checksum, func.count().label("count"))
+            .where(Asset.entity_id.in_(entity_ids))
+            .group_by(Asset.checksum)
+            .subquery()
+        )
+        self.session.execute(
+            update(AssetBlob)
+            .where(AssetBlob.checksum == references.c.checksum)
+            .values(
+                ref_count=AssetBlob.ref_count - references.c.count,
+                orphaned_at=case(
+                    (AssetBlob.ref_count <= references.c.count, func.now()),
+                    else_=AssetBlob.orphaned_at,
+                ),
+            )
+        )
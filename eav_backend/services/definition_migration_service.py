@@ -0,0 +1,300 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    select,
+    update,
+    insert,
+    delete,
+    exists,
+    func,
+    literal,
+    or_,
+    and_,
+    text,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from eav_backend.config import settings
+from eav_backend.database import SessionLocal
+from eav_backend.models import (
+    Attribute,
+    Entity,
+    DefinitionMigrationJob,
+    DefinitionMigrationKind,
+    DefinitionMigrationStatus,
+)
+from eav_backend.models.attribute_codec import codec_for_type
+
+logger = logging.getLogger("openepi")
+
+
+class DefinitionMigrationService:
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_jobs(
+        self, entity_definition_id: Optional[uuid.UUID] = None
+    ) -> List[DefinitionMigrationJob]:
+        stmt = select(DefinitionMigrationJob).order_by(
+            DefinitionMigrationJob.created_at.desc()
+        )
+        if entity_definition_id:
+            stmt = stmt.where(
+                DefinitionMigrationJob.entity_definition_id == entity_definition_id
+            )
+        return self.session.scalars(stmt).all()
+
+    def get_job(self, id: uuid.UUID) -> Optional[DefinitionMigrationJob]:
+        return self.session.get(DefinitionMigrationJob, id)
+
+
+class DefinitionMigrationRunner:
+    """
+    Applies attribute changes of an updated entity definition to existing
+    entities. Jobs are processed one at a time on a background thread, in
+    small keyset-paginated batches that each commit on their own so no lock on
+    the entity or attribute tables is held for longer than a single batch.
+    Progress is stored on the job row, which lets any worker report it and a
+    restarted worker resume from the last committed batch.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.jobs: queue.Queue[uuid.UUID] = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def submit(self, job_id: uuid.UUID):
+        self.jobs.put(job_id)
+        with self.lock:
+            if not self.thread or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._work, name="definition-migrations", daemon=True
+                )
+                self.thread.start()
+
+    def resume_pending(self):
+        """Submit jobs that are pending, or that stopped reporting progress."""
+        session = self.session_factory()
+        try:
+            for job_id in session.scalars(
+                select(DefinitionMigrationJob.id)
+                .where(self._claimable())
+                .order_by(DefinitionMigrationJob.created_at)
+            ).all():
+                self.submit(job_id)
+        finally:
+            session.close()
+
+    def _work(self):
+        while True:
+            job_id = self.jobs.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.exception(f"Definition migration job {job_id} failed")
+                self._fail(job_id, str(e))
+            finally:
+                self.jobs.task_done()
+
+    @staticmethod
+    def _claimable():
+        stale = datetime.now() - timedelta(
+            seconds=settings.definition_migration_stale_after
+        )
+        return or_(
+            DefinitionMigrationJob.status == DefinitionMigrationStatus.PENDING,
+            and_(
+                DefinitionMigrationJob.status == DefinitionMigrationStatus.RUNNING,
+                DefinitionMigrationJob.updated_at < stale,
+            ),
+        )
+
+    def _claim(self, session: Session, job_id: uuid.UUID) -> bool:
+        claimed = session.execute(
+            update(DefinitionMigrationJob)
+            .where(DefinitionMigrationJob.id == job_id, self._claimable())
+            .values(status=DefinitionMigrationStatus.RUNNING, updated_at=datetime.now())
+            .returning(DefinitionMigrationJob.id)
+        ).first()
+        session.commit()
+        return claimed is not None
+
+    def _run(self, job_id: uuid.UUID):
+        session = self.session_factory()
+        try:
+            if not self._claim(session, job_id):
+                return
+
+            job = session.get(DefinitionMigrationJob, job_id)
+            logger.info(f"Running {job}")
+            if job.total is None:
+                job.total = session.scalar(
+                    select(func.count())
+                    .select_from(Entity)
+                    .where(Entity.entity_type == job.entity_type)
+                )
+                session.commit()
+
+            batch = self._batch_for(job)
+            while True:
+                done = self._with_retries(session, lambda: batch(session, job))
+                if done:
+                    break
+                time.sleep(settings.definition_migration_batch_delay)
+
+            job.status = DefinitionMigrationStatus.COMPLETED
+            job.finished_at = datetime.now()
+            session.commit()
+            logger.info(f"Finished {job}, affected {job.affected} rows")
+        finally:
+            session.close()
+
+    def _with_retries(self, session: Session, run_batch) -> bool:
+        for attempt in range(settings.definition_migration_max_retries):
+            try:
+                return run_batch()
+            except OperationalError as e:
+                # Lock or statement timeouts, back off and let the hot path win.
+                session.rollback()
+                logger.warning(f"Definition migration batch failed, retrying: {e}")
+                time.sleep(settings.definition_migration_batch_delay * 2**attempt)
+        return run_batch()
+
+    def _batch_for(self, job: DefinitionMigrationJob):
+        if job.kind == DefinitionMigrationKind.BACKFILL:
+            return self._backfill_batch
+        if job.kind == DefinitionMigrationKind.PURGE:
+            return self._purge_batch
+        return self._validate_batch
+
+    def _next_entity_ids(
+        self, session: Session, job: DefinitionMigrationJob
+    ) -> List[uuid.UUID]:
+        session.execute(
+            text(
+                f"SET LOCAL lock_timeout = {int(settings.definition_migration_lock_timeout)}"
+            )
+        )
+        stmt = (
+            select(Entity.id)
+            .where(Entity.entity_type == job.entity_type)
+            .order_by(Entity.id)
+            .limit(settings.definition_migration_batch_size)
+        )
+        if job.cursor:
+            stmt = stmt.where(Entity.id > job.cursor)
+        return session.scalars(stmt).all()
+
+    def _advance(
+        self,
+        session: Session,
+        job: DefinitionMigrationJob,
+        entity_ids: List[uuid.UUID],
+        affected: int,
+    ):
+        job.cursor = entity_ids[-1]
+        job.processed += len(entity_ids)
+        job.affected += affected
+        session.commit()
+
+    @staticmethod
+    def _missing_attribute(job: DefinitionMigrationJob):
+        return ~exists().where(
+            Attribute.entity_id == Entity.id, Attribute.name == job.attribute_name
+        )
+
+    def _backfill_batch(self, session: Session, job: DefinitionMigrationJob) -> bool:
+        entity_ids = self._next_entity_ids(session, job)
+        if not entity_ids:
+            return True
+
+        codec = codec_for_type(job.attribute_type)
+        column = getattr(Attribute, codec.column)
+        value = literal(codec.encode(self._default(job)), type_=column.type)
+        result = session.execute(
+            insert(Attribute).from_select(
+                [
+                    Attribute.id,
+                    Attribute.name,
+                    Attribute.type,
+                    Attribute.entity_id,
+                    column,
+                ],
+                select(
+                    func.gen_random_uuid(),
+                    literal(job.attribute_name),
+                    literal(codec.type, type_=Attribute.type.type),
+                    Entity.id,
+                    value,
+                ).where(Entity.id.in_(entity_ids), self._missing_attribute(job)),
+            )
+        )
+        self._advance(session, job, entity_ids, result.rowcount)
+        return False
+
+    def _purge_batch(self, session: Session, job: DefinitionMigrationJob) -> bool:
+        entity_ids = self._next_entity_ids(session, job)
+        if not entity_ids:
+            return True
+
+        result = session.execute(
+            delete(Attribute).where(
+                Attribute.entity_id.in_(entity_ids),
+                Attribute.name == job.attribute_name,
+            )
+        )
+        self._advance(session, job, entity_ids, result.rowcount)
+        return False
+
+    def _validate_batch(self, session: Session, job: DefinitionMigrationJob) -> bool:
+        entity_ids = self._next_entity_ids(session, job)
+        if not entity_ids:
+            return True
+
+        missing = session.scalar(
+            select(func.count())
+            .select_from(Entity)
+            .where(
+                Entity.id.in_(entity_ids),
+                Entity.is_deleted == False,
+                self._missing_attribute(job),
+            )
+        )
+        self._advance(session, job, entity_ids, missing)
+        return False
+
+    @staticmethod
+    def _default(job: DefinitionMigrationJob):
+        from eav_backend.services.dynamic_model_service import type_mapping
+
+        py_type = type_mapping.get(job.attribute_type, str)
+        return TypeAdapter(py_type).validate_python(job.default_value)
+
+    def _fail(self, job_id: uuid.UUID, error: str):
+        session = self.session_factory()
+        try:
+            session.execute(
+                update(DefinitionMigrationJob)
+                .where(DefinitionMigrationJob.id == job_id)
+                .values(
+                    status=DefinitionMigrationStatus.FAILED,
+                    error=error,
+                    finished_at=datetime.now(),
+                )
+            )
+            session.commit()
+        finally:
+            session.close()
+
+
+definition_migration_runner = DefinitionMigrationRunner()
@@ -2,26 +2,47 @@ import uuid
 from datetime import date
 from typing import Optional, List
 
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Response, APIRouter
 from geojson_pydantic.geometries import Geometry
 from pydantic import create_model
 from pydantic.main import ModelT
 
 from eav_backend.config import settings
-from eav_backend.dependencies import get_asset_service
-from eav_backend.models import EntityDefinition
+from eav_backend.dependencies import (
+    get_asset_service,
+    get_asset_upload_service,
+    get_read_asset_service,
+    get_read_entity_service,
+)
+from eav_backend.models import AttributeType
+from eav_backend.registry import DefinitionRegistry, EntityDefinitionSnapshot
 from eav_backend.routes.v1.asset_routes import get_assets, add_asset
+from eav_backend.routes.v1.asset_upload_routes import (
+    start_upload,
+    get_upload,
+    put_upload_part,
+    complete_upload,
+    abort_upload,
+)
 from eav_backend.routes.v1.entity_routes import (
     get_entity,
     add_entity,
     update_entity,
+    patch_entity,
     delete_entity,
 )
 from eav_backend.schemas.asset import Asset
-from eav_backend.schemas.basemodel import BaseModel
+from eav_backend.schemas.asset_upload import (
+    AssetUpload,
+    AssetUploadPart,
+    AssetUploadRequest,
+)
+from eav_backend.schemas.basemodel import BaseModel, MergePatchModel
 from eav_backend.services.entity_definition_service import (
     EntityDefinitionService,
+    definition_version,
 )
+from eav_backend.util.collection_counts import CountMode
 from eav_backend.util.endpoint_utils import create_endpoint_wrapper
 
 type_mapping = {
@@ -35,11 +56,48 @@ type_mapping = {
     "GEOMETRY": Geometry,
 }
 
+MERGE_PATCH_MEDIA_TYPE = "application/merge-patch+json"
+
+# The number of statements each kind of generated route may execute, checked
+# according to QUERY_BUDGET_MODE. Routes that read entities have a budget that
+# depends on how deeply their definition nests, never on the number of rows.
+QUERY_BUDGETS = {
+    "COUNT": 1,  # the count or estimate of a LIST, when asked for
+    "POST": 2,  # parent check and a single INSERT
+    # entity and its patched attributes, an UPDATE per attribute type, DELETE
+    # and INSERT of attributes and the version bump
+    "PATCH": 5 + len(AttributeType),
+    # entity, parent and relation lookups, entity and relation UPDATE, and the
+    # assets; the chunks of a cascade are not counted
+    "DELETE": 6,
+    "LIST_ASSETS": 1,
+    "POST_ASSET": 2,  # blob upsert and asset INSERT
+    "START_UPLOAD": 1,
+    "GET_UPLOAD": 2,  # upload and its parts
+    "PUT_UPLOAD_PART": 4,  # upload, lock, replaced part and part upsert
+    "COMPLETE_UPLOAD": 6,  # upload, parts, locked parts, blob upsert, asset, delete
+    "ABORT_UPLOAD": 4,
+}
+
+
+def read_budget(ed: EntityDefinitionSnapshot) -> int:
+    """One SELECT for the entities and one for their attributes, per level."""
+    return 2 * (1 + ed.relation_depth())
+
+
+def update_budget(ed: EntityDefinitionSnapshot) -> int:
+    """
+    Reading the entity, then an UPDATE per attribute type, a DELETE and an
+    INSERT of attributes, an INSERT of new nested entities and the version bump.
+    """
+    return read_budget(ed) + len(AttributeType) + 4
+
 
 class BuiltModel:
     request_model: type[ModelT]
     response_model: type[ModelT]
     summary_model: type[ModelT] | None
+    patch_model: type[ModelT]
     return_summary_on_collection: bool = False
 
     def __init__(
@@ -48,11 +106,13 @@ class BuiltModel:
         response_model: type[ModelT],
         summary_model: type[ModelT] | None,
         return_summary_on_collection: bool,
+        patch_model: type[ModelT],
     ):
         self.request_model = request_model
         self.response_model = response_model
         self.summary_model = summary_model
         self.return_summary_on_collection = return_summary_on_collection
+        self.patch_model = patch_model
 
     @property
     def collection_model(self) -> type[ModelT]:
@@ -67,11 +127,17 @@ class DynamicModelService:
         self, entity_definition_service: EntityDefinitionService, app: FastAPI
     ):
         self.app = app
+        self.router = APIRouter()
         self.entity_definition_service = entity_definition_service
         self.built_models: dict[str, BuiltModel] = {}
 
     def build_models_from_entity_definitions(self):
-        for ed in self.entity_definition_service.get_entity_definitions():
+        registry = DefinitionRegistry.from_entity_definitions(
+            self.entity_definition_service.get_entity_definitions()
+        )
+        fragments = {}
+        for ed in registry:
+            first_route = len(self.router.routes)
             self.build_model(ed)
             self.build_api_endpoints(
                 ed,
@@ -80,8 +146,41 @@ class DynamicModelService:
                 api_endpoints=ed.api_endpoints,
                 parent_api_endpoints=["LIST"],
             )
-
-    def build_model(self, entity_definition: EntityDefinition) -> BuiltModel:
+            fragments[ed.name] = (
+                definition_version(ed.reachable_hashes()),
+                self.router.routes[first_route:],
+            )
+        self.install_routes(registry, fragments)
+
+    def refresh_if_changed(self) -> bool:
+        """Rebuilds the generated routes if the stored entity definitions changed."""
+        version = self.entity_definition_service.get_definition_version()
+        if version == getattr(self.app.state, "definition_version", None):
+            return False
+        self.build_models_from_entity_definitions()
+        return True
+
+    def install_routes(
+        self, registry: DefinitionRegistry, fragments: dict[str, tuple[str, list]]
+    ):
+        """
+        Swaps the previously generated routes for the ones built by this service.
+        The routes are also recorded per root entity definition, so the OpenAPI
+        document only has to be regenerated for the definitions that changed.
+        """
+        previous = {
+            id(route) for route in getattr(self.app.state, "dynamic_routes", [])
+        }
+        self.app.router.routes[:] = [
+            route for route in self.app.router.routes if id(route) not in previous
+        ] + self.router.routes
+        self.app.state.dynamic_routes = self.router.routes
+        self.app.state.route_fragments = fragments
+        self.app.state.definition_registry = registry
+        self.app.state.definition_version = registry.version
+        self.app.openapi_schema = None
+
+    def build_model(self, entity_definition: EntityDefinitionSnapshot) -> BuiltModel:
         if entity_definition.name in self.built_models:
             return self.built_models[entity_definition.name]
         else:
@@ -90,20 +189,19 @@ class DynamicModelService:
             response_fields = {}
             summary_fields = {}
             fields = {}
-            for attribute in entity_definition.required_attributes:
+            for attribute in entity_definition.attributes:
                 py_type = type_mapping.get(attribute.type, str)
-                fields[attribute.name] = (py_type, None)
-                if attribute.include_in_summary:
+                if attribute.required:
+                    fields[attribute.name] = (py_type, None)
+                else:
+                    fields[attribute.name] = (Optional[py_type], None)
+                if attribute.name in entity_definition.summary_fields:
                     summary_fields[attribute.name] = (py_type, None)
 
-            for attribute in entity_definition.optional_attributes:
-                py_type = type_mapping.get(attribute.type, str)
-                fields[attribute.name] = (Optional[py_type], None)
-
             related_models: list[BuiltModel] = []
-            for relation in entity_definition.entity_relations:
-                related_built_model = self.build_model(relation.target_entity)
-                self.built_models[relation.target_entity.name] = related_built_model
+            for relation in entity_definition.relations:
+                related_built_model = self.build_model(relation.target)
+                self.built_models[relation.target.name] = related_built_model
                 related_models.append(related_built_model)
                 request_fields[relation.collection_name] = (
                     List[related_built_model.request_model],
@@ -128,6 +226,15 @@ class DynamicModelService:
                 **fields | response_fields,
             )
 
+            # Only the attributes of the entity itself, nested entities are
+            # patched through their own routes. Required attributes may be left
+            # out of a patch, but not removed with null.
+            patch_model = create_model(
+                f"{entity_definition.name}Patch",
+                __base__=MergePatchModel,
+                **fields,
+            )
+
             if entity_definition.return_summary_on_collection:
                 summary_model = create_model(
                     f"{entity_definition.name}Summary",
@@ -140,13 +247,14 @@ class DynamicModelService:
                 response_model,
                 summary_model,
                 entity_definition.return_summary_on_collection,
+                patch_model,
             )
             self.built_models[entity_definition.name] = built_model
             return built_model
 
     def build_api_endpoints(
         self,
-        ed: EntityDefinition,
+        ed: EntityDefinitionSnapshot,
         tag: str,
         root_path: str = "/v1",
         api_endpoints: list = [],
@@ -184,6 +292,14 @@ class DynamicModelService:
                     path_params + [ed.identifier],
                     relation_collection,
                 )
+                self.add_patch_entity_endpoint(
+                    ed,
+                    model,
+                    f"{root_path}/{{{ed.identifier}}}",
+                    tag,
+                    path_params + [ed.identifier],
+                    relation_collection,
+                )
 
             if "DELETE" in api_endpoints:
                 self.add_delete_entity_endpoint(
@@ -205,9 +321,9 @@ class DynamicModelService:
                     relation_collection,
                 )
 
-        for relation in ed.entity_relations:
+        for relation in ed.relations:
             self.build_api_endpoints(
-                relation.target_entity,
+                relation.target,
                 tag=tag,
                 root_path=f"{root_path}/{{{ed.identifier}}}/{relation.collection_name}",
                 path_params=path_params + [ed.identifier],
@@ -221,7 +337,7 @@ class DynamicModelService:
     ):
         from eav_backend.routes.v1.entity_routes import get_entities
 
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=root_path,
             response_model=List[model.collection_model],
             methods=["GET"],
@@ -234,6 +350,10 @@ class DynamicModelService:
                 path_params=path_params,
                 response_model=model.collection_model,
                 entity_definition=entity_definition,
+                service=get_read_entity_service,
+                query_params={"count": (CountMode, CountMode.NONE)},
+                include_response=True,
+                query_budget=read_budget(entity_definition) + QUERY_BUDGETS["COUNT"],
             ),
         )
 
@@ -247,7 +367,7 @@ class DynamicModelService:
         relation_collection: str = None,
     ):
 
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=root_path,
             response_model=model.response_model,
             methods=["POST"],
@@ -263,6 +383,7 @@ class DynamicModelService:
                 response_model=model.response_model,
                 entity_definition=entity_definition,
                 relation_collection=relation_collection,
+                query_budget=QUERY_BUDGETS["POST"],
             ),
         )
 
@@ -274,7 +395,7 @@ class DynamicModelService:
         tag,
         path_params,
     ):
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=root_path,
             response_model=model.response_model,
             methods=["GET"],
@@ -287,6 +408,8 @@ class DynamicModelService:
                 path_params=path_params,
                 response_model=model.response_model,
                 entity_definition=entity_definition,
+                service=get_read_entity_service,
+                query_budget=read_budget(entity_definition),
             ),
         )
 
@@ -299,7 +422,7 @@ class DynamicModelService:
         path_params,
         relation_collection: str = None,
     ):
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=root_path,
             response_model=model.response_model,
             methods=["PUT"],
@@ -315,6 +438,40 @@ class DynamicModelService:
                 response_model=model.response_model,
                 entity_definition=entity_definition,
                 relation_collection=relation_collection,
+                query_budget=update_budget(entity_definition),
+            ),
+        )
+
+    def add_patch_entity_endpoint(
+        self,
+        entity_definition,
+        model,
+        root_path,
+        tag,
+        path_params,
+        relation_collection: str = None,
+    ):
+        self.router.add_api_route(
+            path=root_path,
+            response_class=Response,
+            status_code=204,
+            responses={204: {}, 404: {}},
+            methods=["PATCH"],
+            tags=[tag],
+            name=f"patch_{entity_definition.name}",
+            description=f"Update attributes of a(n) {entity_definition.name} with a JSON"
+            " merge patch: attributes that are left out are kept, and optional"
+            " attributes that are null are removed.",
+            endpoint=create_endpoint_wrapper(
+                handler=patch_entity,
+                http_method="PATCH",
+                path_params=path_params,
+                include_body=True,
+                body_type=model.patch_model,
+                body_media_type=MERGE_PATCH_MEDIA_TYPE,
+                entity_definition=entity_definition,
+                relation_collection=relation_collection,
+                query_budget=QUERY_BUDGETS["PATCH"],
             ),
         )
 
@@ -327,7 +484,7 @@ class DynamicModelService:
         path_params,
         relation_collection: str = None,
     ):
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=root_path,
             response_class=Response,
             status_code=204,
@@ -335,13 +492,20 @@ class DynamicModelService:
             methods=["DELETE"],
             tags=[tag],
             name=f"delete_{entity_definition.name}",
-            description=f"Delete a(n) {entity_definition.name}",
+            description=f"Delete a(n) {entity_definition.name}. With cascade=true the"
+            " entities nested under it are deleted too, and with include_assets=true"
+            " the assets of the deleted entities.",
             endpoint=create_endpoint_wrapper(
                 handler=delete_entity,
                 http_method="DELETE",
                 path_params=path_params,
                 entity_definition=entity_definition,
                 relation_collection=relation_collection,
+                query_params={
+                    "cascade": (bool, False),
+                    "include_assets": (bool, False),
+                },
+                query_budget=QUERY_BUDGETS["DELETE"],
             ),
         )
 
@@ -354,7 +518,7 @@ class DynamicModelService:
         path_params,
         relation_collection=None,
     ):
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=f"{root_path}/assets",
             response_model=List[Asset],
             methods=["GET"],
@@ -368,10 +532,11 @@ class DynamicModelService:
                 response_model=List[Asset],
                 entity_definition=entity_definition,
                 relation_collection=relation_collection,
-                service=get_asset_service,
+                service=get_read_asset_service,
+                query_budget=QUERY_BUDGETS["LIST_ASSETS"],
             ),
         )
-        self.app.add_api_route(
+        self.router.add_api_route(
             path=f"{root_path}/assets",
             response_model=Asset,
             methods=["POST"],
@@ -388,5 +553,134 @@ class DynamicModelService:
                 entity_definition=entity_definition,
                 relation_collection=relation_collection,
                 service=get_asset_service,
+                query_budget=QUERY_BUDGETS["POST_ASSET"],
+            ),
+        )
+        self.add_asset_upload_endpoints(
+            entity_definition, root_path, tag, path_params, relation_collection
+        )
+
+    def add_asset_upload_endpoints(
+        self,
+        entity_definition,
+        root_path,
+        tag,
+        path_params,
+        relation_collection=None,
+    ):
+        """Endpoints of resumable uploads, for assets too large for a single request."""
+        uploads_path = f"{root_path}/assets/uploads"
+        upload_params = {"upload_id": uuid.UUID}
+        self.router.add_api_route(
+            path=uploads_path,
+            response_model=AssetUpload,
+            status_code=201,
+            methods=["POST"],
+            tags=[tag],
+            name=f"start_{entity_definition.name}_asset_upload",
+            description=f"Start a resumable upload of an asset of {entity_definition.name}",
+            endpoint=create_endpoint_wrapper(
+                handler=start_upload,
+                http_method="POST",
+                path_params=path_params,
+                include_body=True,
+                body_type=AssetUploadRequest,
+                response_model=AssetUpload,
+                entity_definition=entity_definition,
+                relation_collection=relation_collection,
+                service=get_asset_upload_service,
+                query_budget=QUERY_BUDGETS["START_UPLOAD"],
+            ),
+        )
+        self.router.add_api_route(
+            path=f"{uploads_path}/{{upload_id}}",
+            response_model=AssetUpload,
+            methods=["GET"],
+            tags=[tag],
+            name=f"get_{entity_definition.name}_asset_upload",
+            description="Get the parts received by an upload",
+            endpoint=create_endpoint_wrapper(
+                handler=get_upload,
+                http_method="GET",
+                path_params=path_params,
+                response_model=AssetUpload,
+                entity_definition=entity_definition,
+                relation_collection=relation_collection,
+                service=get_asset_upload_service,
+                extra_params=upload_params,
+                query_budget=QUERY_BUDGETS["GET_UPLOAD"],
+            ),
+        )
+        self.router.add_api_route(
+            path=f"{uploads_path}/{{upload_id}}/parts/{{part_number}}",
+            response_model=AssetUploadPart,
+            methods=["PUT"],
+            tags=[tag],
+            name=f"put_{entity_definition.name}_asset_upload_part",
+            description=(
+                "Store a part of an upload, replacing a part with the same number. "
+                "The request body is the content of the part; an X-Checksum-SHA256 "
+                "header is verified against it."
+            ),
+            openapi_extra={
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/octet-stream": {
+                            "schema": {"type": "string", "format": "binary"}
+                        }
+                    },
+                }
+            },
+            endpoint=create_endpoint_wrapper(
+                handler=put_upload_part,
+                http_method="PUT",
+                path_params=path_params,
+                response_model=AssetUploadPart,
+                entity_definition=entity_definition,
+                relation_collection=relation_collection,
+                service=get_asset_upload_service,
+                extra_params=upload_params | {"part_number": int},
+                include_request=True,
+                query_budget=QUERY_BUDGETS["PUT_UPLOAD_PART"],
+            ),
+        )
+        self.router.add_api_route(
+            path=f"{uploads_path}/{{upload_id}}/complete",
+            response_model=Asset,
+            methods=["POST"],
+            tags=[tag],
+            name=f"complete_{entity_definition.name}_asset_upload",
+            description="Combine the parts of an upload into a new asset",
+            endpoint=create_endpoint_wrapper(
+                handler=complete_upload,
+                http_method="POST",
+                path_params=path_params,
+                response_model=Asset,
+                entity_definition=entity_definition,
+                relation_collection=relation_collection,
+                service=get_asset_upload_service,
+                extra_params=upload_params,
+                query_budget=QUERY_BUDGETS["COMPLETE_UPLOAD"],
+            ),
+        )
+        self.router.add_api_route(
+            path=f"{uploads_path}/{{upload_id}}",
+            response_class=Response,
+            status_code=204,
+            responses={204: {}, 404: {}},
+            methods=["DELETE"],
+            tags=[tag],
+            name=f"abort_{entity_definition.name}_asset_upload",
+            description="Abort an upload and remove its parts",
+            endpoint=create_endpoint_wrapper(
+                handler=abort_upload,
+                http_method="DELETE",
+                path_params=path_params,
+                entity_definition=entity_definition,
+                relation_collection=relation_collection,
+                service=get_asset_upload_service,
+                extra_params=upload_params,
+                query_budget=QUERY_BUDGETS["ABORT_UPLOAD"],
             ),
         )
@@ -1,14 +1,26 @@
+import hashlib
 import logging
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
-from eav_backend.models import EntityDefinition, AttributeDefinition
+from eav_backend.models import (
+    EntityDefinition,
+    AttributeDefinition,
+    DefinitionMigrationJob,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def definition_version(hashes: Iterable[tuple[str, str]]) -> str:
+    """A version for a set of entity definitions, derived from their hashes."""
+    return hashlib.md5(
+        ";".join(f"{name}:{hash}" for name, hash in sorted(hashes)).encode("UTF-8")
+    ).hexdigest()
+
+
 class EntityDefinitionService:
 
     def __init__(self, session):
@@ -33,6 +45,13 @@ class EntityDefinitionService:
 
         return self.session.scalars(stmt).unique().one_or_none()
 
+    def get_definition_version(self) -> str:
+        return definition_version(
+            self.session.execute(
+                select(EntityDefinition.name, EntityDefinition.hash)
+            ).all()
+        )
+
     def find_entity_definition_with_name(self, name) -> Optional[EntityDefinition]:
         stmt = select(EntityDefinition).where(EntityDefinition.name == name)
         return self.session.scalars(stmt).unique().one_or_none()
@@ -73,3 +92,24 @@ class EntityDefinitionService:
             self.session.rollback()
             raise e
         return entity_definition
+
+    def update_entity_definition(
+        self,
+        entity_definition: EntityDefinition,
+        migrations: List[DefinitionMigrationJob],
+    ) -> EntityDefinition:
+        """Stores a changed entity definition together with the jobs migrating its entities."""
+        entity_definition.required_attributes = self._replace_attributes(
+            entity_definition.required_attributes
+        )
+        entity_definition.optional_attributes = self._replace_attributes(
+            entity_definition.optional_attributes
+        )
+
+        self.session.add_all(migrations)
+        try:
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            raise e
+        return entity_definition
@@ -1,5 +1,6 @@
 import hashlib
 import logging
+import uuid
 
 from fastapi import HTTPException
 from pathlib import Path
@@ -9,19 +10,34 @@ from eav_backend.models import (
     EntityDefinition,
     AttributeDefinition,
     EntityRelationDefinition,
+    DefinitionMigrationJob,
+    DefinitionMigrationKind,
 )
-from eav_backend.models.exceptions import ExistsException
+from eav_backend.models.exceptions import ExistsException, UnsupportedChangeException
+from eav_backend.schemas.attribute_definition import AttributeDefinitionRequest
 from eav_backend.schemas.entity_definition import (
     EntityDefinitionRequest,
     EntityDefinitionResponse,
 )
 from eav_backend.schemas.entity_relation import EntityRelationRequest
+from eav_backend.services.definition_migration_service import (
+    definition_migration_runner,
+)
 from eav_backend.services.entity_definition_service import EntityDefinitionService
 
 
 def md5(entity_definition_req: EntityDefinitionRequest) -> str:
+    # Defaults are only used when migrating existing entities, so they must not
+    # change the hash of an otherwise unchanged definition. Neither must the
+    # retention of definitions that don't set one.
+    exclude = {
+        "required_attributes": {"__all__": {"default"}},
+        "optional_attributes": {"__all__": {"default"}},
+    }
+    if entity_definition_req.retention_days is None:
+        exclude["retention_days"] = True
     return hashlib.md5(
-        entity_definition_req.model_dump_json().encode("UTF-8")
+        entity_definition_req.model_dump_json(exclude=exclude).encode("UTF-8")
     ).hexdigest()
 
 
@@ -57,7 +73,9 @@ class EntityImportService:
 
         if existing:
             return (
-                self.update_entity(entity_definition_req) if needs_update else existing
+                self.update_entity(entity_definition_req, existing, req_hash)
+                if needs_update
+                else existing
             )
         else:
             ed = EntityDefinition(
@@ -70,11 +88,11 @@ class EntityImportService:
                 ),
                 hash=req_hash,
                 required_attributes=[
-                    AttributeDefinition(**attr.model_dump())
+                    AttributeDefinition(**attr.model_dump(exclude={"default"}))
                     for attr in entity_definition_req.required_attributes
                 ],
                 optional_attributes=[
-                    AttributeDefinition(**attr.model_dump())
+                    AttributeDefinition(**attr.model_dump(exclude={"default"}))
                     for attr in entity_definition_req.optional_attributes
                 ],
                 entity_relations=[
@@ -87,13 +105,162 @@ class EntityImportService:
                 self.entity_definition_service.create_entity_definition(ed)
             )
 
-    def update_entity(self, entity_definition_req):
+    def update_entity(
+        self,
+        entity_definition_req: EntityDefinitionRequest,
+        existing: EntityDefinition,
+        req_hash: str,
+    ):
         if not settings.update_entities:
             raise ExistsException(
                 f"Entity definition with name {entity_definition_req.name} was changed, but update_entities is False"
             )
-        else:
-            raise NotImplementedError("No support for updating entities yet")
+
+        self.logger.info(f"Updating entity definition {existing.name}")
+        required = self._updated_attributes(
+            existing, entity_definition_req.required_attributes
+        )
+        optional = self._updated_attributes(
+            existing, entity_definition_req.optional_attributes
+        )
+        migrations = self._attribute_migrations(existing, entity_definition_req)
+
+        existing.entity_relations = self._updated_relations(
+            existing, entity_definition_req
+        )
+        existing.required_attributes = required
+        existing.optional_attributes = optional
+        existing.collection_name = entity_definition_req.collection_name
+        existing.api_endpoints = entity_definition_req.api_endpoints
+        existing.return_summary_on_collection = (
+            entity_definition_req.return_summary_on_collection
+        )
+        existing.supports_assets = entity_definition_req.supports_assets
+        existing.retention_days = entity_definition_req.retention_days
+        existing.hash = req_hash
+
+        ed = self.entity_definition_service.update_entity_definition(
+            existing, migrations
+        )
+        for migration in migrations:
+            definition_migration_runner.submit(migration.id)
+
+        return EntityDefinitionResponse.model_validate(ed)
+
+    def _updated_attributes(
+        self,
+        existing: EntityDefinition,
+        attribute_reqs: list[AttributeDefinitionRequest],
+    ) -> list[AttributeDefinition]:
+        current = {
+            attr.name: attr
+            for attr in existing.required_attributes + existing.optional_attributes
+        }
+        attributes = []
+        for attr_req in attribute_reqs:
+            attr = current.get(attr_req.name)
+            if not attr:
+                attributes.append(
+                    AttributeDefinition(**attr_req.model_dump(exclude={"default"}))
+                )
+            elif (
+                attr.type != attr_req.type
+                or attr.include_in_summary != attr_req.include_in_summary
+                or (attr.allowed_values or None) != (attr_req.allowed_values or None)
+            ):
+                raise UnsupportedChangeException(
+                    f"Attribute {attr_req.name} of {existing.name} can only be added, removed or made required"
+                )
+            else:
+                attributes.append(attr)
+        return attributes
+
+    def _attribute_migrations(
+        self,
+        existing: EntityDefinition,
+        entity_definition_req: EntityDefinitionRequest,
+    ) -> list[DefinitionMigrationJob]:
+        current_required = {attr.name for attr in existing.required_attributes}
+        current_optional = {attr.name for attr in existing.optional_attributes}
+        requested = {
+            attr.name
+            for attr in entity_definition_req.required_attributes
+            + entity_definition_req.optional_attributes
+        }
+
+        removed_required = current_required - requested
+        if removed_required:
+            raise UnsupportedChangeException(
+                f"Required attributes {sorted(removed_required)} of {existing.name} can not be removed"
+            )
+
+        migrations = []
+        for attr_req in entity_definition_req.required_attributes:
+            if attr_req.name in current_required:
+                continue
+            migrations.append(
+                DefinitionMigrationJob(
+                    id=uuid.uuid4(),
+                    entity_definition_id=existing.id,
+                    entity_type=existing.name,
+                    kind=(
+                        DefinitionMigrationKind.VALIDATE
+                        if attr_req.default is None
+                        else DefinitionMigrationKind.BACKFILL
+                    ),
+                    attribute_name=attr_req.name,
+                    attribute_type=attr_req.type,
+                    default_value=attr_req.default,
+                )
+            )
+
+        for name in sorted(current_optional - requested):
+            attr = next(a for a in existing.optional_attributes if a.name == name)
+            migrations.append(
+                DefinitionMigrationJob(
+                    id=uuid.uuid4(),
+                    entity_definition_id=existing.id,
+                    entity_type=existing.name,
+                    kind=DefinitionMigrationKind.PURGE,
+                    attribute_name=attr.name,
+                    attribute_type=attr.type,
+                )
+            )
+
+        return migrations
+
+    def _updated_relations(
+        self,
+        existing: EntityDefinition,
+        entity_definition_req: EntityDefinitionRequest,
+    ) -> list[EntityRelationDefinition]:
+        current = {
+            relation.collection_name: relation for relation in existing.entity_relations
+        }
+        requested = {
+            relation_req.collection_name: relation_req
+            for relation_req in entity_definition_req.related_entities
+        }
+
+        removed = current.keys() - requested.keys()
+        if removed:
+            raise UnsupportedChangeException(
+                f"Relations {sorted(removed)} of {existing.name} can not be removed"
+            )
+
+        relations = []
+        for collection_name, relation_req in requested.items():
+            relation = current.get(collection_name)
+            if not relation:
+                relations.append(self.get_related_entity(relation_req))
+            elif relation.target_entity.name != relation_req.entity:
+                raise UnsupportedChangeException(
+                    f"Relation {collection_name} of {existing.name} can not change its entity"
+                )
+            else:
+                relation.api_endpoints = relation_req.api_endpoints or []
+                relations.append(relation)
+        return relations
 
     def get_related_entity(
         self, entity_relation_req: EntityRelationRequest
@@ -1,11 +1,45 @@
 import logging
 import uuid
-from typing import Optional
+from collections import deque, defaultdict
+from functools import cache
+from typing import Collection, Optional
 
-from sqlalchemy.dialects import postgresql
-from sqlalchemy.orm import aliased
+from sqlalchemy import select, insert, update, delete, exists, func, case, bindparam
+from sqlalchemy.orm import aliased, selectinload, joinedload, lazyload, noload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from eav_backend.models import Entity, EntityRelation, EntityDefinition
+from eav_backend.builders.EntityBuilder import EntityDiff
+from eav_backend.config import settings
+from eav_backend.models import Entity, EntityRelation, Attribute, Asset, AssetBlob
+from eav_backend.models.attribute_codec import CODECS
+from eav_backend.models.exceptions import NotFoundException
+from eav_backend.registry import EntityDefinitionSnapshot
+from eav_backend.util.slow_queries import describe_queries
+
+
+@cache
+def attribute_columns() -> dict[str, str]:
+    """Maps the attributes of Attribute to the keys of their table columns."""
+    return {prop.key: prop.columns[0].key for prop in Attribute.__mapper__.column_attrs}
+
+
+def eager_loads(depth: int) -> list:
+    """
+    Loads the attributes and the related entities `depth` levels down with one
+    query per level each, instead of one per entity when they are serialised.
+    """
+    options = [selectinload(Entity.attributes)]
+    if depth > 0:
+        options.append(
+            selectinload(Entity.relations)
+            .joinedload(EntityRelation.target_entity)
+            .options(*eager_loads(depth - 1))
+        )
+    else:
+        # The deepest level has no relations in its definition, so they are
+        # not loaded lazily for each of its entities either.
+        options.append(noload(Entity.relations))
+    return options
 
 
 class EntityService:
@@ -20,38 +54,153 @@ class EntityService:
         relations: dict[str, str],
         relation_collection: str = None,
     ) -> Entity:
-        self.session.add(entity)
-        self.session.flush()
+        """
+        Creates an entity with its attributes and nested entities.
+
+        The parent is checked with a single primary key lookup, and all rows are
+        written by one INSERT statement with the entity, attribute and relation
+        inserts as CTEs. The transient entity that was passed in is returned with
+        its ids assigned, so the response can be built without another query.
+        """
+        entity_rows, attribute_rows, relation_rows = [], [], []
+        self._collect_rows(entity, entity_rows, attribute_rows, relation_rows)
 
         if relations:
             immediate_parent_type = list(relations.keys())[-1]
             immediate_parent_id = list(relations.values())[-1]
-            parent_entity: Entity = (
-                self.session.query(Entity)
-                .filter(Entity.id == immediate_parent_id)
-                .first()
-            )
 
-            if not parent_entity or not parent_entity.is_of_type(immediate_parent_type):
-                raise Exception(
+            if not self.entity_exists(immediate_parent_id, immediate_parent_type):
+                raise NotFoundException(
                     f"Parent entity with id {immediate_parent_id} of type {immediate_parent_type} not found."
                 )
-            else:
-                parent_entity.relations.append(
-                    EntityRelation(
-                        target_entity=entity,
-                        collection_name=relation_collection,
-                    )
-                )
+            relation_rows.append(
+                {
+                    "source_entity_id": uuid.UUID(immediate_parent_id),
+                    "target_entity_id": entity.id,
+                    "collection_name": relation_collection,
+                    "is_deleted": False,
+                }
+            )
 
+        with describe_queries(entity.entity_type, relations):
+            self.session.execute(
+                self._insert_statement(entity_rows, attribute_rows, relation_rows)
+            )
         self.session.commit()
 
         return entity
 
-    def get_entities_by_type(self, entity_type: str, **filters) -> list[Entity]:
+    def entity_exists(self, entity_id: str, entity_type: str) -> bool:
+        return self.session.scalar(
+            select(
+                exists().where(
+                    Entity.id == uuid.UUID(entity_id),
+                    func.lower(Entity.entity_type) == entity_type.lower(),
+                    Entity.is_deleted == False,
+                )
+            )
+        )
+
+    @classmethod
+    def _collect_rows(
+        cls,
+        entity: Entity,
+        entity_rows: list[dict],
+        attribute_rows: list[dict],
+        relation_rows: list[dict],
+    ):
+        entity.id = entity.id or uuid.uuid4()
+        entity.is_deleted = False
+        entity.version = 1
+        entity_rows.append(
+            {
+                "id": entity.id,
+                "entity_type": entity.entity_type,
+                "is_deleted": False,
+                "version": 1,
+            }
+        )
+
+        for attribute in entity.attributes:
+            attribute.id = attribute.id or uuid.uuid4()
+            attribute.entity_id = entity.id
+            attribute_rows.append(
+                {
+                    column: getattr(attribute, key)
+                    for key, column in attribute_columns().items()
+                }
+            )
+
+        for relation in entity.relations:
+            cls._collect_rows(
+                relation.target_entity, entity_rows, attribute_rows, relation_rows
+            )
+            relation.source_entity_id = entity.id
+            relation.target_entity_id = relation.target_entity.id
+            relation.is_deleted = False
+            relation_rows.append(
+                {
+                    "source_entity_id": entity.id,
+                    "target_entity_id": relation.target_entity.id,
+                    "collection_name": relation.collection_name,
+                    "is_deleted": False,
+                }
+            )
+
+    @staticmethod
+    def _insert_statement(
+        entity_rows: list[dict], attribute_rows: list[dict], relation_rows: list[dict]
+    ):
+        inserts = [insert(Entity.__table__).values(entity_rows)]
+        if attribute_rows:
+            inserts.append(insert(Attribute.__table__).values(attribute_rows))
+        if relation_rows:
+            inserts.append(insert(EntityRelation.__table__).values(relation_rows))
+
+        # Foreign keys are checked at the end of the statement, so the rows
+        # can reference each other regardless of the order of the CTEs.
+        *ctes, statement = inserts
+        for i, cte in enumerate(ctes):
+            statement = statement.add_cte(cte.cte(f"insert_{i}"))
+        return statement
+
+    def get_entities_by_type(
+        self, ed: EntityDefinitionSnapshot, **filters
+    ) -> list[Entity]:
+        query = self._collection_query(ed, **filters).options(
+            *eager_loads(ed.relation_depth())
+        )
+        with describe_queries(ed.name, filters):
+            return query.all()
+
+    def count_entities(self, ed: EntityDefinitionSnapshot, **filters) -> int:
+        """The exact number of entities of a collection, with COUNT(*)."""
+        query = self._collection_query(ed, **filters)
+        with describe_queries(ed.name, filters):
+            return query.with_entities(func.count()).scalar()
+
+    def estimate_entities(self, ed: EntityDefinitionSnapshot, **filters) -> int:
+        """
+        The number of entities of a collection as estimated by the planner,
+        from the statistics of the entity types and relations, without
+        reading the rows.
+        """
+        query = self._collection_query(ed, **filters)
+        # Only the ids, so the eager joins of the entities don't skew the estimate.
+        statement = query.with_entities(Entity.id).statement
+        compiled = statement.compile(dialect=self.session.get_bind().dialect)
+        with describe_queries(ed.name, filters):
+            plan = (
+                self.session.connection()
+                .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+                .scalar()
+            )
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _collection_query(self, ed: EntityDefinitionSnapshot, **filters):
         # Start by querying for the final entity type (e.g. "incident").
         query = self.session.query(Entity).filter(
-            Entity.entity_type == entity_type, Entity.is_deleted == False
+            Entity.entity_type == ed.name, Entity.is_deleted == False
         )
         # We'll use this alias to represent the "child" in the join.
         current_alias = Entity
@@ -82,20 +231,21 @@ class EntityService:
             # Set current_alias to this parent so that the next iteration will join upward.
             current_alias = parent_alias
 
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(
-                query.statement.compile(
-                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
-                )
-            )
-
-        return query.all()
+        return query
 
     def get_entity_by_type_and_path(
         self,
-        ed: EntityDefinition,
+        ed: EntityDefinitionSnapshot,
+        *,
+        with_related: bool = True,
+        attributes: Optional[Collection[str]] = None,
         **filters,
     ) -> Optional[Entity]:
+        """
+        The entity at a path. Without `with_related` the entities nested under
+        it are not loaded, and with `attributes` only the attributes with those
+        names are.
+        """
         identifier = filters.pop(ed.identifier)
 
         query = self.session.query(Entity).filter(
@@ -103,6 +253,14 @@ class EntityService:
             Entity.id == uuid.UUID(identifier),
             Entity.is_deleted == False,
         )
+        if with_related:
+            query = query.options(*eager_loads(ed.relation_depth()))
+        else:
+            query = query.options(lazyload(Entity.relations))
+            if attributes is not None:
+                query = query.options(
+                    selectinload(Entity.attributes.and_(Attribute.name.in_(attributes)))
+                )
 
         current_alias = Entity
 
@@ -125,14 +283,208 @@ class EntityService:
 
             current_alias = parent_alias
 
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(
-                query.statement.compile(
-                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        with describe_queries(ed.name, filters | {ed.identifier: identifier}):
+            return query.first()
+
+    def delete_subtree(self, entity: Entity, include_assets: bool = False) -> int:
+        """
+        Marks the entities nested under a deleted entity, and the relations to
+        them, as deleted, and deletes their assets if `include_assets`. The
+        subtree is walked level by level, and each chunk of at most
+        CASCADE_DELETE_CHUNK_SIZE children is marked by one statement in its
+        own transaction, so no row stays locked for long however large the
+        subtree is. Returns the number of entities marked.
+        """
+        chunk_size = settings.cascade_delete_chunk_size
+        deleted = 0
+        frontier = deque([entity.id])
+        with describe_queries(entity.entity_type, {"cascade": str(entity.id)}):
+            while frontier:
+                parents = [
+                    frontier.popleft() for _ in range(min(chunk_size, len(frontier)))
+                ]
+                statement = self._delete_children_statement(parents, include_assets)
+                # One statement per chunk, which the budget of the route can't
+                # account for, so they are not counted against it.
+                while children := self.session.scalars(
+                    statement, execution_options={"count_statement": False}
+                ).all():
+                    self.session.commit()
+                    deleted += len(children)
+                    frontier.extend(children)
+        self.session.commit()
+        return deleted
+
+    @staticmethod
+    def _delete_children_statement(parents: list[uuid.UUID], include_assets: bool):
+        chunk = (
+            select(Entity.id)
+            .join(EntityRelation, EntityRelation.target_entity_id == Entity.id)
+            .where(
+                EntityRelation.source_entity_id.in_(parents),
+                Entity.is_deleted == False,
+            )
+            .limit(settings.cascade_delete_chunk_size)
+            .with_for_update(of=Entity)
+            .cte("chunk")
+        )
+        entities = (
+            update(Entity)
+            .where(Entity.id.in_(select(chunk.c.id)))
+            .values(is_deleted=True, deleted_at=func.now())
+            .returning(Entity.id)
+            .cte("deleted_entities")
+        )
+        relations = (
+            update(EntityRelation)
+            .where(EntityRelation.target_entity_id.in_(select(chunk.c.id)))
+            .values(is_deleted=True)
+            .returning(EntityRelation.target_entity_id)
+            .cte("deleted_relations")
+        )
+        statement = select(entities.c.id).add_cte(relations, nest_here=True)
+        if include_assets:
+            statement = EntityService._delete_assets_statement(
+                select(chunk.c.id), statement
+            )
+        return statement
+
+    def delete_assets(self, entity_ids: list[uuid.UUID]) -> int:
+        """Deletes the assets of entities, returns how many were deleted."""
+        deleted = self.session.execute(self._delete_assets_statement(entity_ids))
+        self.session.commit()
+        return deleted.scalar()
+
+    @staticmethod
+    def _delete_assets_statement(entity_ids, statement=None):
+        """
+        Deletes the assets of entities and releases their blobs, like
+        AssetService.remove_asset, as CTEs of `statement`.
+        """
+        assets = (
+            delete(Asset)
+            .where(Asset.entity_id.in_(entity_ids))
+            .returning(Asset.checksum)
+            .cte("deleted_assets")
+        )
+        references = (
+            select(assets.c.checksum, func.count().label("count"))
+            .group_by(assets.c.checksum)
+            .subquery()
+        )
+        blobs = (
+            update(AssetBlob)
+            .where(AssetBlob.checksum == references.c.checksum)
+            .values(
+                ref_count=AssetBlob.ref_count - references.c.count,
+                orphaned_at=case(
+                    (AssetBlob.ref_count <= references.c.count, func.now()),
+                    else_=AssetBlob.orphaned_at,
+                ),
+            )
+            .returning(AssetBlob.checksum)
+            .cte("released_blobs")
+        )
+        if statement is None:
+            statement = select(func.count()).select_from(assets)
+        return statement.add_cte(blobs, nest_here=True)
+
+    def apply_diff(self, diff: EntityDiff) -> bool:
+        """
+        Writes the changes of a diff with one batched statement per kind of
+        change, and one UPDATE per attribute type for the changed values, and
+        bumps the version of the changed entities. Nothing is written when
+        there are no changes. The loaded entities are updated to the new values
+        without being marked as modified, so the session doesn't write them
+        again. Returns whether anything changed.
+        """
+        if not diff:
+            return False
+
+        attribute = Attribute.__table__
+        columns = attribute_columns()
+        changed_by_codec = defaultdict(list)
+        for current, new in diff.changed:
+            changed_by_codec[CODECS[new.type]].append((current, new))
+        for codec, pairs in changed_by_codec.items():
+            column = attribute.c[columns[codec.column]]
+            # The entity ids restrict the statements to the partitions of the entities.
+            self.session.execute(
+                update(attribute)
+                .where(
+                    attribute.c.entity_id == bindparam("attribute_entity_id"),
+                    attribute.c.id == bindparam("attribute_id"),
+                )
+                .values({column: bindparam("value", type_=column.type)}),
+                [
+                    {
+                        "attribute_entity_id": current.entity_id,
+                        "attribute_id": current.id,
+                        "value": getattr(new, codec.column),
+                    }
+                    for current, new in pairs
+                ],
+            )
+            for current, new in pairs:
+                set_committed_value(current, codec.column, getattr(new, codec.column))
+
+        if diff.removed:
+            self.session.execute(
+                delete(attribute).where(
+                    attribute.c.entity_id.in_(
+                        {entity.id for entity, _ in diff.removed}
+                    ),
+                    attribute.c.id.in_([attr.id for _, attr in diff.removed]),
                 )
             )
+            for entity, attr in diff.removed:
+                attributes = [a for a in entity.attributes if a is not attr]
+                set_committed_value(entity, "attributes", attributes)
+
+        entity_rows, attribute_rows, relation_rows = [], [], []
+        for entity, attr in diff.added:
+            attr.id = attr.id or uuid.uuid4()
+            attr.entity_id = entity.id
+            attribute_rows.append(
+                {column: getattr(attr, key) for key, column in columns.items()}
+            )
+            set_committed_value(entity, "attributes", [*entity.attributes, attr])
+        for entity, relation in diff.added_relations:
+            self._collect_rows(
+                relation.target_entity, entity_rows, attribute_rows, relation_rows
+            )
+            relation.source_entity_id = entity.id
+            relation.target_entity_id = relation.target_entity.id
+            relation.is_deleted = False
+            relation_rows.append(
+                {
+                    "source_entity_id": entity.id,
+                    "target_entity_id": relation.target_entity.id,
+                    "collection_name": relation.collection_name,
+                    "is_deleted": False,
+                }
+            )
+            set_committed_value(entity, "relations", [*entity.relations, relation])
+        if entity_rows:
+            self.session.execute(
+                self._insert_statement(entity_rows, attribute_rows, relation_rows)
+            )
+        elif attribute_rows:
+            self.session.execute(insert(attribute).values(attribute_rows))
+
+        entity_table = Entity.__table__
+        self.session.execute(
+            update(entity_table)
+            .where(
+                entity_table.c.id.in_([entity.id for entity in diff.changed_entities])
+            )
+            .values(version=entity_table.c.version + 1)
+        )
+        for entity in diff.changed_entities:
+            set_committed_value(entity, "version", entity.version + 1)
 
-        return query.first()
+        self.session.commit()
+        return True
 
     def update_entity(self, entity, relations, relation_collection) -> Entity:
 
@@ -140,14 +492,13 @@ class EntityService:
             immediate_parent_type = list(relations.keys())[-2]
             immediate_parent_id = list(relations.values())[-2]
 
-            parent_entity: Entity = (
-                self.session.query(Entity)
-                .filter(Entity.id == immediate_parent_id)
-                .first()
+            # Only the type of the parent is needed, not its eagerly loaded relations.
+            parent_type = self.session.scalar(
+                select(Entity.entity_type).where(Entity.id == immediate_parent_id)
             )
 
-            if not parent_entity or not parent_entity.is_of_type(immediate_parent_type):
-                raise Exception(
+            if not parent_type or parent_type.lower() != immediate_parent_type.lower():
+                raise NotFoundException(
                     f"Parent entity with id {immediate_parent_id} of type {immediate_parent_type} not found."
                 )
 
@@ -155,7 +506,7 @@ class EntityService:
             relation: EntityRelation = (
                 self.session.query(EntityRelation)
                 .filter_by(
-                    source_entity_id=parent_entity.id,
+                    source_entity_id=uuid.UUID(immediate_parent_id),
                     target_entity_id=entity.id,
                     collection_name=relation_collection,
                 )
@@ -164,7 +515,7 @@ class EntityService:
             if relation:
                 relation.is_deleted = entity.is_deleted
             else:
-                raise Exception(
+                raise NotFoundException(
                     f"No existing relation from parent {immediate_parent_id} to entity {entity.id} with collection {relation_collection}."
                 )
 
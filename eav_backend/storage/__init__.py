@@ -0,0 +1,39 @@
+from functools import cache
+from typing import Optional
+
+from eav_backend.config import settings
+from eav_backend.storage.base import AssetStorage, StoredContent
+
+
+@cache
+def get_asset_storage(name: Optional[str] = None) -> AssetStorage:
+    """
+    Returns the storage backend with the given name, or the one new assets are
+    stored in. Assets remember the backend they were stored in, so content
+    stays readable after the configured backend changes.
+    """
+    match name or settings.asset_storage_backend:
+        case "filesystem":
+            from eav_backend.storage.filesystem import FileSystemStorage
+
+            return FileSystemStorage(
+                settings.asset_storage_path, settings.asset_chunk_size
+            )
+        case "s3":
+            from eav_backend.storage.s3 import S3Storage
+
+            return S3Storage(
+                bucket=settings.s3_bucket,
+                chunk_size=settings.asset_chunk_size,
+                part_size=settings.s3_part_size,
+                endpoint_url=settings.s3_endpoint_url,
+                region=settings.s3_region,
+                access_key_id=settings.s3_access_key_id,
+                secret_access_key=settings.s3_secret_access_key,
+            )
+        case "database":
+            from eav_backend.storage.database import DatabaseStorage
+
+            return DatabaseStorage(settings.asset_chunk_size)
+        case unknown:
+            raise ValueError(f"Unknown asset storage backend {unknown}")
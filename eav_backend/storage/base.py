@@ -0,0 +1,142 @@
+import hashlib
+import io
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+
+@dataclass(frozen=True, slots=True)
+class StoredContent:
+    key: str
+    size: int
+    checksum: str
+    content_encoding: Optional[str] = None
+    stored_size: Optional[int] = None
+
+
+class AssetStorage(ABC):
+    """
+    Stores the content of assets outside of the database. Content is written
+    from a stream and read back as an iterator of chunks, so neither side has
+    to hold a whole file in memory. The database only keeps the name of the
+    backend and the key of the content.
+    """
+
+    name: str
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+
+    @abstractmethod
+    def write(self, stream: BinaryIO) -> StoredContent:
+        """Stores the remaining content of a stream under a new key."""
+
+    @abstractmethod
+    def open(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Returns the content stored under a key from byte `start` up to (not
+        including) byte `end`, raising FileNotFoundError if there is none.
+        """
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Removes the content stored under a key, if there is any."""
+
+    def reader(self, keys: list[str]) -> BinaryIO:
+        """A readable file over the content under several keys, one after the other."""
+        return IteratorReader(chain.from_iterable(map(self.open, keys)))
+
+    def combine(self, keys: list[str], sizes: list[int]) -> Optional[str]:
+        """
+        Stores the content under several keys, one after the other, under a new
+        key without reading it, and returns the new key. Returns None if the
+        backend can't, in which case the content has to be read and written.
+        """
+        return None
+
+
+def new_key() -> str:
+    key = uuid.uuid4().hex
+    return f"{key[:2]}/{key[2:4]}/{key}"
+
+
+class HashingReader:
+    """Reads a stream in chunks while computing its size and SHA-256 checksum."""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.stream.read(self.chunk_size):
+            self.size += len(chunk)
+            self.hash.update(chunk)
+            yield chunk
+
+    @property
+    def checksum(self) -> str:
+        return self.hash.hexdigest()
+
+    def stored(self, key: str) -> StoredContent:
+        return StoredContent(
+            key=key, size=self.size, checksum=self.checksum, stored_size=self.size
+        )
+
+
+class IteratorReader(io.RawIOBase):
+    """A readable file over an iterator of chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def file_chunks(
+    file: BinaryIO, chunk_size: int, length: Optional[int] = None
+) -> Iterator[bytes]:
+    """Iterates over (at most `length` bytes of) an open file in chunks and closes it when done."""
+    try:
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = file.read(
+                chunk_size if remaining is None else min(chunk_size, remaining)
+            )
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def slice_chunks(chunks: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    """The part of a sequence of chunks from byte `start` up to (not including) byte `end`."""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0) : end - position]
+        position = chunk_end
+        if position >= end:
+            break
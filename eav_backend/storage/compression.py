@@ -0,0 +1,142 @@
+import fnmatch
+import gzip
+import logging
+import zlib
+from functools import cache
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from eav_backend.config import settings
+from eav_backend.storage.base import (
+    AssetStorage,
+    StoredContent,
+    HashingReader,
+    IteratorReader,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("openepi")
+
+
+class Codec:
+    """A content coding of stored content, named as in the Content-Encoding header."""
+
+    name: str
+
+    def compressor(self):
+        raise NotImplementedError
+
+    def decompressor(self):
+        raise NotImplementedError
+
+    def compress_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = self.compressor()
+        for chunk in chunks:
+            if compressed := compressor.compress(chunk):
+                yield compressed
+        yield compressor.flush()
+
+    def decompress_chunks(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressor = self.decompressor()
+        for chunk in chunks:
+            if decompressed := decompressor.decompress(chunk):
+                yield decompressed
+
+    def compress(self, data: bytes) -> bytes:
+        return b"".join(self.compress_chunks([data]))
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+
+    def compressor(self):
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def decompressor(self):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=6)
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=3).compressobj()
+
+    def decompressor(self):
+        return zstandard.ZstdDecompressor().decompressobj()
+
+
+CODECS: dict[str, Codec] = {"gzip": GzipCodec()}
+if zstandard is not None:
+    CODECS["zstd"] = ZstdCodec()
+
+
+def get_codec(name: Optional[str]) -> Optional[Codec]:
+    return CODECS[name] if name else None
+
+
+def configured_codec() -> Optional[Codec]:
+    name = settings.asset_compression
+    if name == "none":
+        return None
+    if name == "zstd" and zstandard is None:
+        warn_zstd_missing()
+        name = "gzip"
+    return CODECS[name]
+
+
+@cache
+def warn_zstd_missing():
+    logger.warning("zstandard is not installed, compressing assets with gzip")
+
+
+def choose_codec(mimetype: Optional[str], sample: bytes) -> Optional[Codec]:
+    """
+    The codec to store content with, if any: content is compressed when its
+    MIME type is one that usually compresses well and a sample of it shrinks
+    by at least `asset_compression_min_saving`.
+    """
+    codec = configured_codec()
+    if codec is None or not sample:
+        return None
+    mimetype = (mimetype or "").split(";")[0].strip().lower()
+    if not any(
+        fnmatch.fnmatchcase(mimetype, pattern)
+        for pattern in settings.asset_compression_mimetypes
+    ):
+        return None
+    saving = 1 - len(codec.compress(sample)) / len(sample)
+    return codec if saving >= settings.asset_compression_min_saving else None
+
+
+def store_content(
+    storage: AssetStorage, stream: BinaryIO, mimetype: Optional[str]
+) -> StoredContent:
+    """
+    Stores the content of a stream, compressed if it is worth it. The size and
+    checksum returned are those of the uncompressed content.
+    """
+    sample = stream.read(settings.asset_compression_sample_size)
+    codec = choose_codec(mimetype, sample)
+    source = IteratorReader(
+        chain([sample], iter(lambda: stream.read(storage.chunk_size), b""))
+    )
+    if codec is None:
+        return storage.write(source)
+
+    content = HashingReader(source, storage.chunk_size)
+    stored = storage.write(IteratorReader(codec.compress_chunks(content)))
+    return StoredContent(
+        key=stored.key,
+        size=content.size,
+        checksum=content.checksum,
+        content_encoding=codec.name,
+        stored_size=stored.size,
+    )
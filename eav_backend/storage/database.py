@@ -0,0 +1,55 @@
+from typing import BinaryIO, Iterator, Optional
+
+from sqlalchemy import select, func, delete
+
+from eav_backend.database import SessionLocal
+from eav_backend.models.asset_content import AssetContent
+from eav_backend.storage.base import AssetStorage, StoredContent
+
+
+class DatabaseStorage(AssetStorage):
+    """
+    Read access to content stored in the `asset_content` table, where assets
+    were kept before the storage backends were introduced. Keys are asset ids.
+    The content is read in chunks with separate sessions, so a response can
+    outlive the session of the request that started it.
+    """
+
+    name = "database"
+
+    def write(self, stream: BinaryIO) -> StoredContent:
+        # The settings don't accept the database as the backend for new assets.
+        raise ValueError("New assets can not be stored in the database")
+
+    def open(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        with SessionLocal() as session:
+            size = session.scalar(
+                select(func.length(AssetContent.content)).where(
+                    AssetContent.asset_id == key
+                )
+            )
+        if size is None:
+            raise FileNotFoundError(key)
+        return self._chunks(key, start, size if end is None else min(end, size))
+
+    def _chunks(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        """The content from byte `start` up to (not including) byte `end`."""
+        with SessionLocal() as session:
+            for offset in range(start, end, self.chunk_size):
+                # substring() counts from 1.
+                yield session.scalar(
+                    select(
+                        func.substring(
+                            AssetContent.content,
+                            offset + 1,
+                            min(self.chunk_size, end - offset),
+                        )
+                    ).where(AssetContent.asset_id == key)
+                )
+
+    def delete(self, key: str):
+        with SessionLocal() as session:
+            session.execute(delete(AssetContent).where(AssetContent.asset_id == key))
+            session.commit()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from eav_backend.storage.base import (
+    AssetStorage,
+    StoredContent,
+    HashingReader,
+    new_key,
+    file_chunks,
+)
+
+
+class FileSystemStorage(AssetStorage):
+    """
+    Stores content as files below a root directory. Uploads are written to a
+    temporary file first and moved into place once complete, so a key never
+    points to a partially written file.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, root: str, chunk_size: int):
+        super().__init__(chunk_size)
+        self.root = Path(root)
+        self.tmp = self.root / "tmp"
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def write(self, stream: BinaryIO) -> StoredContent:
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        reader = HashingReader(stream, self.chunk_size)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in reader:
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+            key = new_key()
+            path = self.path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+        return reader.stored(key)
+
+    def open(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        file = open(self.path(key), "rb")
+        file.seek(start)
+        return file_chunks(file, self.chunk_size, None if end is None else end - start)
+
+    def delete(self, key: str):
+        with suppress(FileNotFoundError):
+            os.unlink(self.path(key))
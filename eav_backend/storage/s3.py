@@ -0,0 +1,164 @@
+import logging
+from typing import BinaryIO, Iterator, Optional
+
+from eav_backend.storage.base import AssetStorage, StoredContent, HashingReader, new_key
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+logger = logging.getLogger("openepi")
+
+# S3 rejects multipart uploads with parts smaller than this, except for the last one.
+MIN_PART_SIZE = 5 * 1024 * 1024
+# The largest part that can be copied with a single request.
+MAX_COPY_PART_SIZE = 5 * 1024 * 1024 * 1024
+
+
+class S3Storage(AssetStorage):
+    """
+    Stores content as objects in an S3 compatible bucket. Content smaller than
+    a part is uploaded with a single request, larger content as a multipart
+    upload, so at most one part is held in memory.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        chunk_size: int,
+        part_size: int,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+    ):
+        if boto3 is None:
+            raise RuntimeError("The s3 asset storage backend requires boto3")
+        super().__init__(chunk_size)
+        self.bucket = bucket
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+
+    def write(self, stream: BinaryIO) -> StoredContent:
+        key = new_key()
+        reader = HashingReader(stream, self.chunk_size)
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        try:
+            for chunk in reader:
+                buffer += chunk
+                if len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=key
+                        )["UploadId"]
+                    parts.append(self._upload_part(key, upload_id, len(parts), buffer))
+                    buffer = bytearray()
+
+            if upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buffer))
+            else:
+                if buffer:
+                    parts.append(self._upload_part(key, upload_id, len(parts), buffer))
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except BaseException:
+            if upload_id is not None:
+                self._abort(key, upload_id)
+            raise
+        return reader.stored(key)
+
+    def combine(self, keys: list[str], sizes: list[int]) -> Optional[str]:
+        """
+        Copies the objects into the parts of a multipart upload within the
+        bucket, which is only possible if all but the last are large enough
+        to be parts.
+        """
+        if any(size < MIN_PART_SIZE for size in sizes[:-1]) or any(
+            size > MAX_COPY_PART_SIZE for size in sizes
+        ):
+            return None
+
+        key = new_key()
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)[
+            "UploadId"
+        ]
+        try:
+            parts = []
+            for index, source in enumerate(keys):
+                response = self.client.upload_part_copy(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=index + 1,
+                    CopySource={"Bucket": self.bucket, "Key": source},
+                )
+                parts.append(
+                    {
+                        "PartNumber": index + 1,
+                        "ETag": response["CopyPartResult"]["ETag"],
+                    }
+                )
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self._abort(key, upload_id)
+            raise
+        return key
+
+    def _abort(self, key: str, upload_id: str):
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+        except Exception:
+            logger.exception(f"Could not abort multipart upload of {key}")
+
+    def _upload_part(self, key: str, upload_id: str, index: int, buffer: bytearray):
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=index + 1,
+            Body=bytes(buffer),
+        )
+        return {"PartNumber": index + 1, "ETag": response["ETag"]}
+
+    def open(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        arguments = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            arguments["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            body = self.client.get_object(**arguments)["Body"]
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+        return self._chunks(body)
+
+    def _chunks(self, body) -> Iterator[bytes]:
+        try:
+            yield from body.iter_chunks(self.chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Hashable
+
+from eav_backend.config import settings
+
+logger = logging.getLogger("openepi")
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+ESTIMATED_COUNT_HEADER = "X-Total-Count-Estimated"
+
+
+class CountMode(str, Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
+@dataclass
+class CachedCount:
+    count: int
+    counted_at: float
+
+
+class CollectionCounts:
+    """
+    Exact counts of collections, cached per worker. A count is computed on the
+    request that first asks for it, and once it is older than the ttl the
+    cached count is still returned while a fresh one is counted in the
+    background, so only the first request of a collection waits for COUNT(*).
+    """
+
+    def __init__(self, ttl: int, size: int):
+        self.ttl = ttl
+        self.size = size
+        self.counts: OrderedDict[Hashable, CachedCount] = OrderedDict()
+        self.refreshing: set[Hashable] = set()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="collection-count"
+        )
+
+    def get(
+        self,
+        key: Hashable,
+        count_now: Callable[[], int],
+        count_later: Callable[[], int],
+    ) -> int:
+        with self.lock:
+            cached = self.counts.get(key)
+            if cached:
+                self.counts.move_to_end(key)
+                if time.monotonic() - cached.counted_at > self.ttl and (
+                    key not in self.refreshing
+                ):
+                    self.refreshing.add(key)
+                    self.executor.submit(self._refresh, key, count_later)
+                return cached.count
+
+        count = count_now()
+        self._store(key, count)
+        return count
+
+    def _refresh(self, key: Hashable, count_later: Callable[[], int]):
+        try:
+            self._store(key, count_later())
+        except Exception as e:
+            logger.warning(f"Refreshing the count of {key} failed: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def _store(self, key: Hashable, count: int):
+        with self.lock:
+            self.counts[key] = CachedCount(count, time.monotonic())
+            self.counts.move_to_end(key)
+            while len(self.counts) > self.size:
+                self.counts.popitem(last=False)
+
+
+collection_counts = CollectionCounts(
+    settings.collection_count_ttl, settings.collection_count_cache_size
+)
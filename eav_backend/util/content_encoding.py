@@ -0,0 +1,20 @@
+from typing import Optional
+
+
+def accepts_encoding(header: Optional[str], encoding: str) -> bool:
+    """Whether an `Accept-Encoding` header accepts a content coding (explicitly or through `*`)."""
+    if not header:
+        return False
+    accepted = {}
+    for item in header.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.lower()] = quality
+    return accepted.get(encoding, accepted.get("*", 0.0)) > 0
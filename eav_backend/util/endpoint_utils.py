@@ -1,11 +1,14 @@
+from contextlib import nullcontext
 from inspect import Parameter, Signature
-from typing import Callable, Optional
+from typing import Annotated, Any, Callable, Optional
 
-from fastapi import UploadFile, File
+from fastapi import UploadFile, File, Request, Response, Body
 from fastapi.params import Depends
 
 from eav_backend.dependencies import get_entity_service
+from eav_backend.metrics import set_request_entity_definition
 from eav_backend.services.entity_service import EntityService
+from eav_backend.util.query_budget import query_budget as within_budget
 
 
 def build_signature(
@@ -14,7 +17,12 @@ def build_signature(
     include_body: bool = False,
     body_type=None,
     body_name: str = "item",
+    body_media_type: Optional[str] = None,
     service: Callable = get_entity_service,
+    extra_params: Optional[dict[str, type]] = None,
+    request_param: bool = False,
+    query_params: Optional[dict[str, tuple[type, Any]]] = None,
+    response_param: bool = False,
 ) -> Signature:
     params = []
 
@@ -23,7 +31,11 @@ def build_signature(
             Parameter(
                 name=body_name,
                 kind=Parameter.POSITIONAL_OR_KEYWORD,
-                annotation=body_type,
+                annotation=(
+                    Annotated[body_type, Body(media_type=body_media_type)]
+                    if body_media_type
+                    else body_type
+                ),
             )
         )
 
@@ -32,6 +44,29 @@ def build_signature(
             Parameter(name=param, kind=Parameter.POSITIONAL_OR_KEYWORD, annotation=str)
         )
 
+    for param, annotation in (extra_params or {}).items():
+        params.append(
+            Parameter(
+                name=param, kind=Parameter.POSITIONAL_OR_KEYWORD, annotation=annotation
+            )
+        )
+
+    if request_param:
+        params.append(
+            Parameter(
+                name="request", kind=Parameter.POSITIONAL_OR_KEYWORD, annotation=Request
+            )
+        )
+
+    if response_param:
+        params.append(
+            Parameter(
+                name="response",
+                kind=Parameter.POSITIONAL_OR_KEYWORD,
+                annotation=Response,
+            )
+        )
+
     if file_param:
         params.append(
             Parameter(
@@ -42,6 +77,16 @@ def build_signature(
             )
         )
 
+    for param, (annotation, default) in (query_params or {}).items():
+        params.append(
+            Parameter(
+                name=param,
+                kind=Parameter.POSITIONAL_OR_KEYWORD,
+                annotation=annotation,
+                default=default,
+            )
+        )
+
     params.append(
         Parameter(
             name="service",
@@ -62,35 +107,65 @@ def create_endpoint_wrapper(
     upload_file: bool = False,
     include_body: bool = False,
     body_type=None,
+    body_media_type: Optional[str] = None,
     response_model=None,
     entity_definition=None,
     relation_collection: Optional[str] = None,
     service: Callable = get_entity_service,
+    extra_params: Optional[dict[str, type]] = None,
+    include_request: bool = False,
+    query_params: Optional[dict[str, tuple[type, Any]]] = None,
+    include_response: bool = False,
+    query_budget: Optional[int] = None,
 ):
     path_params = path_params or []
+    extra_params = extra_params or {}
+    query_params = query_params or {}
 
     async def endpoint(**kwargs):
+        if entity_definition:
+            set_request_entity_definition(entity_definition.name)
         service = kwargs.pop("service")
         item = kwargs.get("item") if include_body else None
         file = kwargs.get("file") if upload_file else None
         param_values = [kwargs[param] for param in path_params]
-        return await handler(
-            item=item,
-            file=file,
-            response_model=response_model,
-            entity_definition=entity_definition,
-            service=service,
-            path_params=path_params,
-            param_values=param_values,
-            relation_collection=relation_collection,
+        extra_values = {param: kwargs[param] for param in extra_params}
+        extra_values |= {param: kwargs[param] for param in query_params}
+        if include_request:
+            extra_values["request"] = kwargs["request"]
+        if include_response:
+            extra_values["response"] = kwargs["response"]
+        budget = (
+            within_budget(
+                f"{handler.__name__} of {entity_definition.name}", query_budget
+            )
+            if query_budget is not None and entity_definition
+            else nullcontext()
         )
+        with budget:
+            return await handler(
+                item=item,
+                file=file,
+                response_model=response_model,
+                entity_definition=entity_definition,
+                service=service,
+                path_params=path_params,
+                param_values=param_values,
+                relation_collection=relation_collection,
+                **extra_values,
+            )
 
     endpoint.__signature__ = build_signature(
         path_params=path_params,
         file_param=upload_file,
         include_body=include_body,
         body_type=body_type,
+        body_media_type=body_media_type,
         service=service,
+        extra_params=extra_params,
+        request_param=include_request,
+        query_params=query_params,
+        response_param=include_response,
     )
     endpoint.__name__ = f"{http_method}_endpoint_with_" + "_".join(path_params)
     return endpoint
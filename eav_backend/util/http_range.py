@@ -0,0 +1,48 @@
+from typing import Optional
+
+
+class RangeNotSatisfiable(Exception):
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for content of {size} bytes")
+        self.size = size
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Returns the start and (exclusive) end of the byte range requested by a
+    `Range` header, or None when the whole content should be sent. Headers
+    that are malformed or ask for several ranges are ignored, as RFC 9110
+    allows.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = spec.strip().partition("-")
+    if not separator or not (first or last):
+        return None
+    if not (first.isdigit() or not first) or not (last.isdigit() or not last):
+        return None
+
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(size)
+        return max(size - length, 0), size
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    return start, min(int(last) + 1, size) if last else size
+
+
+def if_range_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Whether a `Range` header may be honoured given the `If-Range` header of the
+    request. Only strong entity tags are compared; a date sends the whole
+    content.
+    """
+    return header is None or header.strip() == etag
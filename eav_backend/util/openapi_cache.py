@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Any
+
+from fastapi import FastAPI, Request, Response
+from fastapi.openapi.utils import get_openapi
+from starlette.routing import BaseRoute
+
+logger = logging.getLogger("openepi")
+
+STATIC_FRAGMENT = "__static__"
+
+
+class OpenAPICache:
+    """
+    Serves the OpenAPI document of an application with generated routes.
+
+    The document is assembled from fragments: one for the routes registered
+    with the application itself and one per root entity definition, as
+    recorded by the DynamicModelService in `app.state.route_fragments`. A
+    fragment is only regenerated when its version, derived from the hashes of
+    the definitions it covers, changes. The merged document is kept as
+    serialised bytes, so serving it costs neither generation nor encoding.
+    """
+
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.lock = threading.Lock()
+        self.fragments: dict[str, tuple[str, dict[str, Any]]] = {}
+        self.version: str | None = None
+        self.schema: dict[str, Any] | None = None
+        self.document: bytes = b""
+
+    def install(self):
+        """Replaces the default OpenAPI route of the application with the cache."""
+        self.app.router.routes[:] = [
+            route
+            for route in self.app.router.routes
+            if getattr(route, "path", None) != self.app.openapi_url
+        ]
+        self.app.add_route(self.app.openapi_url, self.endpoint, include_in_schema=False)
+        self.app.openapi = self.openapi
+
+    async def endpoint(self, request: Request) -> Response:
+        root_path = request.scope.get("root_path", "").rstrip("/")
+        if root_path and self.app.root_path_in_servers:
+            if root_path not in {server.get("url") for server in self.app.servers}:
+                self.app.servers.insert(0, {"url": root_path})
+
+        version, document = self.get()
+        etag = f'"{version}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(
+            content=document, media_type="application/json", headers={"ETag": etag}
+        )
+
+    def openapi(self) -> dict[str, Any]:
+        self.get()
+        return self.schema
+
+    def get(self) -> tuple[str, bytes]:
+        fragments = self._route_fragments()
+        version = hashlib.md5(
+            ";".join(
+                f"{name}:{fragment_version}"
+                for name, (fragment_version, _) in fragments.items()
+            ).encode("UTF-8")
+        ).hexdigest()
+        if version == self.version:
+            return self.version, self.document
+
+        with self.lock:
+            if version != self.version:
+                self._build(version, fragments)
+            return self.version, self.document
+
+    def _route_fragments(self) -> dict[str, tuple[str, list[BaseRoute]]]:
+        generated = getattr(self.app.state, "route_fragments", {})
+        generated_routes = {
+            id(route) for _, routes in generated.values() for route in routes
+        }
+        static_routes = [
+            route for route in self.app.routes if id(route) not in generated_routes
+        ]
+        static_version = f"{len(static_routes)}:{json.dumps(self.app.servers)}"
+        return {STATIC_FRAGMENT: (static_version, static_routes)} | generated
+
+    def _build(self, version: str, fragments: dict[str, tuple[str, list[BaseRoute]]]):
+        paths: dict[str, Any] = {}
+        schemas: dict[str, Any] = {}
+        for name, (fragment_version, routes) in fragments.items():
+            cached = self.fragments.get(name)
+            if not cached or cached[0] != fragment_version:
+                logger.debug(f"Generating OpenAPI fragment {name}")
+                cached = (fragment_version, self._generate(routes))
+                self.fragments[name] = cached
+            fragment = cached[1]
+            for path, operations in fragment.get("paths", {}).items():
+                paths.setdefault(path, {}).update(operations)
+            schemas.update(fragment.get("components", {}).get("schemas", {}))
+
+        for name in self.fragments.keys() - fragments.keys():
+            del self.fragments[name]
+
+        schema = self._generate([])
+        schema["paths"] = paths
+        if schemas:
+            schema["components"] = {"schemas": dict(sorted(schemas.items()))}
+
+        self.schema = schema
+        self.document = json.dumps(schema, separators=(",", ":")).encode("UTF-8")
+        self.version = version
+
+    def _generate(self, routes: list[BaseRoute]) -> dict[str, Any]:
+        return get_openapi(
+            title=self.app.title,
+            version=self.app.version,
+            openapi_version=self.app.openapi_version,
+            summary=self.app.summary,
+            description=self.app.description,
+            terms_of_service=self.app.terms_of_service,
+            contact=self.app.contact,
+            license_info=self.app.license_info,
+            routes=routes,
+            tags=self.app.openapi_tags,
+            servers=self.app.servers,
+            separate_input_output_schemas=self.app.separate_input_output_schemas,
+        )
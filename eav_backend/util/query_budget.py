@@ -0,0 +1,74 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from sqlalchemy import Engine, event
+
+from eav_backend.config import settings
+
+logger = logging.getLogger("openepi")
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, name: str, budget: int, statements: int):
+        super().__init__(
+            f"{name} executed {statements} statements, its budget is {budget}"
+        )
+        self.name = name
+        self.budget = budget
+        self.statements = statements
+
+
+@dataclass
+class StatementCounter:
+    statements: int = 0
+
+
+_counters: ContextVar[tuple[StatementCounter, ...]] = ContextVar(
+    "statement_counters", default=()
+)
+
+
+@contextmanager
+def count_statements() -> Iterator[StatementCounter]:
+    """
+    Counts the statements executed in the current context while the block runs.
+    Statements executed with the `count_statement=False` execution option, like
+    the statement timeout of a transaction, are not counted.
+    """
+    counter = StatementCounter()
+    token = _counters.set(_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+
+
+@contextmanager
+def query_budget(name: str, budget: int) -> Iterator[StatementCounter]:
+    """
+    Checks that a block executes at most `budget` statements. Depending on
+    QUERY_BUDGET_MODE an overrun is ignored, logged or raised.
+    """
+    with count_statements() as counter:
+        yield counter
+    if counter.statements <= budget or settings.query_budget_mode == "off":
+        return
+    if settings.query_budget_mode == "raise":
+        raise QueryBudgetExceeded(name, budget, counter.statements)
+    logger.warning(
+        f"{name} executed {counter.statements} statements, its budget is {budget}"
+    )
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    if not context.execution_options.get("count_statement", True):
+        return
+    for counter in _counters.get():
+        counter.statements += 1
+
+
+def count_engine_statements(engine: Engine):
+    event.listen(engine, "before_cursor_execute", count_statement)
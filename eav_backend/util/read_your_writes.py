@@ -0,0 +1,51 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+PRIMARY_UNTIL_COOKIE = "eav_primary_until"
+PRIMARY_UNTIL_HEADER = "X-Primary-Until"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware:
+    """
+    Tells a client that has written something until when its reads should go
+    to the primary database, so it doesn't read from a replica that has not
+    caught up with its write yet. The time is sent as a cookie, and as a
+    header for clients that don't keep cookies and send it back themselves.
+    """
+
+    def __init__(self, app: ASGIApp, window: int):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_window(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + self.window
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_UNTIL_COOKIE}={until}; Max-Age={self.window}; Path=/; HttpOnly; SameSite=Lax",
+                )
+                headers.append(PRIMARY_UNTIL_HEADER, str(until))
+            await send(message)
+
+        await self.app(scope, receive, send_with_window)
+
+
+def reads_from_primary(request: Request) -> bool:
+    """Whether the client of a request wrote recently enough to read from the primary."""
+    value = request.cookies.get(PRIMARY_UNTIL_COOKIE) or request.headers.get(
+        PRIMARY_UNTIL_HEADER
+    )
+    try:
+        return float(value) > time.time()
+    except (TypeError, ValueError):
+        return False
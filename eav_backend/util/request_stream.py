@@ -0,0 +1,43 @@
+import io
+
+import anyio.from_thread
+from starlette.requests import Request
+
+from eav_backend.models.exceptions import TooLargeException
+
+
+class RequestStream(io.RawIOBase):
+    """
+    A readable file over the body of a request, for the storage backends to
+    consume from a worker thread. Chunks are pulled from the event loop as
+    they are read, so the body is never held in memory as a whole.
+    """
+
+    def __init__(self, request: Request, limit: int):
+        self.chunks = request.stream().__aiter__()
+        self.limit = limit
+        self.received = 0
+        self.buffer = b""
+        self.done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.done and (size < 0 or len(self.buffer) < size):
+            try:
+                chunk = anyio.from_thread.run(self.chunks.__anext__)
+            except StopAsyncIteration:
+                self.done = True
+                break
+            self.received += len(chunk)
+            if self.received > self.limit:
+                raise TooLargeException(
+                    f"Request body exceeds the maximum allowed size of {self.limit} bytes"
+                )
+            self.buffer += chunk
+
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
@@ -0,0 +1,137 @@
+import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import Engine, event
+
+from eav_backend.config import settings
+
+logger = logging.getLogger("openepi")
+
+
+@dataclass
+class QueryContext:
+    entity_definition: str
+    path: dict[str, str]
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    parameters: Any
+    duration_ms: float
+    engine: str
+    entity_definition: Optional[str] = None
+    path: dict[str, str] = field(default_factory=dict)
+    plan: Optional[str] = None
+    occurred_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+query_context: ContextVar[QueryContext | None] = ContextVar(
+    "query_context", default=None
+)
+
+# The most recent slow queries, newest last.
+slow_queries: deque[SlowQuery] = deque(maxlen=settings.slow_query_log_size)
+
+# Plans are captured one at a time, off the request that ran the slow query.
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+
+
+@contextmanager
+def describe_queries(entity_definition: str, path: dict[str, str]):
+    """Attaches an entity definition and path to the slow queries run inside the block."""
+    token = query_context.set(QueryContext(entity_definition, dict(path)))
+    try:
+        yield
+    finally:
+        query_context.reset(token)
+
+
+def parameter_shapes(parameters: Any) -> Any:
+    """
+    Describes bind parameters by their type, and length for strings and
+    collections, so slow queries can be logged without their values.
+    """
+    if isinstance(parameters, dict):
+        return {key: value_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany, described by its first set of parameters
+            return [parameter_shapes(parameters[0]), f"{len(parameters)} rows"]
+        return [value_shape(value) for value in parameters]
+    return value_shape(parameters)
+
+
+def value_shape(value: Any) -> str:
+    if isinstance(value, (str, bytes, list, tuple, dict)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def explain(engine: Engine, slow_query: SlowQuery, parameters: Any):
+    try:
+        with engine.connect().execution_options(log_slow_queries=False) as connection:
+            connection.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(settings.statement_timeout_admin)}"
+            )
+            result = connection.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {slow_query.statement}", parameters
+            )
+            slow_query.plan = "\n".join(row[0] for row in result)
+            connection.rollback()
+    except Exception as e:
+        logger.warning(f"Explaining a slow query failed: {e}")
+        return
+    logger.warning(f"Plan of slow query:\n{slow_query.plan}")
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._eav_slow_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_eav_slow_started", None)
+    if started is None or not context.execution_options.get("log_slow_queries", True):
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.slow_query_threshold:
+        return
+
+    described = query_context.get()
+    slow_query = SlowQuery(
+        statement=statement,
+        parameters=parameter_shapes(parameters),
+        duration_ms=round(duration_ms, 3),
+        engine=conn.engine.pool._orig_logging_name or "",
+        entity_definition=described.entity_definition if described else None,
+        path=described.path if described else {},
+    )
+    slow_queries.append(slow_query)
+    logger.warning(
+        f"Slow query took {slow_query.duration_ms} ms"
+        f" (entity definition {slow_query.entity_definition}, path {slow_query.path}):"
+        f" {statement} with parameters {slow_query.parameters}"
+    )
+
+    # ANALYZE runs the statement again, so only queries without side effects
+    # are explained.
+    if (
+        not executemany
+        and statement.lstrip().upper().startswith("SELECT")
+        and random.random() < settings.slow_query_explain_rate
+    ):
+        _explain_executor.submit(explain, conn.engine, slow_query, parameters)
+
+
+def log_slow_queries(engine: Engine):
+    """Logs the statements of an engine that take longer than the slow query threshold."""
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
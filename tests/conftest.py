@@ -0,0 +1,72 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc
+
+ROOT = Path(__file__).parent.parent
+
+# The example definitions nest Incidents under Events under Projects. Budgets
+# are enforced by the routes as well, and no background task runs statements
+# while a test counts them.
+os.environ.update(
+    IMPORT_ENTITIES="true",
+    IMPORT_CONFIG=str(ROOT / "examples" / "entities"),
+    ALEMBIC_DIRECTORY=str(ROOT / "alembic"),
+    ALEMBIC_FILE=str(ROOT / "alembic.ini"),
+    ENABLE_ASSETS="true",
+    ASSET_STORAGE_BACKEND="filesystem",
+    ASSET_STORAGE_PATH=tempfile.mkdtemp(prefix="eav-assets-"),
+    QUERY_BUDGET_MODE="raise",
+    DEFINITION_REFRESH_INTERVAL="0",
+    ASSET_GC_INTERVAL="0",
+    COMPACTION_INTERVAL="0",
+    CHANGE_PRUNE_INTERVAL="0",
+)
+
+from eav_backend.database import engine  # noqa: E402
+from eav_backend.util.query_budget import count_statements  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    try:
+        engine.connect().close()
+    except exc.OperationalError as e:
+        # CI provides a database, without it the suite would pass vacuously.
+        if os.environ.get("CI"):
+            pytest.fail(f"The database is not reachable: {e}")
+        pytest.skip(f"The database is not reachable: {e}")
+
+    # Importing the application runs the migrations.
+    from eav_backend.__main__ import app
+
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def definitions(client):
+    return client.app.state.definition_registry
+
+
+@pytest.fixture
+def counted(client):
+    """
+    Makes a request and returns the response together with the number of
+    statements the request executed.
+    """
+
+    def request(method: str, url: str, **kwargs):
+        with count_statements() as counter:
+            response = client.request(method, url, **kwargs)
+        return response, counter.statements
+
+    return request
@@ -0,0 +1,205 @@
+import json
+
+import pytest
+
+from eav_backend.services.dynamic_model_service import (
+    MERGE_PATCH_MEDIA_TYPE,
+    QUERY_BUDGETS,
+    read_budget,
+    update_budget,
+)
+
+INCIDENT = {
+    "name": "Incident",
+    "description": "An incident",
+    "location": {"type": "Point", "coordinates": [10.75, 59.91]},
+}
+
+
+@pytest.fixture
+def project(client) -> str:
+    response = client.post("/v1/projects", json={"name": "Project"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def event(client, project) -> str:
+    response = client.post(
+        f"/v1/projects/{project}/events",
+        json={"name": "Event", "description": "An event"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def add_incident(client, project: str, event: str) -> str:
+    response = client.post(
+        f"/v1/projects/{project}/events/{event}/incidents", json=INCIDENT
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def incident(client, project, event) -> str:
+    return add_incident(client, project, event)
+
+
+def test_list(counted, definitions, project, event, incident):
+    response, statements = counted("GET", "/v1/projects")
+    assert response.status_code == 200, response.text
+    assert statements <= read_budget(definitions.get("Project"))
+
+    response, statements = counted("GET", f"/v1/projects/{project}/events")
+    assert response.status_code == 200, response.text
+    assert statements <= read_budget(definitions.get("Event"))
+
+
+def test_list_with_count(counted, definitions, project, event):
+    for count in ["exact", "estimated"]:
+        response, statements = counted(
+            "GET", f"/v1/projects/{project}/events", params={"count": count}
+        )
+        assert response.status_code == 200, response.text
+        assert (
+            statements <= read_budget(definitions.get("Event")) + QUERY_BUDGETS["COUNT"]
+        )
+
+
+def test_list_does_not_depend_on_rows(client, counted, project, event, incident):
+    url = f"/v1/projects/{project}/events/{event}/incidents"
+    _, one = counted("GET", url)
+    for _ in range(3):
+        add_incident(client, project, event)
+    response, more = counted("GET", url)
+    assert len(response.json()) == 4
+    assert more == one
+
+
+def test_get(counted, definitions, project, event, incident):
+    response, statements = counted("GET", f"/v1/projects/{project}")
+    assert response.status_code == 200, response.text
+    assert len(response.json()["events"][0]["incidents"]) == 1
+    assert statements <= read_budget(definitions.get("Project"))
+
+    response, statements = counted(
+        "GET", f"/v1/projects/{project}/events/{event}/incidents/{incident}"
+    )
+    assert response.status_code == 200, response.text
+    assert statements <= read_budget(definitions.get("Incident"))
+
+
+def test_post(counted, project, event):
+    response, statements = counted(
+        "POST",
+        f"/v1/projects/{project}/events",
+        json={
+            "name": "Event",
+            "description": "An event with incidents",
+            "incidents": [INCIDENT, INCIDENT | {"name": "Another incident"}],
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert statements <= QUERY_BUDGETS["POST"]
+
+
+def test_put(counted, definitions, project, event, incident):
+    response, statements = counted(
+        "PUT", f"/v1/projects/{project}", json={"name": "Renamed"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["name"] == "Renamed"
+    assert statements <= update_budget(definitions.get("Project"))
+
+    response, statements = counted(
+        "PUT",
+        f"/v1/projects/{project}/events/{event}",
+        json={
+            "name": "Renamed",
+            "description": "A renamed event",
+            "incidents": [
+                INCIDENT | {"description": "An updated incident"},
+                INCIDENT | {"name": "A new incident"},
+            ],
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert len(response.json()["incidents"]) == 2
+    assert statements <= update_budget(definitions.get("Event"))
+
+
+def test_patch(client, counted, project, event):
+    url = f"/v1/projects/{project}/events/{event}"
+    response, statements = counted(
+        "PATCH",
+        url,
+        content=json.dumps({"description": "A patched event"}),
+        headers={"Content-Type": MERGE_PATCH_MEDIA_TYPE},
+    )
+    assert response.status_code == 204, response.text
+    assert statements <= QUERY_BUDGETS["PATCH"]
+    assert client.get(url).json()["description"] == "A patched event"
+
+
+def test_delete(client, counted, project, event):
+    url = f"/v1/projects/{project}/events/{event}"
+    response, statements = counted("DELETE", url)
+    assert response.status_code == 204, response.text
+    assert statements <= QUERY_BUDGETS["DELETE"]
+    assert client.get(url).status_code == 404
+
+
+def test_assets(counted, project, event, incident):
+    url = f"/v1/projects/{project}/events/{event}/incidents/{incident}/assets"
+    response, statements = counted(
+        "POST", url, files={"file": ("notes.txt", b"Some notes", "text/plain")}
+    )
+    assert response.status_code == 200, response.text
+    assert statements <= QUERY_BUDGETS["POST_ASSET"]
+
+    response, statements = counted("GET", url)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 1
+    assert statements <= QUERY_BUDGETS["LIST_ASSETS"]
+
+
+def test_upload(counted, project, event, incident):
+    url = f"/v1/projects/{project}/events/{event}/incidents/{incident}/assets/uploads"
+    response, statements = counted(
+        "POST", url, json={"name": "data.bin", "mimetype": "application/octet-stream"}
+    )
+    assert response.status_code == 201, response.text
+    assert statements <= QUERY_BUDGETS["START_UPLOAD"]
+    upload_url = f"{url}/{response.json()['id']}"
+
+    for part_number, content in enumerate([b"first part", b"second part"], start=1):
+        response, statements = counted(
+            "PUT", f"{upload_url}/parts/{part_number}", content=content
+        )
+        assert response.status_code == 200, response.text
+        assert statements <= QUERY_BUDGETS["PUT_UPLOAD_PART"]
+
+    response, statements = counted("GET", upload_url)
+    assert response.status_code == 200, response.text
+    assert len(response.json()["parts"]) == 2
+    assert statements <= QUERY_BUDGETS["GET_UPLOAD"]
+
+    response, statements = counted("POST", f"{upload_url}/complete")
+    assert response.status_code == 200, response.text
+    assert response.json()["file_size"] == len(b"first part" + b"second part")
+    assert statements <= QUERY_BUDGETS["COMPLETE_UPLOAD"]
+
+
+def test_abort_upload(client, counted, project, event, incident):
+    url = f"/v1/projects/{project}/events/{event}/incidents/{incident}/assets/uploads"
+    response = client.post(
+        url, json={"name": "data.bin", "mimetype": "application/octet-stream"}
+    )
+    upload_url = f"{url}/{response.json()['id']}"
+    client.put(f"{upload_url}/parts/1", content=b"a part")
+
+    response, statements = counted("DELETE", upload_url)
+    assert response.status_code == 204, response.text
+    assert statements <= QUERY_BUDGETS["ABORT_UPLOAD"]
+    assert client.get(upload_url).status_code == 404